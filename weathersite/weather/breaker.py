@@ -0,0 +1,129 @@
+import logging
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import BaseCache
+
+from .exceptions import WeatherAPIUnavailableError
+
+logger = logging.getLogger("weather")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Stop calling an API that keeps timing out, shared by all workers.
+
+    After ``threshold`` failures within ``window`` seconds the circuit opens
+    and calls fail fast for ``cooldown`` seconds. Then it is half-open: one
+    probe call at a time is let through, a success closes the circuit and a
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 5,
+        cooldown: int = 30,
+        window: int = 60,
+        probe_timeout: int = 10,
+        shared: BaseCache | None = None,
+        name: str = "openweather",
+    ) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.window = window
+        self.probe_timeout = probe_timeout
+        self.shared = shared if shared is not None else default_cache
+        prefix = f"circuit_{name}"
+        self.failures_key = f"{prefix}_failures"
+        self.open_key = f"{prefix}_open"
+        self.tripped_key = f"{prefix}_tripped"
+        self.probe_key = f"{prefix}_probe"
+
+    def _state(self, keys: dict[str, object]) -> str:
+        if self.open_key in keys:
+            return OPEN
+        if self.tripped_key in keys:
+            return HALF_OPEN
+        return CLOSED
+
+    def _unavailable(self) -> WeatherAPIUnavailableError:
+        logger.debug("Circuit is open, not calling the API")
+        return WeatherAPIUnavailableError("Service unavailable")
+
+    def state(self) -> str:
+        return self._state(self.shared.get_many([self.open_key, self.tripped_key]))
+
+    def before_call(self) -> bool:
+        """Fail fast while the circuit is open; True if this call is a probe."""
+        state = self.state()
+        if state == OPEN:
+            raise self._unavailable()
+        if state == HALF_OPEN:
+            if not self.shared.add(self.probe_key, 1, self.probe_timeout):
+                raise self._unavailable()
+            return True
+        return False
+
+    def record_success(self, probe: bool) -> None:
+        if probe:
+            logger.info("Probe call succeeded, closing the circuit")
+            self.shared.delete_many(
+                [self.failures_key, self.tripped_key, self.probe_key]
+            )
+
+    def record_failure(self, probe: bool) -> None:
+        if probe:
+            self._open()
+            return
+        self.shared.add(self.failures_key, 0, self.window)
+        if self.shared.incr(self.failures_key) >= self.threshold:
+            self._open()
+
+    def release(self, probe: bool) -> None:
+        """Let another probe through; this one ended without an outage verdict."""
+        if probe:
+            self.shared.delete(self.probe_key)
+
+    def _open(self) -> None:
+        logger.warning("API keeps failing, opening the circuit for %ss", self.cooldown)
+        self.shared.set(self.tripped_key, 1, self.cooldown * 10)
+        self.shared.set(self.open_key, 1, self.cooldown)
+        self.shared.delete_many([self.failures_key, self.probe_key])
+
+    async def abefore_call(self) -> bool:
+        keys = await self.shared.aget_many([self.open_key, self.tripped_key])
+        state = self._state(keys)
+        if state == OPEN:
+            raise self._unavailable()
+        if state == HALF_OPEN:
+            if not await self.shared.aadd(self.probe_key, 1, self.probe_timeout):
+                raise self._unavailable()
+            return True
+        return False
+
+    async def arecord_success(self, probe: bool) -> None:
+        if probe:
+            logger.info("Probe call succeeded, closing the circuit")
+            await self.shared.adelete_many(
+                [self.failures_key, self.tripped_key, self.probe_key]
+            )
+
+    async def arecord_failure(self, probe: bool) -> None:
+        if probe:
+            await self._aopen()
+            return
+        await self.shared.aadd(self.failures_key, 0, self.window)
+        if await self.shared.aincr(self.failures_key) >= self.threshold:
+            await self._aopen()
+
+    async def arelease(self, probe: bool) -> None:
+        if probe:
+            await self.shared.adelete(self.probe_key)
+
+    async def _aopen(self) -> None:
+        logger.warning("API keeps failing, opening the circuit for %ss", self.cooldown)
+        await self.shared.aset(self.tripped_key, 1, self.cooldown * 10)
+        await self.shared.aset(self.open_key, 1, self.cooldown)
+        await self.shared.adelete_many([self.failures_key, self.probe_key])
@@ -0,0 +1,355 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any, Protocol, TypeVar
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import BaseCache
+
+logger = logging.getLogger("weather")
+
+T = TypeVar("T")
+
+
+class LocalTTLCache:
+    """Bounded in-process LRU cache whose entries expire after their TTL."""
+
+    def __init__(self, max_size: int = 1024, max_ttl: int = 60) -> None:
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int | None = None) -> None:
+        """Store a value for ``ttl`` seconds, but never longer than ``max_ttl``."""
+        if self.max_size <= 0:
+            return
+        ttl = min(ttl or self.max_ttl, self.max_ttl)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class Codec(Protocol):
+    """Converts values to the form they are stored in the shared cache."""
+
+    def dumps(self, value: Any) -> Any: ...
+
+    def loads(self, raw: Any) -> Any: ...
+
+
+class TieredCache:
+    """In-process L1 cache in front of the shared Django cache backend (L2).
+
+    L2 hits are promoted to L1 for the TTL of their kind of data, capped by
+    the L1 ``max_ttl`` so that workers do not drift apart for long. L1 holds
+    values as they are, L2 as encoded by ``codec`` when one is given.
+    """
+
+    def __init__(
+        self,
+        local: LocalTTLCache | None = None,
+        shared: BaseCache | None = None,
+        codec: Codec | None = None,
+    ) -> None:
+        self.local = local if local is not None else LocalTTLCache()
+        self.shared = shared if shared is not None else default_cache
+        self.codec = codec
+        self._stats = {"l1_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self) -> dict[str, int]:
+        """Hit and miss counters of both tiers."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _dumps(self, value: Any) -> Any:
+        return self.codec.dumps(value) if self.codec is not None else value
+
+    def _loads(self, raw: Any) -> Any:
+        if raw is None or self.codec is None:
+            return raw
+        return self.codec.loads(raw)
+
+    def _get_local(self, key: str) -> Any | None:
+        value = self.local.get(key)
+        self._count("l1_hits" if value is not None else "l1_misses")
+        return value
+
+    def _promote(self, key: str, value: Any, ttl: int | None) -> Any | None:
+        if value is None:
+            self._count("l2_misses")
+            return None
+        self._count("l2_hits")
+        self.local.set(key, value, ttl)
+        return value
+
+    def _get_many_local(self, keys: Iterable[str]) -> tuple[dict[str, Any], list[str]]:
+        found, missing = {}, []
+        for key in keys:
+            if (value := self._get_local(key)) is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+        return found, missing
+
+    def _promote_many(
+        self, keys: list[str], values: dict[str, Any], ttl: int | None
+    ) -> dict[str, Any]:
+        values = {key: self._loads(raw) for key, raw in values.items()}
+        for key in keys:
+            self._promote(key, values.get(key), ttl)
+        return values
+
+    def get(self, key: str, ttl: int | None = None) -> Any | None:
+        """Look a key up in L1, then in L2; ``ttl`` is used for promotion."""
+        if (value := self._get_local(key)) is not None:
+            return value
+        return self._promote(key, self._loads(self.shared.get(key)), ttl)
+
+    def get_shared(self, key: str) -> Any | None:
+        """Look a key up in L2 only, without promoting it."""
+        return self._loads(self.shared.get(key))
+
+    def get_many(self, keys: Iterable[str], ttl: int | None = None) -> dict[str, Any]:
+        """Look keys up in L1 and the rest in L2 with a single round trip."""
+        found, missing = self._get_many_local(keys)
+        if missing:
+            found.update(
+                self._promote_many(missing, self.shared.get_many(missing), ttl)
+            )
+        return found
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        self.shared.set(key, self._dumps(value), ttl)
+        self.local.set(key, value, ttl)
+
+    def set_many(self, data: dict[str, Any], ttl: int) -> None:
+        if not data:
+            return
+        self.shared.set_many(
+            {key: self._dumps(value) for key, value in data.items()}, ttl
+        )
+        for key, value in data.items():
+            self.local.set(key, value, ttl)
+
+    async def aget(self, key: str, ttl: int | None = None) -> Any | None:
+        if (value := self._get_local(key)) is not None:
+            return value
+        return self._promote(key, self._loads(await self.shared.aget(key)), ttl)
+
+    async def aget_shared(self, key: str) -> Any | None:
+        return self._loads(await self.shared.aget(key))
+
+    async def aset(self, key: str, value: Any, ttl: int) -> None:
+        await self.shared.aset(key, self._dumps(value), ttl)
+        self.local.set(key, value, ttl)
+
+    async def aget_many(
+        self, keys: Iterable[str], ttl: int | None = None
+    ) -> dict[str, Any]:
+        found, missing = self._get_many_local(keys)
+        if missing:
+            values = await self.shared.aget_many(missing)
+            found.update(self._promote_many(missing, values, ttl))
+        return found
+
+    async def aset_many(self, data: dict[str, Any], ttl: int) -> None:
+        if not data:
+            return
+        await self.shared.aset_many(
+            {key: self._dumps(value) for key, value in data.items()}, ttl
+        )
+        for key, value in data.items():
+            self.local.set(key, value, ttl)
+
+    def clear(self) -> None:
+        """Clear the local tier only, the shared one belongs to all workers."""
+        self.local.clear()
+
+
+class _Call:
+    """A load in progress that other threads can wait for."""
+
+    def __init__(self, deadline: float) -> None:
+        self.deadline = deadline
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Collapse concurrent loads of one key into a single call.
+
+    Threads of a process wait for the leader's result. Across workers the
+    leader holds a short lock in the shared cache and the other workers poll
+    ``lookup`` for the value it stores instead of loading it themselves.
+
+    ``wait_timeout`` must outlast the slowest load and ``lock_timeout`` that
+    too, or waiting callers give up and load the key once more.
+    """
+
+    LOCK_TIMEOUT = 10
+    WAIT_TIMEOUT = 9.0
+    POLL_INTERVAL = 0.05
+
+    def __init__(
+        self,
+        shared: BaseCache | None = None,
+        lock_timeout: int = LOCK_TIMEOUT,
+        wait_timeout: float = WAIT_TIMEOUT,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.shared = shared if shared is not None else default_cache
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self,
+        key: str,
+        load: Callable[[], T],
+        lookup: Callable[[], T | None] | None = None,
+    ) -> T:
+        """Run ``load`` once per key; pass ``lookup`` to coordinate workers."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call(self._deadline(lookup is not None))
+
+        if not leader:
+            logger.debug("Waiting for in-flight load of %s", key)
+            if call.done.wait(max(call.deadline - time.monotonic(), 0)):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            return load()
+
+        try:
+            call.result = self._load_shared(key, load, lookup)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            call.done.set()
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def _deadline(self, shared: bool) -> float:
+        """When a leader is done at the latest: a leader that waits for
+        another worker first may then have to load the key itself.
+        """
+        timeout = self.wait_timeout * 2 if shared else self.wait_timeout
+        return time.monotonic() + timeout
+
+    def _load_shared(
+        self,
+        key: str,
+        load: Callable[[], T],
+        lookup: Callable[[], T | None] | None,
+    ) -> T:
+        if lookup is None:
+            return load()
+
+        lock_key = f"lock_{key}"
+        if self.shared.add(lock_key, 1, self.lock_timeout):
+            try:
+                return load()
+            finally:
+                self.shared.delete(lock_key)
+
+        logger.debug("Another worker is loading %s", key)
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            if (value := lookup()) is not None:
+                return value
+            if self.shared.get(lock_key) is None:
+                break
+        return load()
+
+
+class AsyncSingleFlight(SingleFlight):
+    """SingleFlight for coroutines running on one event loop."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._tasks: dict[tuple[int, str], asyncio.Future] = {}
+
+    async def ado(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[T]],
+        lookup: Callable[[], Awaitable[T | None]] | None = None,
+    ) -> T:
+        """Await ``load`` once per key and event loop."""
+        task_key = (id(asyncio.get_running_loop()), key)
+        if (task := self._tasks.get(task_key)) is None:
+            task = asyncio.ensure_future(self._aload_shared(key, load, lookup))
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+        else:
+            logger.debug("Waiting for in-flight load of %s", key)
+        return await asyncio.shield(task)
+
+    async def _aload_shared(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[T]],
+        lookup: Callable[[], Awaitable[T | None]] | None,
+    ) -> T:
+        if lookup is None:
+            return await load()
+
+        lock_key = f"lock_{key}"
+        if await self.shared.aadd(lock_key, 1, self.lock_timeout):
+            try:
+                return await load()
+            finally:
+                await self.shared.adelete(lock_key)
+
+        logger.debug("Another worker is loading %s", key)
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            if (value := await lookup()) is not None:
+                return value
+            if await self.shared.aget(lock_key) is None:
+                break
+        return await load()
@@ -8,6 +8,12 @@ class WeatherAPITimeoutError(WeatherAPIError):
     pass
 
 
+class WeatherAPIDeadlineError(WeatherAPITimeoutError):
+    """The call used up its own time budget; says nothing about the API."""
+
+    pass
+
+
 class WeatherAPIConnectionError(WeatherAPIError):
     pass
 
@@ -18,3 +24,13 @@ class WeatherAPIInvalidRequestError(WeatherAPIError):
 
 class WeatherAPINoLocationsError(WeatherAPIError):
     pass
+
+
+class WeatherAPIRateLimitError(WeatherAPIError):
+    pass
+
+
+class WeatherAPIUnavailableError(WeatherAPIConnectionError):
+    """The circuit breaker is open, the API is not called at all."""
+
+    pass
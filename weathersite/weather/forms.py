@@ -0,0 +1,21 @@
+from django import forms
+
+from .history import BUCKET_KINDS
+
+
+class AddLocationForm(forms.Form):
+    name = forms.CharField(max_length=100)
+    latitude = forms.FloatField(min_value=-90, max_value=90)
+    longitude = forms.FloatField(min_value=-180, max_value=180)
+
+
+class PointForm(forms.Form):
+    lat = forms.FloatField(min_value=-90, max_value=90)
+    lon = forms.FloatField(min_value=-180, max_value=180)
+
+
+class HistoryForm(forms.Form):
+    days = forms.IntegerField(min_value=1, max_value=10 * 365, required=False)
+    bucket = forms.ChoiceField(
+        choices=[(kind, kind) for kind in BUCKET_KINDS], required=False
+    )
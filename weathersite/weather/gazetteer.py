@@ -0,0 +1,94 @@
+import json
+import mmap
+import os
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+from typing import Any
+
+from .geoindex import normalize_query
+
+
+class Gazetteer:
+    """Offline list of places, searched in place through a memory map.
+
+    The file has one ``<normalized name>\\t<location JSON>`` line per name a
+    place is known by, sorted by name, so lookups are a binary search over
+    the line offsets and only the matching lines are parsed.
+    """
+
+    LANGS = ("ru", "en")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._data: mmap.mmap | bytes = b""
+        self._offsets = array("Q")
+        with open(path, "rb") as f:
+            # An empty file cannot be mapped.
+            if os.fstat(f.fileno()).st_size:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index()
+
+    def _index(self) -> None:
+        offset = 0
+        while offset < len(self._data):
+            self._offsets.append(offset)
+            end = self._data.find(b"\n", offset)
+            offset = len(self._data) if end == -1 else end + 1
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def _line(self, i: int) -> bytes:
+        start = self._offsets[i]
+        end = self._offsets[i + 1] if i + 1 < len(self._offsets) else len(self._data)
+        return self._data[start:end].rstrip(b"\n")
+
+    def _name_at(self, i: int) -> bytes:
+        return self._line(i).split(b"\t", 1)[0]
+
+    def _location_at(self, i: int) -> dict[str, Any]:
+        return json.loads(self._line(i).split(b"\t", 1)[1])
+
+    def _scan(self, name: bytes, prefix: bool) -> Iterable[dict[str, Any]]:
+        i = bisect_left(range(len(self)), name, key=self._name_at)
+        while i < len(self):
+            found = self._name_at(i)
+            if found != name and not (prefix and found.startswith(name)):
+                break
+            yield self._location_at(i)
+            i += 1
+
+    def find(self, name: str) -> list[dict[str, Any]]:
+        """Places called exactly ``name``, in any case or Unicode form."""
+        return list(self._scan(normalize_query(name).encode(), prefix=False))
+
+    def complete(self, prefix: str, limit: int = 6) -> list[dict[str, Any]]:
+        """Places with a name starting with ``prefix``."""
+        found: dict[tuple[float, float], dict[str, Any]] = {}
+        for location in self._scan(normalize_query(prefix).encode(), prefix=True):
+            if len(found) == limit:
+                break
+            found.setdefault((location["lat"], location["lon"]), location)
+        return list(found.values())
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    @classmethod
+    def write(cls, path: str, locations: Iterable[dict[str, Any]]) -> int:
+        """Write a gazetteer file atomically; returns the number of lines."""
+        lines = set()
+        for location in locations:
+            payload = json.dumps(location, ensure_ascii=False, sort_keys=True)
+            local_names = location.get("local_names") or {}
+            names = {location["name"], *(local_names.get(lang) for lang in cls.LANGS)}
+            for name in filter(None, names):
+                lines.add(f"{normalize_query(name)}\t{payload}\n".encode())
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.writelines(sorted(lines))
+        os.replace(tmp_path, path)
+        return len(lines)
@@ -0,0 +1,224 @@
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections.abc import Iterable
+from typing import Any
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import BaseCache
+
+logger = logging.getLogger("weather")
+
+
+def normalize_query(query: str) -> str:
+    """Case-folded NFC form of a place name with whitespace collapsed."""
+    return unicodedata.normalize("NFC", " ".join(query.casefold().split()))
+
+
+class GeoPrefixIndex:
+    """Prefix index of the locations geocoding has returned so far.
+
+    Names are kept in a sorted array, so all names starting with a prefix
+    form one slice found with ``bisect``.
+
+    Workers share what they find through the shared cache as an append-only
+    log: ``save`` writes the locations added since the last save as one
+    small segment numbered by an atomic counter, and ``reload`` reads the
+    segments written since the last reload, at most every
+    ``reload_interval`` seconds. Writers never overwrite each other and no
+    entry grows with the size of the index.
+    """
+
+    SEQ_KEY = "geo_index_seq"
+    SEGMENT_KEY = "geo_index_seg_{}"
+    SEGMENT_TTL = 30 * 24 * 60 * 60
+    # Segments re-read on each reload: a writer takes its number before it
+    # stores the segment, so the newest ones may not be there yet.
+    SEGMENT_OVERLAP = 10
+    READ_BATCH = 500
+    # Names inserted one by one; more are merged by sorting.
+    INSORT_LIMIT = 64
+    MAX_LOCATIONS = 50_000
+    RELOAD_INTERVAL = 60
+    # Besides the display name locations are found by these local names.
+    LANGS = ("ru", "en")
+
+    def __init__(
+        self,
+        shared: BaseCache | None = None,
+        max_locations: int = MAX_LOCATIONS,
+        reload_interval: int = RELOAD_INTERVAL,
+    ) -> None:
+        self.shared = shared if shared is not None else default_cache
+        self.max_locations = max_locations
+        self.reload_interval = reload_interval
+        self._names: list[tuple[str, str]] = []
+        self._locations: dict[str, dict[str, Any]] = {}
+        self._unsaved: list[dict[str, Any]] = []
+        self._seq = 0
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        # Names inserted while a merge is sorting, None when none is.
+        self._merging: list[tuple[str, str]] | None = None
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def _location_id(self, location: dict[str, Any]) -> str:
+        return f"{location['lat']:.4f},{location['lon']:.4f}"
+
+    def _entry(self, location: dict[str, Any]) -> dict[str, Any]:
+        """The fields of a location the index keeps, local names of LANGS only."""
+        entry: dict[str, Any] = {
+            key: location[key]
+            for key in ("name", "country", "state", "lat", "lon")
+            if key in location
+        }
+        local_names = location.get("local_names") or {}
+        if names := {
+            lang: local_names[lang] for lang in self.LANGS if lang in local_names
+        }:
+            entry["local_names"] = names
+        return entry
+
+    def _names_of(self, entry: dict[str, Any]) -> set[str]:
+        names = {entry["name"], *entry.get("local_names", {}).values()}
+        return {normalize_query(name) for name in names if name}
+
+    def add(self, locations: Iterable[dict[str, Any]]) -> bool:
+        """Index new locations; True if any of them was not known yet.
+
+        The new locations are shared with other workers by the next ``save``.
+        """
+        return bool(self._add(locations, unsaved=True))
+
+    def _add(
+        self, locations: Iterable[dict[str, Any]], unsaved: bool = False
+    ) -> list[dict[str, Any]]:
+        new_names: list[tuple[str, str]] = []
+        added = []
+        with self._lock:
+            for location in locations:
+                if "lat" not in location or "lon" not in location:
+                    continue
+                location_id = self._location_id(location)
+                if location_id in self._locations:
+                    continue
+                if len(self._locations) >= self.max_locations:
+                    logger.warning("Geo prefix index is full, not adding locations")
+                    break
+                entry = self._locations[location_id] = self._entry(location)
+                new_names.extend((name, location_id) for name in self._names_of(entry))
+                added.append(entry)
+            if unsaved:
+                self._unsaved.extend(added)
+            if len(new_names) <= self.INSORT_LIMIT:
+                self._insort(new_names)
+                return added
+        self._merge_names(new_names)
+        return added
+
+    def _insort(self, new_names: list[tuple[str, str]]) -> None:
+        """Insert a few names in place; the caller holds the lock."""
+        for name in new_names:
+            insort(self._names, name)
+        if self._merging is not None:
+            self._merging.extend(new_names)
+
+    def _merge_names(self, new_names: list[tuple[str, str]]) -> None:
+        """Merge many names, as a reload does, with one sort.
+
+        Sorting the two sorted runs is linear and is done outside the lock,
+        so searches are not held up; names inserted meanwhile are recorded
+        and inserted into the merged list before it replaces the old one.
+        """
+        with self._merge_lock:
+            with self._lock:
+                names = [*self._names, *new_names]
+                self._merging = []
+            merged = sorted(names)
+            with self._lock:
+                for name in self._merging:
+                    insort(merged, name)
+                self._names = merged
+                self._merging = None
+
+    def search(self, prefix: str, limit: int = 6) -> list[dict[str, Any]]:
+        """Known locations with a name starting with ``prefix``."""
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+
+        found: dict[str, dict[str, Any]] = {}
+        with self._lock:
+            names = self._names
+            for i in range(bisect_left(names, (prefix, "")), len(names)):
+                name, location_id = names[i]
+                if not name.startswith(prefix) or len(found) == limit:
+                    break
+                found.setdefault(location_id, self._locations[location_id])
+        return list(found.values())
+
+    def locations(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(self._locations.values())
+
+    def _needs_reload(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > self.reload_interval
+        )
+
+    def _segments_to_read(self, seq: int | None) -> list[str]:
+        """Keys of the segments written since the last reload."""
+        seq = seq or 0
+        if seq < self._seq:
+            # The counter was evicted and starts over.
+            self._seq = 0
+        first = max(self._seq - self.SEGMENT_OVERLAP, 0) + 1
+        self._seq = seq
+        return [self.SEGMENT_KEY.format(n) for n in range(first, seq + 1)]
+
+    def _merge(self, segments: Iterable[list[dict[str, Any]]]) -> None:
+        self._add(location for segment in segments for location in segment)
+
+    def _take_unsaved(self) -> list[dict[str, Any]]:
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, []
+        return unsaved
+
+    def reload(self) -> None:
+        """Merge locations saved by other workers, at most once per interval."""
+        if not self._needs_reload():
+            return
+        self._loaded_at = time.monotonic()
+        keys = self._segments_to_read(self.shared.get(self.SEQ_KEY))
+        for i in range(0, len(keys), self.READ_BATCH):
+            self._merge(self.shared.get_many(keys[i : i + self.READ_BATCH]).values())
+
+    def save(self) -> None:
+        """Share the locations added since the last save as a new segment."""
+        if not (unsaved := self._take_unsaved()):
+            return
+        self.shared.add(self.SEQ_KEY, 0, None)
+        seq = self.shared.incr(self.SEQ_KEY)
+        self.shared.set(self.SEGMENT_KEY.format(seq), unsaved, self.SEGMENT_TTL)
+
+    async def areload(self) -> None:
+        if not self._needs_reload():
+            return
+        self._loaded_at = time.monotonic()
+        keys = self._segments_to_read(await self.shared.aget(self.SEQ_KEY))
+        for i in range(0, len(keys), self.READ_BATCH):
+            segments = await self.shared.aget_many(keys[i : i + self.READ_BATCH])
+            self._merge(segments.values())
+
+    async def asave(self) -> None:
+        if not (unsaved := self._take_unsaved()):
+            return
+        await self.shared.aadd(self.SEQ_KEY, 0, None)
+        seq = await self.shared.aincr(self.SEQ_KEY)
+        await self.shared.aset(self.SEGMENT_KEY.format(seq), unsaved, self.SEGMENT_TTL)
@@ -0,0 +1,266 @@
+import atexit
+import datetime
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any
+
+from django.db import DatabaseError, connection, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import Trunc
+
+from .models import Observation
+from .records import WeatherRecord
+
+logger = logging.getLogger("weather")
+
+ARCHIVE_TABLE = Observation._meta.db_table
+# Holds the observations of months without a partition of their own.
+DEFAULT_PARTITION = f"{ARCHIVE_TABLE}_default"
+# Longest series returned at each resolution; longer ones are by month.
+SERIES_BUCKETS = (
+    ("hour", datetime.timedelta(days=3)),
+    ("day", datetime.timedelta(days=92)),
+    ("week", datetime.timedelta(days=2 * 365)),
+)
+BUCKET_KINDS = ("hour", "day", "week", "month")
+
+
+class HistoryRecorder:
+    """Appends fetched weather to the archive in batches.
+
+    ``record`` only queues an observation, so the clients, sync or async,
+    never wait for the database: a background thread writes the queue with
+    one bulk INSERT every ``flush_interval`` seconds. Without an interval
+    the queue is written by ``flush`` calls only. While the database is
+    down at most ``max_pending`` observations are kept.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float | None = 60,
+        batch_size: int = 1000,
+        max_pending: int = 10_000,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._pending: list[Observation] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        _recorders.add(self)
+
+    def record(
+        self, lat: float, lon: float, observed_at: int, record: WeatherRecord
+    ) -> None:
+        """Queue weather of a grid point measured at Unix time ``observed_at``."""
+        observation = Observation(
+            latitude=lat,
+            longitude=lon,
+            observed_at=datetime.datetime.fromtimestamp(observed_at, datetime.UTC),
+            temp=record.temp,
+            feels_like=record.feels_like,
+            humidity=record.humidity,
+            wind_speed=record.wind_speed,
+        )
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                logger.debug("History queue is full, dropping %s, %s", lat, lon)
+                return
+            self._pending.append(observation)
+            if self._thread is None and self.flush_interval:
+                self._thread = threading.Thread(
+                    target=self._run, name="weather-history", daemon=True
+                )
+                self._thread.start()
+
+    def flush(self) -> int:
+        """Write the queued observations, returns how many were written."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        try:
+            Observation.objects.bulk_create(
+                pending, batch_size=self.batch_size, ignore_conflicts=True
+            )
+        except DatabaseError as e:
+            logger.warning("Could not archive %s observations: %s", len(pending), e)
+            return 0
+        logger.debug("Archived %s observations", len(pending))
+        return len(pending)
+
+    def _run(self) -> None:
+        assert self.flush_interval
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            finally:
+                # The thread sleeps far longer than a connection should idle.
+                connection.close()
+
+    def _reset_after_fork(self) -> None:
+        self._pending = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+
+_recorders: "weakref.WeakSet[HistoryRecorder]" = weakref.WeakSet()
+
+
+def _reset_recorders_after_fork() -> None:
+    for recorder in list(_recorders):
+        recorder._reset_after_fork()
+
+
+def _flush_recorders() -> None:
+    for recorder in list(_recorders):
+        recorder.flush()
+
+
+os.register_at_fork(after_in_child=_reset_recorders_after_fork)
+atexit.register(_flush_recorders)
+
+
+def series_bucket(span: datetime.timedelta) -> str:
+    """Resolution of a series of the given length, about a hundred points."""
+    for bucket, longest in SERIES_BUCKETS:
+        if span <= longest:
+            return bucket
+    return "month"
+
+
+def observation_series(
+    lat: float,
+    lon: float,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    bucket: str | None = None,
+) -> tuple[str, list[dict[str, Any]]]:
+    """Weather of a grid point from ``start`` to ``end`` downsampled to buckets.
+
+    The database does the aggregation: the primary key index finds the rows
+    of the point and only one row per bucket is returned, however many
+    observations the archive holds. Returns the bucket and the series.
+    """
+    bucket = bucket or series_bucket(end - start)
+    rows = (
+        Observation.objects.filter(
+            latitude=lat,
+            longitude=lon,
+            observed_at__gte=start,
+            observed_at__lt=end,
+        )
+        .annotate(time=Trunc("observed_at", bucket, tzinfo=datetime.UTC))
+        .values("time")
+        .annotate(
+            temp_min=Min("temp"),
+            temp_max=Max("temp"),
+            temp_mean=Avg("temp"),
+            humidity=Avg("humidity"),
+            wind_speed_max=Max("wind_speed"),
+            count=Count("observed_at"),
+        )
+        .order_by("time")
+    )
+    series = [
+        {
+            **row,
+            "temp_mean": round(row["temp_mean"], 2),
+            "humidity": round(row["humidity"]),
+        }
+        for row in rows
+    ]
+    return bucket, series
+
+
+def add_months(day: datetime.date, months: int) -> datetime.date:
+    """First day of the month ``months`` after the month of ``day``."""
+    month = day.year * 12 + day.month - 1 + months
+    return datetime.date(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{ARCHIVE_TABLE}_{month:%Y_%m}"
+
+
+def archive_partitions(conn: BaseDatabaseWrapper = connection) -> list[str]:
+    """Names of the monthly partitions of the archive, oldest first."""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s ORDER BY child.relname",
+            [ARCHIVE_TABLE],
+        )
+        return [name for (name,) in cursor.fetchall() if name != DEFAULT_PARTITION]
+
+
+def create_partitions(
+    start: datetime.date, months: int, conn: BaseDatabaseWrapper = connection
+) -> list[str]:
+    """Create the missing partitions of ``months`` months from that of ``start``.
+
+    Observations of the month already in the default partition are moved
+    to the new one: a partition cannot be attached while the default one
+    holds rows of its range. PostgreSQL only; returns the names of the
+    created partitions.
+    """
+    quote = conn.ops.quote_name
+    existing = set(archive_partitions(conn))
+    created = []
+    with conn.cursor() as cursor:
+        for i in range(months):
+            lower = add_months(start, i)
+            name = partition_name(lower)
+            if name in existing:
+                continue
+            bounds = [_month_start(lower), _month_start(add_months(lower, 1))]
+            in_range = "WHERE observed_at >= %s AND observed_at < %s"
+            with transaction.atomic(using=conn.alias):
+                cursor.execute(
+                    f"CREATE TABLE {quote(name)} (LIKE {quote(ARCHIVE_TABLE)} "
+                    "INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                )
+                cursor.execute(
+                    f"INSERT INTO {quote(name)} "
+                    f"SELECT * FROM {quote(DEFAULT_PARTITION)} {in_range}",
+                    bounds,
+                )
+                cursor.execute(
+                    f"DELETE FROM {quote(DEFAULT_PARTITION)} {in_range}", bounds
+                )
+                cursor.execute(
+                    f"ALTER TABLE {quote(ARCHIVE_TABLE)} ATTACH PARTITION "
+                    f"{quote(name)} FOR VALUES FROM (%s) TO (%s)",
+                    bounds,
+                )
+            created.append(name)
+    return created
+
+
+def drop_partitions(
+    before: datetime.date, conn: BaseDatabaseWrapper = connection
+) -> list[str]:
+    """Drop the partitions of months before that of ``before``.
+
+    Dropping a whole month is how the archive is trimmed: unlike DELETE it
+    leaves no dead rows to vacuum. PostgreSQL only.
+    """
+    oldest = partition_name(before)
+    dropped = []
+    with conn.cursor() as cursor:
+        for name in archive_partitions(conn):
+            if name < oldest:
+                cursor.execute(f"DROP TABLE {conn.ops.quote_name(name)}")
+                dropped.append(name)
+    return dropped
+
+
+def _month_start(month: datetime.date) -> datetime.datetime:
+    return datetime.datetime(month.year, month.month, 1, tzinfo=datetime.UTC)
@@ -0,0 +1,53 @@
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from weather.gazetteer import Gazetteer
+from weather.utils import get_weather_client
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the offline gazetteer from geocoding results: JSON files in the "
+        "OpenWeather geo/1.0/direct format and/or the locations seen so far."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("output", help="Gazetteer file to write.")
+        parser.add_argument(
+            "sources",
+            nargs="*",
+            help="JSON arrays or JSON Lines files of geocoding results.",
+        )
+        parser.add_argument(
+            "--from-index",
+            action="store_true",
+            help="Include the locations users have found through the search.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if not options["sources"] and not options["from_index"]:
+            raise CommandError("Give source files or --from-index")
+
+        locations = list(self.read_sources(options["sources"]))
+        if options["from_index"]:
+            index = get_weather_client().geo_index
+            index.reload()
+            locations.extend(index.locations())
+
+        count = Gazetteer.write(options["output"], locations)
+        self.stdout.write(f"Wrote {count} names of {len(locations)} locations")
+
+    def read_sources(self, paths: list[str]) -> Iterator[dict[str, Any]]:
+        for path in paths:
+            text = Path(path).read_text(encoding="utf-8").strip()
+            try:
+                if text.startswith("["):
+                    yield from json.loads(text)
+                else:
+                    yield from (json.loads(line) for line in text.splitlines() if line)
+            except json.JSONDecodeError as e:
+                raise CommandError(f"{path}: {e}")
@@ -0,0 +1,119 @@
+import argparse
+import logging
+import time
+from collections.abc import Iterator
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from weather.exceptions import WeatherAPIError
+from weather.models import Location
+from weather.ratelimit import background_priority
+from weather.services import WeatherApiClient
+from weather.utils import get_weather_client
+
+logger = logging.getLogger("weather")
+
+
+def positive_int(value: str) -> int:
+    """argparse type of options that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+class Command(BaseCommand):
+    help = "Refresh cached weather of saved locations before it expires."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--rpm",
+            type=positive_int,
+            default=30,
+            help="Maximum OpenWeather requests per minute.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=positive_int,
+            default=100,
+            help="Coordinates read from the database at once.",
+        )
+        parser.add_argument(
+            "--margin",
+            type=int,
+            default=120,
+            help="Refresh entries that become stale within this many seconds.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and start a new pass every --interval seconds.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=60,
+            help="Pause between passes in --loop mode.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        client = get_weather_client()
+        while True:
+            refreshed = self.prewarm(
+                client, options["rpm"], options["batch_size"], options["margin"]
+            )
+            self.stdout.write(f"Refreshed weather for {refreshed} locations")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    def prewarm(
+        self, client: WeatherApiClient, rpm: int, batch_size: int, margin: int
+    ) -> int:
+        """Refresh expiring entries, spacing upstream calls to stay within rpm."""
+        delay = 60 / rpm
+        refreshed = 0
+        for batch in self.coordinates(client, batch_size):
+            for lat, lon in batch:
+                if not self.needs_refresh(client, lat, lon, margin):
+                    continue
+                try:
+                    with background_priority():
+                        client.refresh_current_weather(lat, lon)
+                    refreshed += 1
+                except WeatherAPIError as e:
+                    logger.warning("Prewarm of %s, %s failed: %s", lat, lon, e)
+                time.sleep(delay)
+        return refreshed
+
+    def coordinates(
+        self, client: WeatherApiClient, batch_size: int
+    ) -> Iterator[list[tuple[float, float]]]:
+        """Distinct saved coordinates, as cache grid cells, in batches."""
+        seen = set()
+        batch = []
+        locations = (
+            Location.objects.values_list("latitude", "longitude")
+            .distinct()
+            .iterator(chunk_size=batch_size)
+        )
+        for lat, lon in locations:
+            point = client.quantize(lat, lon)
+            if point in seen:
+                continue
+            seen.add(point)
+            batch.append(point)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def needs_refresh(
+        self, client: WeatherApiClient, lat: float, lon: float, margin: int
+    ) -> bool:
+        cached = client.get_cached_weather(lat, lon)
+        if cached is None:
+            return True
+        return time.time() - cached.fetched_at > client.weather_ttl - margin
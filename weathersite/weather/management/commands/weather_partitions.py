@@ -0,0 +1,41 @@
+import datetime
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection
+
+from weather.history import add_months, create_partitions, drop_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Create monthly partitions of the weather archive ahead of time and "
+        "drop the expired ones. Run it at least once a month."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=3,
+            help="Months to create partitions for, the current one included.",
+        )
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            default=0,
+            help="Drop partitions older than this many months (0 keeps all).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if connection.vendor != "postgresql":
+            self.stdout.write("The archive is only partitioned on PostgreSQL")
+            return
+
+        today = datetime.date.today()
+        for name in create_partitions(today, options["ahead"]):
+            self.stdout.write(f"Created {name}")
+        if options["keep_months"]:
+            before = add_months(today, 1 - options["keep_months"])
+            for name in drop_partitions(before):
+                self.stdout.write(f"Dropped {name}")
@@ -0,0 +1,25 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from weather.utils import get_weather_client
+
+
+class Command(BaseCommand):
+    help = (
+        "Show OpenWeather calls counted by the rate limit, the calls shed "
+        "and the state of the circuit breaker."
+    )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        client = get_weather_client()
+        if client.circuit_breaker is not None:
+            self.stdout.write(f"circuit: {client.circuit_breaker.state()}")
+
+        limiter = client.rate_limiter
+        if limiter is None:
+            self.stdout.write("Rate limit is disabled")
+            return
+
+        for name, value in limiter.usage().items():
+            self.stdout.write(f"{name}: {value}")
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:17
+
+from django.apps.registry import Apps
+from django.conf import settings
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+PRECISION = 4
+
+
+def merge_duplicate_locations(
+    apps: Apps, schema_editor: BaseDatabaseSchemaEditor
+) -> None:
+    """Round coordinates and keep the oldest of the locations that then match."""
+    Location = apps.get_model("weather", "Location")
+    seen = set()
+    duplicates = []
+    for location in Location.objects.order_by("id").iterator():
+        lat = round(location.latitude, PRECISION) + 0.0
+        lon = round(location.longitude, PRECISION) + 0.0
+        key = (location.user_id, lat, lon)
+        if key in seen:
+            duplicates.append(location.pk)
+            continue
+        seen.add(key)
+        if (lat, lon) != (location.latitude, location.longitude):
+            Location.objects.filter(pk=location.pk).update(latitude=lat, longitude=lon)
+    Location.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("weather", "0005_rename_user_id_location_user"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="location",
+            name="latitude",
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name="location",
+            name="longitude",
+            field=models.FloatField(),
+        ),
+        migrations.RunPython(merge_duplicate_locations, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="location",
+            index=models.Index(fields=["user", "id"], name="location_user_id_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="location",
+            constraint=models.UniqueConstraint(
+                fields=("user", "latitude", "longitude"), name="unique_user_location"
+            ),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:33
+
+import datetime
+
+from django.apps.registry import Apps
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+# Months of partitions created with the table, weather_partitions adds more.
+INITIAL_PARTITIONS = 3
+
+
+def create_observation_table(
+    apps: Apps, schema_editor: BaseDatabaseSchemaEditor
+) -> None:
+    """Create the archive, partitioned by month with a BRIN index on PostgreSQL.
+
+    Observations are appended in time order, so a BRIN index of a few pages
+    is enough for time ranges; other databases get a plain table. Months
+    without a partition go to the default one.
+    """
+    Observation = apps.get_model("weather", "Observation")
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.create_model(Observation)
+        return
+    sql, params = schema_editor.table_sql(Observation)
+    schema_editor.execute(f"{sql} PARTITION BY RANGE (observed_at)", params)
+    schema_editor.execute(
+        "CREATE INDEX weather_observation_observed_at_brin "
+        "ON weather_observation USING brin (observed_at)"
+    )
+    schema_editor.execute(
+        "CREATE TABLE weather_observation_default "
+        "PARTITION OF weather_observation DEFAULT"
+    )
+    month = datetime.datetime.now(datetime.UTC).date().replace(day=1)
+    for _ in range(INITIAL_PARTITIONS):
+        next_month = (month + datetime.timedelta(days=31)).replace(day=1)
+        schema_editor.execute(
+            f"CREATE TABLE weather_observation_{month:%Y_%m} "
+            "PARTITION OF weather_observation FOR VALUES FROM (%s) TO (%s)",
+            [
+                datetime.datetime.combine(month, datetime.time(), datetime.UTC),
+                datetime.datetime.combine(next_month, datetime.time(), datetime.UTC),
+            ],
+        )
+        month = next_month
+
+
+def drop_observation_table(apps: Apps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    # Partitions are dropped with their table.
+    schema_editor.delete_model(apps.get_model("weather", "Observation"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("weather", "0006_location_float_coordinates"),
+    ]
+
+    operations = [
+        # The table is created by create_observation_table.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="Observation",
+                    fields=[
+                        (
+                            "pk",
+                            models.CompositePrimaryKey(
+                                "latitude",
+                                "longitude",
+                                "observed_at",
+                                blank=True,
+                                editable=False,
+                                primary_key=True,
+                                serialize=False,
+                            ),
+                        ),
+                        ("latitude", models.FloatField()),
+                        ("longitude", models.FloatField()),
+                        ("observed_at", models.DateTimeField()),
+                        ("temp", models.FloatField()),
+                        ("feels_like", models.FloatField()),
+                        ("humidity", models.PositiveSmallIntegerField()),
+                        ("wind_speed", models.FloatField()),
+                    ],
+                ),
+            ],
+        ),
+        migrations.RunPython(create_observation_table, drop_observation_table),
+    ]
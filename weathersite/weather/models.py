@@ -1,15 +1,62 @@
+from typing import Any
+
 from django.contrib.auth.models import User
 from django.db import models
 
+from .services import quantize_coordinates
+
 
 # Create your models here.
 
 
 class Location(models.Model):
+    # Decimal places coordinates are stored with, about 11 m at the equator.
+    # Places closer than that are the same location of a user.
+    COORD_PRECISION = 4
+
     name = models.CharField(max_length=100)  # type: ignore[var-annotated]
     user = models.ForeignKey(User, on_delete=models.CASCADE)  # type: ignore[var-annotated]
-    latitude = models.DecimalField(max_digits=10, decimal_places=7)  # type: ignore[var-annotated]
-    longitude = models.DecimalField(max_digits=10, decimal_places=7)  # type: ignore[var-annotated]
+    latitude = models.FloatField()  # type: ignore[var-annotated]
+    longitude = models.FloatField()  # type: ignore[var-annotated]
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "id"], name="location_user_id_idx")]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "latitude", "longitude"], name="unique_user_location"
+            )
+        ]
 
     def __str__(self) -> str:
         return self.name
+
+    @classmethod
+    def round_coordinates(cls, lat: float, lon: float) -> tuple[float, float]:
+        return quantize_coordinates(lat, lon, cls.COORD_PRECISION)
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        self.latitude, self.longitude = self.round_coordinates(
+            float(self.latitude), float(self.longitude)
+        )
+        super().save(*args, **kwargs)
+
+
+class Observation(models.Model):
+    """Weather of a cache grid point as OpenWeather measured it.
+
+    The archive is append only and keyed by the measurement time, so the
+    same measurement fetched twice is stored once. On PostgreSQL the table
+    is partitioned by month of ``observed_at``, see weather.history.
+    """
+
+    pk = models.CompositePrimaryKey("latitude", "longitude", "observed_at")
+    latitude = models.FloatField()  # type: ignore[var-annotated]
+    longitude = models.FloatField()  # type: ignore[var-annotated]
+    observed_at = models.DateTimeField()  # type: ignore[var-annotated]
+    temp = models.FloatField()  # type: ignore[var-annotated]
+    feels_like = models.FloatField()  # type: ignore[var-annotated]
+    humidity = models.PositiveSmallIntegerField()  # type: ignore[var-annotated]
+    wind_speed = models.FloatField()  # type: ignore[var-annotated]
+
+    def __str__(self) -> str:
+        return f"{self.latitude}, {self.longitude} at {self.observed_at}"
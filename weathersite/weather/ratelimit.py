@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import math
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import BaseCache
+
+from .exceptions import WeatherAPIRateLimitError
+
+logger = logging.getLogger("weather")
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+_priority: ContextVar[str] = ContextVar("weather_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background_priority() -> Iterator[None]:
+    """Mark API calls made inside the block as background work."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class RateLimiter:
+    """Sliding window limit of API calls shared by all workers.
+
+    Calls are counted per fixed window of ``window`` seconds in the shared
+    cache, and a call is allowed while the calls of the last ``window``
+    seconds stay within ``limit``. Those are estimated as the calls of the
+    current window plus the calls of the previous one weighted by how much
+    of it still lies within the last ``window`` seconds, so unlike a plain
+    fixed window the limit cannot be spent twice around a window boundary.
+    Background calls may not use the last ``reserve`` calls, which are kept
+    for page views, and are shed at once instead of waiting.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        window: int = 60,
+        reserve: int = 0,
+        max_wait: float = 2.0,
+        shared: BaseCache | None = None,
+        name: str = "openweather",
+    ) -> None:
+        self.limit = limit
+        self.window = window
+        self.reserve = min(reserve, limit)
+        self.max_wait = max_wait
+        self.shared = shared if shared is not None else default_cache
+        self.name = name
+
+    def _window(self) -> tuple[str, str, float]:
+        """Counter keys of the current and previous windows and the weight of
+        the previous one, the part of it within the last ``window`` seconds.
+        """
+        window_id, elapsed = divmod(time.time(), self.window)
+        return (
+            f"ratelimit_{self.name}_{int(window_id)}",
+            f"ratelimit_{self.name}_{int(window_id) - 1}",
+            1 - elapsed / self.window,
+        )
+
+    def _allowance(self, priority: str) -> int:
+        return self.limit - self.reserve if priority == BACKGROUND else self.limit
+
+    def _wait(
+        self, current: int, previous: int, weight: float, allowance: int
+    ) -> float:
+        """Seconds until a call counted as ``current`` fits in the allowance."""
+        if current > allowance or not previous:
+            # Only the next window has room; its weight is then recomputed.
+            return weight * self.window
+        return (weight - (allowance - current) / previous) * self.window
+
+    def _shed(self, priority: str) -> WeatherAPIRateLimitError:
+        logger.warning("Rate limit reached, shedding %s API call", priority)
+        return WeatherAPIRateLimitError("Rate limit exceeded")
+
+    def _incr(self, key: str) -> int:
+        self.shared.add(key, 0, self.window * 2)
+        return self.shared.incr(key)
+
+    async def _aincr(self, key: str) -> int:
+        await self.shared.aadd(key, 0, self.window * 2)
+        return await self.shared.aincr(key)
+
+    def _take(
+        self, key: str, previous_key: str, weight: float, priority: str
+    ) -> float | None:
+        """Count a call; None if it is allowed, else the seconds to wait."""
+        current = self._incr(key)
+        previous = self.shared.get(previous_key, 0)
+        allowance = self._allowance(priority)
+        if previous * weight + current <= allowance:
+            return None
+        self.shared.decr(key)
+        return self._wait(current, previous, weight, allowance)
+
+    def acquire(self, priority: str | None = None) -> None:
+        """Count a call, waiting up to ``max_wait`` for a page view."""
+        priority = priority or _priority.get()
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            key, previous_key, weight = self._window()
+            wait = self._take(key, previous_key, weight, priority)
+            if wait is None:
+                return
+            if priority == BACKGROUND or time.monotonic() + wait > deadline:
+                self._incr(f"{key}_shed_{priority}")
+                raise self._shed(priority)
+            time.sleep(wait)
+
+    async def _atake(
+        self, key: str, previous_key: str, weight: float, priority: str
+    ) -> float | None:
+        current = await self._aincr(key)
+        previous = await self.shared.aget(previous_key, 0)
+        allowance = self._allowance(priority)
+        if previous * weight + current <= allowance:
+            return None
+        await self.shared.adecr(key)
+        return self._wait(current, previous, weight, allowance)
+
+    async def aacquire(self, priority: str | None = None) -> None:
+        priority = priority or _priority.get()
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            key, previous_key, weight = self._window()
+            wait = await self._atake(key, previous_key, weight, priority)
+            if wait is None:
+                return
+            if priority == BACKGROUND or time.monotonic() + wait > deadline:
+                await self._aincr(f"{key}_shed_{priority}")
+                raise self._shed(priority)
+            await asyncio.sleep(wait)
+
+    def usage(self) -> dict[str, int | float]:
+        """Calls counted in the last window and shed in the current one."""
+        key, previous_key, weight = self._window()
+        counters = self.shared.get_many(
+            [key, previous_key, *(f"{key}_shed_{priority}" for priority in PRIORITIES)]
+        )
+        used = math.ceil(counters.get(previous_key, 0) * weight + counters.get(key, 0))
+        return {
+            "limit": self.limit,
+            "reserve": self.reserve,
+            "used": used,
+            "remaining": max(self.limit - used, 0),
+            "window_ends_in": round(weight * self.window, 1),
+            **{
+                f"shed_{priority}": counters.get(f"{key}_shed_{priority}", 0)
+                for priority in PRIORITIES
+            },
+        }
@@ -0,0 +1,272 @@
+import datetime
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from dataclasses import asdict, dataclass
+from typing import Any
+
+DAY = 24 * 60 * 60
+EPOCH = datetime.date(1970, 1, 1)
+
+
+@dataclass(frozen=True, slots=True)
+class WeatherRecord:
+    """Current weather of a point, only the fields the pages show.
+
+    Cached entries are packed by ``to_bytes`` into a fixed header followed
+    by the description: about 40 bytes instead of a pickled API response
+    of more than a kilobyte.
+    """
+
+    temp: float
+    feels_like: float
+    humidity: int
+    wind_speed: float
+    description: str
+    icon: str
+    country: str
+    tz_offset: int
+    fetched_at: float
+
+    VERSION = 1
+    # Magic, fetched_at, temp, feels_like and wind speed in hundredths,
+    # humidity, UTC offset in seconds, icon code and country code.
+    _HEADER = struct.Struct("<2sdiiHBi3s2s")
+    _MAGIC = b"W" + bytes([VERSION])
+
+    @classmethod
+    def from_api(cls, data: dict[str, Any], fetched_at: float) -> "WeatherRecord":
+        """Record of a ``data/2.5/weather`` response."""
+        weather = data["weather"][0]
+        return cls(
+            temp=data["main"]["temp"],
+            feels_like=data["main"]["feels_like"],
+            humidity=data["main"]["humidity"],
+            wind_speed=data["wind"]["speed"],
+            description=weather["description"],
+            icon=weather["icon"],
+            country=data.get("sys", {}).get("country", ""),
+            tz_offset=data["timezone"],
+            fetched_at=fetched_at,
+        )
+
+    @property
+    def icon_url(self) -> str:
+        return get_weather_icon_url(self.icon)
+
+    @property
+    def timezone(self) -> str:
+        return format_timezone(self.tz_offset)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Fields and computed values, for JSON responses."""
+        return {
+            **asdict(self),
+            "icon_url": self.icon_url,
+            "timezone": self.timezone,
+        }
+
+    def to_bytes(self) -> bytes:
+        header = self._HEADER.pack(
+            self._MAGIC,
+            self.fetched_at,
+            round(self.temp * 100),
+            round(self.feels_like * 100),
+            round(self.wind_speed * 100),
+            self.humidity,
+            self.tz_offset,
+            self.icon.encode(),
+            self.country.encode(),
+        )
+        return header + self.description.encode()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "WeatherRecord":
+        _, fetched_at, temp, feels_like, wind, humidity, tz_offset, icon, country = (
+            cls._HEADER.unpack_from(raw)
+        )
+        return cls(
+            temp=temp / 100,
+            feels_like=feels_like / 100,
+            humidity=humidity,
+            wind_speed=wind / 100,
+            description=raw[cls._HEADER.size :].decode(),
+            icon=icon.decode(),
+            country=country.rstrip(b"\0").decode(),
+            tz_offset=tz_offset,
+            fetched_at=fetched_at,
+        )
+
+    @classmethod
+    def is_packed(cls, raw: Any) -> bool:
+        return isinstance(raw, bytes) and raw[:2] == cls._MAGIC
+
+
+@dataclass(frozen=True, slots=True)
+class DailyForecast:
+    """Aggregates of the forecast entries of one local day."""
+
+    date: datetime.date
+    temp_min: float
+    temp_max: float
+    temp_mean: float
+    feels_like_mean: float
+    wind_speed_max: float
+    pop_max: float
+
+
+@dataclass(frozen=True, slots=True)
+class Forecast:
+    """Forecast of a point in 3 hour steps, stored as columns.
+
+    Each field is an array with one value per step instead of a list of
+    nested dicts: a 5 day forecast is packed by ``to_bytes`` into about
+    a kilobyte, its JSON response takes more than 15. Values are kept in
+    hundredths, like the packed WeatherRecord, and ``pop`` (probability
+    of precipitation) in percent.
+    """
+
+    time: array  # Unix time of each step, typecode "q".
+    temp: array  # The other columns have typecode "i".
+    feels_like: array
+    wind_speed: array
+    pop: array
+    tz_offset: int
+    fetched_at: float
+
+    VERSION = 1
+    COLUMNS = ("time", "temp", "feels_like", "wind_speed", "pop")
+    # Magic, fetched_at, UTC offset in seconds and number of steps.
+    _HEADER = struct.Struct("<2sdiH")
+    _MAGIC = b"F" + bytes([VERSION])
+
+    @classmethod
+    def from_api(cls, data: dict[str, Any], fetched_at: float) -> "Forecast":
+        """Forecast of a ``data/2.5/forecast`` response."""
+        steps = data["list"]
+        return cls(
+            time=array("q", (step["dt"] for step in steps)),
+            temp=_hundredths(step["main"]["temp"] for step in steps),
+            feels_like=_hundredths(step["main"]["feels_like"] for step in steps),
+            wind_speed=_hundredths(step["wind"]["speed"] for step in steps),
+            pop=_hundredths(step.get("pop", 0) for step in steps),
+            tz_offset=data["city"]["timezone"],
+            fetched_at=fetched_at,
+        )
+
+    @property
+    def timezone(self) -> str:
+        return format_timezone(self.tz_offset)
+
+    def daily(self) -> list[DailyForecast]:
+        """Min, max and mean of each local day.
+
+        Steps are sorted by time, so a day is one slice of every column,
+        found by bisection and reduced by ``min``, ``max`` and ``sum``
+        instead of a loop over the steps in Python.
+        """
+        days = []
+        start = 0
+        while start < len(self.time):
+            day = (self.time[start] + self.tz_offset) // DAY
+            end = bisect_left(self.time, (day + 1) * DAY - self.tz_offset, start)
+            temp = self.temp[start:end]
+            feels_like = self.feels_like[start:end]
+            days.append(
+                DailyForecast(
+                    date=EPOCH + datetime.timedelta(days=day),
+                    temp_min=min(temp) / 100,
+                    temp_max=max(temp) / 100,
+                    temp_mean=round(sum(temp) / len(temp)) / 100,
+                    feels_like_mean=round(sum(feels_like) / len(feels_like)) / 100,
+                    wind_speed_max=max(self.wind_speed[start:end]) / 100,
+                    pop_max=max(self.pop[start:end]) / 100,
+                )
+            )
+            start = end
+        return days
+
+    def as_dict(self) -> dict[str, Any]:
+        """Columns in API units and daily aggregates, for JSON responses."""
+        return {
+            "time": list(self.time),
+            **{
+                name: [value / 100 for value in getattr(self, name)]
+                for name in self.COLUMNS[1:]
+            },
+            "tz_offset": self.tz_offset,
+            "timezone": self.timezone,
+            "fetched_at": self.fetched_at,
+            "daily": [asdict(day) for day in self.daily()],
+        }
+
+    def to_bytes(self) -> bytes:
+        header = self._HEADER.pack(
+            self._MAGIC, self.fetched_at, self.tz_offset, len(self.time)
+        )
+        return header + b"".join(
+            _little_endian(getattr(self, name)) for name in self.COLUMNS
+        )
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "Forecast":
+        _, fetched_at, tz_offset, length = cls._HEADER.unpack_from(raw)
+        columns = {}
+        offset = cls._HEADER.size
+        for name in cls.COLUMNS:
+            column = array("q" if name == "time" else "i")
+            end = offset + length * column.itemsize
+            column.frombytes(raw[offset:end])
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns[name] = column
+            offset = end
+        return cls(**columns, tz_offset=tz_offset, fetched_at=fetched_at)
+
+    @classmethod
+    def is_packed(cls, raw: Any) -> bool:
+        return isinstance(raw, bytes) and raw[:2] == cls._MAGIC
+
+
+# Types of values that RecordCodec packs.
+RECORD_TYPES = (WeatherRecord, Forecast)
+
+
+class RecordCodec:
+    """Codec of TieredCache that packs weather records for the shared cache.
+
+    Other values are stored as they are.
+    """
+
+    def dumps(self, value: Any) -> Any:
+        return value.to_bytes() if isinstance(value, RECORD_TYPES) else value
+
+    def loads(self, raw: Any) -> Any:
+        for record_type in RECORD_TYPES:
+            if record_type.is_packed(raw):
+                return record_type.from_bytes(raw)
+        return raw
+
+
+def _hundredths(values: Any) -> array:
+    return array("i", (round(value * 100) for value in values))
+
+
+def _little_endian(column: array) -> bytes:
+    """Bytes of a column in the byte order of the other packed fields."""
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def get_weather_icon_url(icon_code: str) -> str:
+    """Weather Icon URL Generation."""
+    return f"https://openweathermap.org/img/wn/{icon_code}@2x.png"
+
+
+def format_timezone(seconds: int) -> str:
+    """Formatting the time zone."""
+    hours = seconds // 3600
+    return f"UTC+{hours}" if hours >= 0 else f"UTC{hours}"
@@ -1,26 +1,76 @@
+import asyncio
+import hashlib
 import logging
-from typing import Any
+import math
+import os
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Awaitable, Callable, Iterable
+from functools import partial
+from typing import Any, Protocol, TypeVar
 
+import httpx
 import requests
-from django.core.cache import cache
+from requests.adapters import HTTPAdapter
 
+from .cache import AsyncSingleFlight, LocalTTLCache, SingleFlight, TieredCache
 from .exceptions import (
+    WeatherAPIDeadlineError,
     WeatherAPITimeoutError,
     WeatherAPIConnectionError,
     WeatherAPIError,
     WeatherAPIInvalidRequestError,
     WeatherAPINoLocationsError,
+    WeatherAPIRateLimitError,
 )
+from .breaker import CircuitBreaker
+from .gazetteer import Gazetteer
+from .geoindex import GeoPrefixIndex, normalize_query
+from .ratelimit import RateLimiter, background_priority
+from .records import Forecast, RecordCodec, WeatherRecord
 
 logger = logging.getLogger("weather")
 
+T = TypeVar("T")
+
+# Errors that mean the API is down; they open the circuit breaker.
+OUTAGE_ERRORS = (WeatherAPITimeoutError, WeatherAPIConnectionError)
+# httpx errors of a GET worth retrying.
+RETRY_TRANSPORT_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.RemoteProtocolError,
+)
+# Errors after which stale weather is better than no weather.
+UNAVAILABLE_ERRORS = (
+    WeatherAPITimeoutError,
+    WeatherAPIConnectionError,
+    WeatherAPIRateLimitError,
+)
+
+
+class Recorder(Protocol):
+    """Receives the weather fetched from OpenWeather, see weather.history."""
+
+    def record(
+        self, lat: float, lon: float, observed_at: int, record: WeatherRecord
+    ) -> None: ...
+
 
 class WeatherAPIExceptionHandler:
-    """Common Exception Handling."""
+    """Common Exception Handling.
+
+    Timeouts and connection errors are reported to the client's circuit
+    breaker, which fails calls fast while the API is down. A call that ran
+    out of its own deadline is not.
+    """
 
     @staticmethod
     def handle_exceptions(func):  # type: ignore
-        def wrapper(*args: Any, **kwargs: Any) -> Any:
+        def translate(*args: Any, **kwargs: Any) -> Any:
             try:
                 return func(*args, **kwargs)
             except requests.exceptions.Timeout as e:
@@ -30,92 +80,270 @@ class WeatherAPIExceptionHandler:
                 logger.error(f"Connection error: {str(e)}")
                 raise WeatherAPIConnectionError("Network problem")
             except requests.exceptions.HTTPError as e:
+                if e.response is None:
+                    logger.error(f"HTTP error: {str(e)}")
+                    raise WeatherAPIInvalidRequestError("API error")
                 logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
+                if e.response.status_code == 429:
+                    raise WeatherAPIRateLimitError("API quota exceeded")
                 raise WeatherAPIInvalidRequestError(
                     f"API error: {e.response.status_code}"
                 )
+            except WeatherAPIError:
+                raise
             except Exception as e:
                 logger.error(f"Unexpected error: {str(e)}", exc_info=True)
                 raise WeatherAPIError("Internal service error") from e
 
+        def wrapper(client: "BaseWeatherApiClient", *args: Any, **kwargs: Any) -> Any:
+            breaker = client.circuit_breaker
+            if breaker is None:
+                return translate(client, *args, **kwargs)
+
+            probe = breaker.before_call()
+            try:
+                result = translate(client, *args, **kwargs)
+            except WeatherAPIDeadlineError:
+                breaker.release(probe)
+                raise
+            except OUTAGE_ERRORS:
+                breaker.record_failure(probe)
+                raise
+            except BaseException:
+                breaker.release(probe)
+                raise
+            breaker.record_success(probe)
+            return result
+
         return wrapper
 
+    @staticmethod
+    def handle_async_exceptions(func):  # type: ignore
+        async def translate(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await func(*args, **kwargs)
+            except httpx.TimeoutException as e:
+                logger.error(f"Timeout: {str(e)}")
+                raise WeatherAPITimeoutError("Service timeout")
+            except httpx.TransportError as e:
+                logger.error(f"Connection error: {str(e)}")
+                raise WeatherAPIConnectionError("Network problem")
+            except httpx.HTTPStatusError as e:
+                logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
+                if e.response.status_code == 429:
+                    raise WeatherAPIRateLimitError("API quota exceeded")
+                raise WeatherAPIInvalidRequestError(
+                    f"API error: {e.response.status_code}"
+                )
+            except WeatherAPIError:
+                raise
+            except Exception as e:
+                logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+                raise WeatherAPIError("Internal service error") from e
+
+        async def wrapper(
+            client: "BaseWeatherApiClient", *args: Any, **kwargs: Any
+        ) -> Any:
+            breaker = client.circuit_breaker
+            if breaker is None:
+                return await translate(client, *args, **kwargs)
+
+            probe = await breaker.abefore_call()
+            try:
+                result = await translate(client, *args, **kwargs)
+            except WeatherAPIDeadlineError:
+                await breaker.arelease(probe)
+                raise
+            except OUTAGE_ERRORS:
+                await breaker.arecord_failure(probe)
+                raise
+            except BaseException:
+                await breaker.arelease(probe)
+                raise
+            await breaker.arecord_success(probe)
+            return result
+
+        return wrapper
+
+
+class BaseWeatherApiClient:
+    """Request building and response processing shared by both clients."""
 
-class WeatherApiClient:
     BASE_URL = "https://api.openweathermap.org/"
-    TIMEOUT = 5
+    CONNECT_TIMEOUT = 3.05
+    READ_TIMEOUT = 5
     DEFAULT_CACHE_TTL = 60 * 60  # Caching for 1 hour.
+    WEATHER_CACHE_TTL = 15 * 60  # Weather is fresh for 15 minutes,
+    WEATHER_STALE_TTL = 60 * 60  # and may be served stale for an hour.
+    FORECAST_CACHE_TTL = 60 * 60  # Forecasts change every 3 hours at most,
+    FORECAST_STALE_TTL = 6 * 60 * 60  # so a stale one is useful for longer.
+    POOL_SIZE = 10
+    MAX_RETRIES = 0
+    LOCAL_CACHE_SIZE = 1024
+    LOCAL_CACHE_TTL = 60
+    COORD_PRECISION: int | None = None
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    RETRY_BACKOFF = 0.3
+    RETRY_BACKOFF_MAX = 5.0
 
-    def __init__(self, api_key: str, use_cache: bool = False) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        use_cache: bool = False,
+        pool_size: int = POOL_SIZE,
+        max_retries: int = MAX_RETRIES,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        local_cache_size: int = LOCAL_CACHE_SIZE,
+        local_cache_ttl: int = LOCAL_CACHE_TTL,
+        coord_precision: int | None = COORD_PRECISION,
+        weather_ttl: int = WEATHER_CACHE_TTL,
+        weather_stale_ttl: int = WEATHER_STALE_TTL,
+        forecast_ttl: int = FORECAST_CACHE_TTL,
+        forecast_stale_ttl: int = FORECAST_STALE_TTL,
+        background_refresh: bool = False,
+        rate_limit: int | None = None,
+        rate_limit_reserve: int = 0,
+        breaker_threshold: int = 0,
+        breaker_cooldown: int = 30,
+        gazetteer_path: str | None = None,
+        recorder: Recorder | None = None,
+    ) -> None:
         self.api_key = api_key
         self.use_cache = use_cache
-        logger.info("Initialized WeatherApiClient with  use_cache=%s", use_cache)
-
-    @WeatherAPIExceptionHandler.handle_exceptions
-    def _make_request(self, endpoint: str, params: dict) -> dict:
-        """The base method for executing queries."""
-        url = f"{self.BASE_URL}{endpoint}"
-        logger.debug("Executing a query to %s with parameters: %s", url, params)
-        response = requests.get(url, params=params, timeout=self.TIMEOUT)
-        response.raise_for_status()
-        logger.debug(
-            "Received a response from %s: status %s", url, response.status_code
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.cache = TieredCache(
+            LocalTTLCache(local_cache_size, local_cache_ttl), codec=RecordCodec()
         )
-        return response.json()
+        self.coord_precision = coord_precision
+        self.weather_ttl = weather_ttl
+        self.weather_stale_ttl = max(weather_stale_ttl, weather_ttl)
+        self.forecast_ttl = forecast_ttl
+        self.forecast_stale_ttl = max(forecast_stale_ttl, forecast_ttl)
+        self.background_refresh = background_refresh
+        self.rate_limiter = (
+            RateLimiter(
+                rate_limit, reserve=rate_limit_reserve, shared=self.cache.shared
+            )
+            if rate_limit
+            else None
+        )
+        self.circuit_breaker = (
+            CircuitBreaker(
+                breaker_threshold,
+                breaker_cooldown,
+                probe_timeout=int(self.connect_timeout + self.read_timeout) * 2,
+                shared=self.cache.shared,
+            )
+            if breaker_threshold
+            else None
+        )
+        self.geo_index = GeoPrefixIndex(self.cache.shared)
+        self.gazetteer = Gazetteer(gazetteer_path) if gazetteer_path else None
+        self.recorder = recorder
+        logger.info("Initialized %s with  use_cache=%s", type(self).__name__, use_cache)
 
-    def _get_cached_data(self, cache_key: str) -> Any | None:
-        """Retrieving data from the cache."""
-        return cache.get(cache_key) if self.use_cache else None
+    def _single_flight_timeouts(self) -> dict[str, Any]:
+        """SingleFlight timeouts that outlast the slowest API call.
 
-    def _set_cached_data(
-        self, cache_key: str, data: Any, ttl: int | None = None
-    ) -> None:
-        """Saving data to cache."""
-        if self.use_cache:
-            cache.set(cache_key, data, ttl or self.DEFAULT_CACHE_TTL)
+        A call makes up to ``max_retries + 1`` attempts, each waiting for the
+        rate limiter and then up to the connect and read timeouts, with at
+        most ``RETRY_BACKOFF_MAX`` between them.
+        """
+        limiter_wait = self.rate_limiter.max_wait if self.rate_limiter else 0
+        attempt = limiter_wait + self.connect_timeout + self.read_timeout
+        longest = (self.max_retries + 1) * attempt
+        longest += self.max_retries * self.RETRY_BACKOFF_MAX
+        return {"wait_timeout": longest, "lock_timeout": math.ceil(longest) + 1}
 
-    def search_locations_by_name(
-        self, location_name: str, limit: int = 6, lang: str = "rus"
-    ) -> list[dict]:
-        """Search for locations by name."""
-        logger.info("Location Search: %s", location_name)
-        cache_key = f"geo_{location_name}_{limit}_{lang}"
-        if cached := self._get_cached_data(cache_key):
-            logger.debug("Returning cached locations data")
-            return cached
+    def _deadline(self, timeout: float | None) -> float | None:
+        """``time.monotonic()`` deadline of a call given its time budget."""
+        return time.monotonic() + timeout if timeout is not None else None
+
+    def _attempt_timeout(self, deadline: float | None) -> tuple[float, float]:
+        """Connect and read timeouts of one attempt, cut down to the deadline."""
+        if deadline is None:
+            return self.connect_timeout, self.read_timeout
+        remaining = deadline - time.monotonic()
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    def _retry_delay(
+        self, attempt: int, retry_after: str | None, deadline: float | None
+    ) -> float | None:
+        """Pause before the next attempt, None if the request must not be retried.
+
+        ``Retry-After`` in seconds is honored up to ``RETRY_BACKOFF_MAX``, a
+        longer one is not waited for. Otherwise the pause grows exponentially
+        with full jitter so that workers do not retry in step.
+        """
+        if attempt >= self.max_retries:
+            return None
+        try:
+            delay = float(retry_after) if retry_after else None
+        except ValueError:
+            delay = None
+        if delay is None:
+            backoff = min(self.RETRY_BACKOFF * 2**attempt, self.RETRY_BACKOFF_MAX)
+            delay = random.uniform(0, backoff)
+        elif delay > self.RETRY_BACKOFF_MAX:
+            return None
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        return max(delay, 0.0)
+
+    def _geo_cache_key(self, location_name: str, limit: int, lang: str) -> str:
+        """Key of a query; it holds the key of the result, see _geo_result_key."""
+        return f"geo_q_{normalize_query(location_name)}_{limit}_{lang}"
+
+    def _geo_result_key(self, locations: list[dict[str, Any]], lang: str) -> str:
+        """Key of a geocoding result derived from its coordinates.
 
-        params = {
-            "q": location_name,
+        Queries that find the same places, like "Moscow" and "Москва", point
+        to one cached result instead of keeping a copy each.
+        """
+        coords = sorted(f"{loc['lat']:.4f},{loc['lon']:.4f}" for loc in locations)
+        digest = hashlib.sha1(";".join(coords).encode()).hexdigest()
+        return f"geo_r_{lang}_{digest}"
+
+    def _geo_params(self, location_name: str, limit: int, lang: str) -> dict:
+        return {
+            "q": normalize_query(location_name),
             "limit": limit,
             "appid": self.api_key,
             "lang": lang,
         }
 
-        data = self._make_request("geo/1.0/direct", params)
-        logger.debug("Location data received: %s", data)
+    def _weather_cache_key(self, lat: float, lon: float, units: str, lang: str) -> str:
+        return f"weather_v{WeatherRecord.VERSION}_{lat}_{lon}_{units}_{lang}"
 
-        if not data:
-            logger.warning("Locations not found for the request: %s", location_name)
-            raise WeatherAPINoLocationsError("No locations found")
+    def _forecast_cache_key(self, lat: float, lon: float, units: str) -> str:
+        # Forecasts keep no descriptions, so one entry serves all languages.
+        return f"forecast_v{Forecast.VERSION}_{lat}_{lon}_{units}"
 
-        data = self._deduplicate_locations(data)
+    def quantize(self, lat: float, lon: float) -> tuple[float, float]:
+        """Snap coordinates to the cache grid so nearby points share one entry."""
+        if self.coord_precision is None:
+            return lat, lon
+        return quantize_coordinates(lat, lon, self.coord_precision)
 
-        data = self._check_local_name(data)
+    def _weather_batch_keys(
+        self, coords: Iterable[tuple[float, float]], units: str, lang: str
+    ) -> tuple[dict[tuple[float, float], str], dict[str, tuple[float, float]]]:
+        """Cache keys of the given coordinates and the grid point of each key."""
+        coord_keys = {}
+        points = {}
+        for lat, lon in coords:
+            point = self.quantize(lat, lon)
+            cache_key = self._weather_cache_key(*point, units, lang)
+            coord_keys[(lat, lon)] = cache_key
+            points[cache_key] = point
+        return coord_keys, points
 
-        self._set_cached_data(cache_key, data)
-        return data
-
-    def get_current_weather(
-        self, lat: float, lon: float, units: str = "metric", lang: str = "ru"
-    ) -> dict[str, Any]:
-        """Get current weather by coordinates."""
-        logger.info("Weather request for coordinates:  lat=%s, lon=%s", lat, lon)
-        cache_key = f"weather_{lat}_{lon}_{units}_{lang}"
-        if cached := self._get_cached_data(cache_key):
-            logger.debug("Returning cached weather data")
-            return cached
-
-        params = {
+    def _weather_params(self, lat: float, lon: float, units: str, lang: str) -> dict:
+        return {
             "lat": lat,
             "lon": lon,
             "appid": self.api_key,
@@ -123,22 +351,84 @@ class WeatherApiClient:
             "lang": lang,
         }
 
-        data = self._make_request("data/2.5/weather", params)
-        enriched_data = self._enrich_weather_data(data)
+    def _forecast_params(self, lat: float, lon: float, units: str) -> dict:
+        return {"lat": lat, "lon": lon, "appid": self.api_key, "units": units}
 
-        self._set_cached_data(cache_key, enriched_data, 15 * 60)  # 15 минут для погоды
-        return enriched_data
+    def _search_gazetteer(self, location_name: str, limit: int) -> list[dict] | None:
+        """Locations from the offline gazetteer, None if it does not know them."""
+        if self.gazetteer is None:
+            return None
+        if not (data := self.gazetteer.find(location_name)):
+            return None
+        logger.debug("Returning locations from the gazetteer")
+        return self._check_local_name(self._deduplicate_locations(data))[:limit]
+
+    def _complete(self, prefix: str, limit: int) -> list[dict]:
+        """Indexed locations starting with ``prefix``, topped up from the gazetteer."""
+        found = {
+            (loc["lat"], loc["lon"]): loc
+            for loc in self.geo_index.search(prefix, limit)
+        }
+        if self.gazetteer is not None and len(found) < limit:
+            for loc in self.gazetteer.complete(prefix, limit):
+                found.setdefault((loc["lat"], loc["lon"]), loc)
+        return list(found.values())[:limit]
+
+    def _process_locations(
+        self, data: list[dict[str, Any]], location_name: str
+    ) -> list[dict[str, Any]]:
+        """Validate the geocoding response and normalize its entries."""
+        logger.debug("Location data received: %s", data)
 
-    def _enrich_weather_data(self, data: dict[str, Any]) -> dict[str, Any]:
-        """Add additional calculated fields."""
         if not data:
-            return None  # type: ignore
+            logger.warning("Locations not found for the request: %s", location_name)
+            raise WeatherAPINoLocationsError("No locations found")
 
-        return {
-            **data,
-            "icon_url": get_weather_icon_url(data["weather"][0]["icon"]),
-            "timezone": format_timezone(data["timezone"]),
-        }
+        data = self._deduplicate_locations(data)
+
+        return self._check_local_name(data)
+
+    def _enrich_weather_data(self, data: dict[str, Any]) -> WeatherRecord:
+        """Keep the fields of a weather response that the pages show."""
+        return WeatherRecord.from_api(data, fetched_at=time.time())
+
+    def _record_observation(
+        self, lat: float, lon: float, units: str, data: dict, record: WeatherRecord
+    ) -> None:
+        """Pass fetched weather to the recorder, the archive is in metric units."""
+        if self.recorder is not None and units == "metric":
+            self.recorder.record(lat, lon, data["dt"], record)
+
+    def _is_stale(self, data: WeatherRecord | Forecast, ttl: int | None = None) -> bool:
+        """Whether cached data is older than the soft TTL, of weather by default."""
+        return time.time() - data.fetched_at > (ttl or self.weather_ttl)
+
+    def _refreshed_elsewhere(self, cache_key: str, shared: Any | None) -> bool:
+        """Whether another worker has refreshed the shared weather entry.
+
+        The fresh entry then replaces the stale one in the local tier.
+        """
+        if shared is None or self._is_stale(shared):
+            return False
+        logger.debug("%s was refreshed by another worker", cache_key)
+        self.cache.local.set(cache_key, shared, self.weather_stale_ttl)
+        return True
+
+    def _cached_weather(
+        self, data: WeatherRecord | None, fresh_only: bool
+    ) -> WeatherRecord | None:
+        if data is None or (fresh_only and self._is_stale(data)):
+            return None
+        return data
+
+    def _stale_or_error(
+        self, cached: WeatherRecord | None, error: WeatherAPIError
+    ) -> WeatherRecord | WeatherAPIError:
+        """Stale weather when the API is unreachable, the error otherwise."""
+        if cached and isinstance(error, UNAVAILABLE_ERRORS):
+            logger.warning("Weather API unavailable, serving stale data: %s", error)
+            return cached
+        return error
 
     def _check_local_name(
         self, data: list[dict[str, Any]], lang: str = "ru"
@@ -167,12 +457,827 @@ class WeatherApiClient:
         return unique_locations
 
 
-def get_weather_icon_url(icon_code: str) -> str:
-    """Weather Icon URL Generation."""
-    return f"https://openweathermap.org/img/wn/{icon_code}@2x.png"
+class WeatherApiClient(BaseWeatherApiClient):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._session: requests.Session | None = None
+        self._session_lock = threading.Lock()
+        self.single_flight = SingleFlight(
+            self.cache.shared, **self._single_flight_timeouts()
+        )
+        self._refresh_executor: ThreadPoolExecutor | None = None
+        self._refreshing: set[str] = set()
+        self._refresh_lock = threading.Lock()
+        _clients.add(self)
+
+    @property
+    def session(self) -> requests.Session:
+        """Keep-alive session shared by all threads using this client."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self) -> requests.Session:
+        """Session with a connection pool, retries are made by _make_request."""
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        logger.debug("Created HTTP session with pool_size=%s", self.pool_size)
+        return session
+
+    def _reset_after_fork(self) -> None:
+        """Drop the parent's connections so a forked worker opens its own."""
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.single_flight = SingleFlight(
+            self.cache.shared, **self._single_flight_timeouts()
+        )
+        self._refresh_executor = None
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+
+    @WeatherAPIExceptionHandler.handle_exceptions
+    def _make_request(
+        self, endpoint: str, params: dict, deadline: float | None = None
+    ) -> dict:
+        """The base method for executing queries.
+
+        Connection errors and retryable statuses are retried with backoff
+        until ``max_retries`` or the ``time.monotonic()`` deadline is reached.
+        """
+        url = f"{self.BASE_URL}{endpoint}"
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            logger.debug("Executing a query to %s with parameters: %s", url, params)
+            timeout = self._attempt_timeout(deadline)
+            if min(timeout) <= 0:
+                raise WeatherAPIDeadlineError("Request deadline exceeded")
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except requests.exceptions.ConnectionError:
+                if (delay := self._retry_delay(attempt, None, deadline)) is None:
+                    raise
+            else:
+                if response.status_code not in self.RETRY_STATUSES:
+                    break
+                retry_after = response.headers.get("Retry-After")
+                if (delay := self._retry_delay(attempt, retry_after, deadline)) is None:
+                    break
+            attempt += 1
+            logger.info("Retrying %s in %.2fs, attempt %s", url, delay, attempt)
+            time.sleep(delay)
+
+        response.raise_for_status()
+        logger.debug(
+            "Received a response from %s: status %s", url, response.status_code
+        )
+        return response.json()
+
+    def _get_cached_data(self, cache_key: str, ttl: int | None = None) -> Any | None:
+        """Retrieving data from the cache."""
+        if not self.use_cache:
+            return None
+        return self.cache.get(cache_key, ttl or self.DEFAULT_CACHE_TTL)
+
+    def _set_cached_data(
+        self, cache_key: str, data: Any, ttl: int | None = None
+    ) -> None:
+        """Saving data to cache."""
+        if self.use_cache:
+            self.cache.set(cache_key, data, ttl or self.DEFAULT_CACHE_TTL)
+
+    def _get_many_cached_data(self, cache_keys: list[str], ttl: int) -> dict[str, Any]:
+        if not self.use_cache:
+            return {}
+        return self.cache.get_many(cache_keys, ttl)
+
+    def search_locations_by_name(
+        self, location_name: str, limit: int = 6, lang: str = "rus"
+    ) -> list[dict]:
+        """Search for locations by name."""
+        logger.info("Location Search: %s", location_name)
+        if found := self._search_gazetteer(location_name, limit):
+            return found
+        cache_key = self._geo_cache_key(location_name, limit, lang)
+        if cached := self._get_cached_locations(cache_key):
+            logger.debug("Returning cached locations data")
+            return cached
+
+        return self._load(
+            cache_key,
+            lambda: self._fetch_locations(cache_key, location_name, limit, lang),
+            lambda: self._get_cached_locations(cache_key),
+        )
+
+    def _get_cached_locations(self, cache_key: str) -> list[dict] | None:
+        if result_key := self._get_cached_data(cache_key):
+            return self._get_cached_data(result_key)
+        return None
+
+    def _fetch_locations(
+        self, cache_key: str, location_name: str, limit: int, lang: str
+    ) -> list[dict]:
+        params = self._geo_params(location_name, limit, lang)
+        data = self._make_request("geo/1.0/direct", params)
+        data = self._process_locations(data, location_name)
+
+        result_key = self._geo_result_key(data, lang)
+        self._set_cached_data(result_key, data)
+        self._set_cached_data(cache_key, result_key)
+        self._index_locations(data)
+        return data
+
+    def _index_locations(self, locations: list[dict]) -> None:
+        """Make geocoding results available to autocomplete in all workers.
+
+        They are shared through the cache in the background, the response
+        does not wait for it.
+        """
+        if self.geo_index.add(locations) and self.use_cache:
+            self._background_executor().submit(self._save_geo_index)
+
+    def _save_geo_index(self) -> None:
+        try:
+            self.geo_index.save()
+        except Exception as e:
+            logger.warning("Saving the geo prefix index failed: %s", e)
+
+    def autocomplete(self, prefix: str, limit: int = 6) -> list[dict]:
+        """Known locations whose name starts with ``prefix``, without the API."""
+        if self.use_cache:
+            self.geo_index.reload()
+        return self._complete(prefix, limit)
+
+    def get_current_weather(
+        self,
+        lat: float,
+        lon: float,
+        units: str = "metric",
+        lang: str = "ru",
+        timeout: float | None = None,
+    ) -> WeatherRecord:
+        """Get current weather by coordinates within ``timeout`` seconds."""
+        logger.info("Weather request for coordinates:  lat=%s, lon=%s", lat, lon)
+        lat, lon = self.quantize(lat, lon)
+        cache_key = self._weather_cache_key(lat, lon, units, lang)
+        cached = self._get_cached_data(cache_key, self.weather_stale_ttl)
+        if cached and not self._is_stale(cached):
+            logger.debug("Returning cached weather data")
+            return cached
+
+        deadline = self._deadline(timeout)
+
+        def fetch() -> WeatherRecord:
+            return self._fetch_current_weather(
+                cache_key, lat, lon, units, lang, deadline
+            )
+
+        if not cached:
+            return self._load(cache_key, fetch)
+
+        if self.background_refresh:
+            logger.debug("Returning stale weather data, refreshing %s", cache_key)
+            self._refresh_in_background(
+                cache_key,
+                partial(self._fetch_current_weather, cache_key, lat, lon, units, lang),
+            )
+            return cached
+
+        try:
+            return self._load(cache_key, fetch)
+        except UNAVAILABLE_ERRORS:
+            logger.warning("Weather API unavailable, serving stale %s", cache_key)
+            return cached
+
+    def get_cached_weather(
+        self, lat: float, lon: float, units: str = "metric", lang: str = "ru"
+    ) -> WeatherRecord | None:
+        """Cached weather by coordinates, even if stale; never calls the API."""
+        lat, lon = self.quantize(lat, lon)
+        cache_key = self._weather_cache_key(lat, lon, units, lang)
+        return self._get_cached_data(cache_key, self.weather_stale_ttl)
+
+    def get_cached_weather_many(
+        self,
+        coords: Iterable[tuple[float, float]],
+        units: str = "metric",
+        lang: str = "ru",
+        fresh_only: bool = False,
+    ) -> dict[tuple[float, float], WeatherRecord | None]:
+        """Cached weather for many coordinates; never calls the API."""
+        coord_keys, points = self._weather_batch_keys(coords, units, lang)
+        cached = self._get_many_cached_data(list(points), self.weather_stale_ttl)
+        return {
+            coord: self._cached_weather(cached.get(cache_key), fresh_only)
+            for coord, cache_key in coord_keys.items()
+        }
+
+    def refresh_current_weather(
+        self, lat: float, lon: float, units: str = "metric", lang: str = "ru"
+    ) -> WeatherRecord:
+        """Fetch weather by coordinates from the API and update the cache."""
+        lat, lon = self.quantize(lat, lon)
+        cache_key = self._weather_cache_key(lat, lon, units, lang)
+        return self._load(
+            cache_key,
+            lambda: self._fetch_current_weather(cache_key, lat, lon, units, lang),
+        )
+
+    def get_current_weather_many(
+        self,
+        coords: Iterable[tuple[float, float]],
+        units: str = "metric",
+        lang: str = "ru",
+        max_workers: int = 8,
+        timeout: float | None = None,
+    ) -> dict[tuple[float, float], WeatherRecord | WeatherAPIError]:
+        """Get current weather for many coordinates at once.
+
+        The cache is read with one round trip and only the misses reach the
+        API, concurrently, all within ``timeout`` seconds.
+        Results are keyed by the given coordinates; a point that failed maps
+        to its WeatherAPIError.
+        """
+        deadline = self._deadline(timeout)
+        coord_keys, points = self._weather_batch_keys(coords, units, lang)
+        cached = self._get_many_cached_data(list(points), self.weather_stale_ttl)
+        results: dict[str, WeatherRecord | WeatherAPIError] = {}
+        missing = []
+        for cache_key, (lat, lon) in points.items():
+            data = cached.get(cache_key)
+            if data and not self._is_stale(data):
+                results[cache_key] = data
+            elif data and self.background_refresh:
+                fetch = partial(
+                    self._fetch_current_weather, cache_key, lat, lon, units, lang
+                )
+                self._refresh_in_background(cache_key, fetch)
+                results[cache_key] = data
+            else:
+                missing.append(cache_key)
+
+        if missing:
+            logger.info(
+                "Fetching weather for %s of %s points", len(missing), len(points)
+            )
+            # Each entry is stored by its load, before the lock of the key is
+            # released, so that workers waiting for it find it.
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(missing))
+            ) as executor:
+                futures = {
+                    cache_key: executor.submit(
+                        self._load,
+                        cache_key,
+                        partial(
+                            self._fetch_current_weather,
+                            cache_key,
+                            *points[cache_key],
+                            units,
+                            lang,
+                            deadline,
+                        ),
+                    )
+                    for cache_key in missing
+                }
+                for cache_key, future in futures.items():
+                    try:
+                        results[cache_key] = future.result()
+                    except WeatherAPIError as e:
+                        results[cache_key] = self._stale_or_error(
+                            cached.get(cache_key), e
+                        )
+
+        return {coord: results[cache_key] for coord, cache_key in coord_keys.items()}
+
+    def _fetch_current_weather(
+        self,
+        cache_key: str,
+        lat: float,
+        lon: float,
+        units: str,
+        lang: str,
+        deadline: float | None = None,
+    ) -> WeatherRecord:
+        enriched_data = self._request_current_weather(lat, lon, units, lang, deadline)
+        self._set_cached_data(cache_key, enriched_data, self.weather_stale_ttl)
+        return enriched_data
+
+    def _request_current_weather(
+        self,
+        lat: float,
+        lon: float,
+        units: str,
+        lang: str,
+        deadline: float | None = None,
+    ) -> WeatherRecord:
+        params = self._weather_params(lat, lon, units, lang)
+        data = self._make_request("data/2.5/weather", params, deadline)
+        record = self._enrich_weather_data(data)
+        self._record_observation(lat, lon, units, data, record)
+        return record
+
+    def get_forecast(
+        self,
+        lat: float,
+        lon: float,
+        units: str = "metric",
+        timeout: float | None = None,
+    ) -> Forecast:
+        """Get the 5 day forecast in 3 hour steps within ``timeout`` seconds."""
+        logger.info("Forecast request for coordinates: lat=%s, lon=%s", lat, lon)
+        lat, lon = self.quantize(lat, lon)
+        cache_key = self._forecast_cache_key(lat, lon, units)
+        cached = self._get_cached_data(cache_key, self.forecast_stale_ttl)
+        if cached is not None and not self._is_stale(cached, self.forecast_ttl):
+            logger.debug("Returning cached forecast")
+            return cached
+
+        deadline = self._deadline(timeout)
+        try:
+            return self._load(
+                cache_key,
+                lambda: self._fetch_forecast(cache_key, lat, lon, units, deadline),
+            )
+        except UNAVAILABLE_ERRORS:
+            if cached is None:
+                raise
+            logger.warning("Weather API unavailable, serving stale %s", cache_key)
+            return cached
+
+    def _fetch_forecast(
+        self,
+        cache_key: str,
+        lat: float,
+        lon: float,
+        units: str,
+        deadline: float | None = None,
+    ) -> Forecast:
+        params = self._forecast_params(lat, lon, units)
+        data = self._make_request("data/2.5/forecast", params, deadline)
+        forecast = Forecast.from_api(data, fetched_at=time.time())
+        self._set_cached_data(cache_key, forecast, self.forecast_stale_ttl)
+        return forecast
+
+    def _background_executor(self) -> ThreadPoolExecutor:
+        """Threads of the work that responses do not wait for."""
+        with self._refresh_lock:
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix="weather-refresh"
+                )
+            return self._refresh_executor
+
+    def _refresh_in_background(self, cache_key: str, fetch: Callable[[], Any]) -> None:
+        """Schedule one refresh per key, failures keep the stale entry.
+
+        Nothing is fetched if another worker has already refreshed the entry.
+        """
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        def refresh() -> None:
+            try:
+                # The local copy may be stale while the shared one is not.
+                if self.use_cache and self._refreshed_elsewhere(
+                    cache_key, self.cache.get_shared(cache_key)
+                ):
+                    return
+                with background_priority():
+                    self._load(cache_key, fetch)
+            except WeatherAPIError as e:
+                logger.warning("Background refresh of %s failed: %s", cache_key, e)
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(cache_key)
+
+        self._background_executor().submit(refresh)
+
+    def _load(
+        self,
+        cache_key: str,
+        fetch: Callable[[], T],
+        lookup: Callable[[], T | None] | None = None,
+    ) -> T:
+        """Fetch a missing entry once however many callers are waiting for it.
+
+        ``lookup`` reads the entry another worker stored, by default it is
+        the value of ``cache_key`` in the shared cache.
+        """
+        if not self.use_cache:
+            lookup = None
+        elif lookup is None:
+            lookup = partial(self.cache.get_shared, cache_key)
+        return self.single_flight.do(cache_key, fetch, lookup)
+
+
+class AsyncWeatherApiClient(BaseWeatherApiClient):
+    """Coroutine twin of WeatherApiClient for async views.
+
+    httpx connection pools are bound to the event loop they were opened in,
+    so one ``httpx.AsyncClient`` is kept per running loop.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._http_clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+        self.single_flight = AsyncSingleFlight(
+            self.cache.shared, **self._single_flight_timeouts()
+        )
+        self._refresh_tasks: dict[str, asyncio.Task] = {}
+        self._background_tasks: set[asyncio.Task] = set()
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Keep-alive client for the current event loop."""
+        loop = asyncio.get_running_loop()
+        if (client := self._http_clients.get(loop)) is None or client.is_closed:
+            client = self._create_http_client()
+            self._http_clients[loop] = client
+        return client
+
+    def _create_http_client(self) -> httpx.AsyncClient:
+        """Async client with a connection pool, retries are made by _make_request."""
+        logger.debug("Created async HTTP client with pool_size=%s", self.pool_size)
+        return httpx.AsyncClient(
+            base_url=self.BASE_URL,
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+            ),
+        )
+
+    async def aclose(self) -> None:
+        """Close the client of the current event loop."""
+        loop = asyncio.get_running_loop()
+        if (client := self._http_clients.pop(loop, None)) is not None:
+            await client.aclose()
+
+    @WeatherAPIExceptionHandler.handle_async_exceptions
+    async def _make_request(
+        self, endpoint: str, params: dict, deadline: float | None = None
+    ) -> Any:
+        """The base method for executing queries, retried like the sync one."""
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire()
+            logger.debug(
+                "Executing a query to %s with parameters: %s", endpoint, params
+            )
+            connect, read = self._attempt_timeout(deadline)
+            if min(connect, read) <= 0:
+                raise WeatherAPIDeadlineError("Request deadline exceeded")
+            try:
+                response = await self.http.get(
+                    endpoint,
+                    params=params,
+                    timeout=httpx.Timeout(read, connect=connect),
+                )
+            except RETRY_TRANSPORT_ERRORS:
+                if (delay := self._retry_delay(attempt, None, deadline)) is None:
+                    raise
+            else:
+                if response.status_code not in self.RETRY_STATUSES:
+                    break
+                retry_after = response.headers.get("Retry-After")
+                if (delay := self._retry_delay(attempt, retry_after, deadline)) is None:
+                    break
+            attempt += 1
+            logger.info("Retrying %s in %.2fs, attempt %s", endpoint, delay, attempt)
+            await asyncio.sleep(delay)
+
+        response.raise_for_status()
+        logger.debug(
+            "Received a response from %s: status %s", endpoint, response.status_code
+        )
+        return response.json()
+
+    async def _get_cached_data(
+        self, cache_key: str, ttl: int | None = None
+    ) -> Any | None:
+        """Retrieving data from the cache."""
+        if not self.use_cache:
+            return None
+        return await self.cache.aget(cache_key, ttl or self.DEFAULT_CACHE_TTL)
+
+    async def _set_cached_data(
+        self, cache_key: str, data: Any, ttl: int | None = None
+    ) -> None:
+        """Saving data to cache."""
+        if self.use_cache:
+            await self.cache.aset(cache_key, data, ttl or self.DEFAULT_CACHE_TTL)
+
+    async def _get_many_cached_data(
+        self, cache_keys: list[str], ttl: int
+    ) -> dict[str, Any]:
+        if not self.use_cache:
+            return {}
+        return await self.cache.aget_many(cache_keys, ttl)
+
+    async def search_locations_by_name(
+        self, location_name: str, limit: int = 6, lang: str = "rus"
+    ) -> list[dict]:
+        """Search for locations by name."""
+        logger.info("Location Search: %s", location_name)
+        if found := self._search_gazetteer(location_name, limit):
+            return found
+        cache_key = self._geo_cache_key(location_name, limit, lang)
+        if cached := await self._get_cached_locations(cache_key):
+            logger.debug("Returning cached locations data")
+            return cached
+
+        return await self._load(
+            cache_key,
+            lambda: self._fetch_locations(cache_key, location_name, limit, lang),
+            lambda: self._get_cached_locations(cache_key),
+        )
+
+    async def _get_cached_locations(self, cache_key: str) -> list[dict] | None:
+        if result_key := await self._get_cached_data(cache_key):
+            return await self._get_cached_data(result_key)
+        return None
+
+    async def _fetch_locations(
+        self, cache_key: str, location_name: str, limit: int, lang: str
+    ) -> list[dict]:
+        params = self._geo_params(location_name, limit, lang)
+        data = await self._make_request("geo/1.0/direct", params)
+        data = self._process_locations(data, location_name)
+
+        result_key = self._geo_result_key(data, lang)
+        await self._set_cached_data(result_key, data)
+        await self._set_cached_data(cache_key, result_key)
+        await self._index_locations(data)
+        return data
+
+    async def _index_locations(self, locations: list[dict]) -> None:
+        if self.geo_index.add(locations) and self.use_cache:
+            task = asyncio.create_task(self._save_geo_index())
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    async def _save_geo_index(self) -> None:
+        try:
+            await self.geo_index.asave()
+        except Exception as e:
+            logger.warning("Saving the geo prefix index failed: %s", e)
+
+    async def autocomplete(self, prefix: str, limit: int = 6) -> list[dict]:
+        if self.use_cache:
+            await self.geo_index.areload()
+        return self._complete(prefix, limit)
+
+    async def get_current_weather(
+        self,
+        lat: float,
+        lon: float,
+        units: str = "metric",
+        lang: str = "ru",
+        timeout: float | None = None,
+    ) -> WeatherRecord:
+        """Get current weather by coordinates within ``timeout`` seconds."""
+        logger.info("Weather request for coordinates:  lat=%s, lon=%s", lat, lon)
+        lat, lon = self.quantize(lat, lon)
+        cache_key = self._weather_cache_key(lat, lon, units, lang)
+        cached = await self._get_cached_data(cache_key, self.weather_stale_ttl)
+        if cached and not self._is_stale(cached):
+            logger.debug("Returning cached weather data")
+            return cached
+
+        deadline = self._deadline(timeout)
+
+        def fetch() -> Awaitable[WeatherRecord]:
+            return self._fetch_current_weather(
+                cache_key, lat, lon, units, lang, deadline
+            )
+
+        if not cached:
+            return await self._load(cache_key, fetch)
+
+        if self.background_refresh:
+            logger.debug("Returning stale weather data, refreshing %s", cache_key)
+            self._refresh_in_background(
+                cache_key,
+                partial(self._fetch_current_weather, cache_key, lat, lon, units, lang),
+            )
+            return cached
+
+        try:
+            return await self._load(cache_key, fetch)
+        except UNAVAILABLE_ERRORS:
+            logger.warning("Weather API unavailable, serving stale %s", cache_key)
+            return cached
+
+    async def get_cached_weather_many(
+        self,
+        coords: Iterable[tuple[float, float]],
+        units: str = "metric",
+        lang: str = "ru",
+        fresh_only: bool = False,
+    ) -> dict[tuple[float, float], WeatherRecord | None]:
+        coord_keys, points = self._weather_batch_keys(coords, units, lang)
+        cached = await self._get_many_cached_data(list(points), self.weather_stale_ttl)
+        return {
+            coord: self._cached_weather(cached.get(cache_key), fresh_only)
+            for coord, cache_key in coord_keys.items()
+        }
+
+    async def get_current_weather_many(
+        self,
+        coords: Iterable[tuple[float, float]],
+        units: str = "metric",
+        lang: str = "ru",
+        timeout: float | None = None,
+    ) -> dict[tuple[float, float], WeatherRecord | WeatherAPIError]:
+        """Get current weather for many coordinates at once."""
+        deadline = self._deadline(timeout)
+        coord_keys, points = self._weather_batch_keys(coords, units, lang)
+        cached = await self._get_many_cached_data(list(points), self.weather_stale_ttl)
+        results: dict[str, WeatherRecord | WeatherAPIError] = {}
+        missing = []
+        for cache_key, (lat, lon) in points.items():
+            data = cached.get(cache_key)
+            if data and not self._is_stale(data):
+                results[cache_key] = data
+            elif data and self.background_refresh:
+                fetch = partial(
+                    self._fetch_current_weather, cache_key, lat, lon, units, lang
+                )
+                self._refresh_in_background(cache_key, fetch)
+                results[cache_key] = data
+            else:
+                missing.append(cache_key)
+
+        if missing:
+            logger.info(
+                "Fetching weather for %s of %s points", len(missing), len(points)
+            )
+            responses = await asyncio.gather(
+                *(
+                    self._load(
+                        cache_key,
+                        partial(
+                            self._fetch_current_weather,
+                            cache_key,
+                            *points[cache_key],
+                            units,
+                            lang,
+                            deadline,
+                        ),
+                    )
+                    for cache_key in missing
+                ),
+                return_exceptions=True,
+            )
+            for cache_key, response in zip(missing, responses):
+                if isinstance(response, WeatherAPIError):
+                    results[cache_key] = self._stale_or_error(
+                        cached.get(cache_key), response
+                    )
+                elif isinstance(response, BaseException):
+                    raise response
+                else:
+                    results[cache_key] = response
+
+        return {coord: results[cache_key] for coord, cache_key in coord_keys.items()}
+
+    async def _fetch_current_weather(
+        self,
+        cache_key: str,
+        lat: float,
+        lon: float,
+        units: str,
+        lang: str,
+        deadline: float | None = None,
+    ) -> WeatherRecord:
+        enriched_data = await self._request_current_weather(
+            lat, lon, units, lang, deadline
+        )
+        await self._set_cached_data(cache_key, enriched_data, self.weather_stale_ttl)
+        return enriched_data
+
+    async def _request_current_weather(
+        self,
+        lat: float,
+        lon: float,
+        units: str,
+        lang: str,
+        deadline: float | None = None,
+    ) -> WeatherRecord:
+        params = self._weather_params(lat, lon, units, lang)
+        data = await self._make_request("data/2.5/weather", params, deadline)
+        record = self._enrich_weather_data(data)
+        self._record_observation(lat, lon, units, data, record)
+        return record
+
+    async def get_forecast(
+        self,
+        lat: float,
+        lon: float,
+        units: str = "metric",
+        timeout: float | None = None,
+    ) -> Forecast:
+        """Get the 5 day forecast in 3 hour steps within ``timeout`` seconds."""
+        logger.info("Forecast request for coordinates: lat=%s, lon=%s", lat, lon)
+        lat, lon = self.quantize(lat, lon)
+        cache_key = self._forecast_cache_key(lat, lon, units)
+        cached = await self._get_cached_data(cache_key, self.forecast_stale_ttl)
+        if cached is not None and not self._is_stale(cached, self.forecast_ttl):
+            logger.debug("Returning cached forecast")
+            return cached
+
+        deadline = self._deadline(timeout)
+        try:
+            return await self._load(
+                cache_key,
+                lambda: self._fetch_forecast(cache_key, lat, lon, units, deadline),
+            )
+        except UNAVAILABLE_ERRORS:
+            if cached is None:
+                raise
+            logger.warning("Weather API unavailable, serving stale %s", cache_key)
+            return cached
+
+    async def _fetch_forecast(
+        self,
+        cache_key: str,
+        lat: float,
+        lon: float,
+        units: str,
+        deadline: float | None = None,
+    ) -> Forecast:
+        params = self._forecast_params(lat, lon, units)
+        data = await self._make_request("data/2.5/forecast", params, deadline)
+        forecast = Forecast.from_api(data, fetched_at=time.time())
+        await self._set_cached_data(cache_key, forecast, self.forecast_stale_ttl)
+        return forecast
+
+    def _refresh_in_background(
+        self, cache_key: str, fetch: Callable[[], Awaitable[Any]]
+    ) -> None:
+        """Schedule one refresh task per key, failures keep the stale entry."""
+        if cache_key in self._refresh_tasks:
+            return
+
+        async def refresh() -> None:
+            try:
+                if self.use_cache and self._refreshed_elsewhere(
+                    cache_key, await self.cache.aget_shared(cache_key)
+                ):
+                    return
+                with background_priority():
+                    await self._load(cache_key, fetch)
+            except WeatherAPIError as e:
+                logger.warning("Background refresh of %s failed: %s", cache_key, e)
+            finally:
+                self._refresh_tasks.pop(cache_key, None)
+
+        self._refresh_tasks[cache_key] = asyncio.create_task(refresh())
+
+    async def _load(
+        self,
+        cache_key: str,
+        fetch: Callable[[], Awaitable[T]],
+        lookup: Callable[[], Awaitable[T | None]] | None = None,
+    ) -> T:
+        """Fetch a missing entry once however many callers are waiting for it."""
+        if not self.use_cache:
+            lookup = None
+        elif lookup is None:
+            lookup = partial(self.cache.aget_shared, cache_key)
+        return await self.single_flight.ado(cache_key, fetch, lookup)
+
+
+_clients: "weakref.WeakSet[WeatherApiClient]" = weakref.WeakSet()
+
+
+def _reset_clients_after_fork() -> None:
+    for client in list(_clients):
+        client._reset_after_fork()
+
+
+os.register_at_fork(after_in_child=_reset_clients_after_fork)
+
 
+def quantize_coordinates(lat: float, lon: float, precision: int) -> tuple[float, float]:
+    """Round coordinates to a grid of ``precision`` decimal places.
 
-def format_timezone(seconds: int) -> str:
-    """Formatting the time zone."""
-    hours = seconds // 3600
-    return f"UTC+{hours}" if hours >= 0 else f"UTC{hours}"
+    Two decimal places give cells of about 1.1 km, which is finer than the
+    resolution of the OpenWeather current weather data.
+    """
+    # Adding 0.0 turns a rounded -0.0 into 0.0, so both share one key.
+    return round(lat, precision) + 0.0, round(lon, precision) + 0.0
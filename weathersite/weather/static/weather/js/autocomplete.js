@@ -0,0 +1,37 @@
+// Suggest cities found before while the user types in the search box.
+document.querySelectorAll("input[data-autocomplete-url]").forEach((input) => {
+    const list = document.getElementById(input.getAttribute("list"));
+    let timer = null;
+    let controller = null;
+
+    input.addEventListener("input", () => {
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (query.length < 2) {
+            list.replaceChildren();
+            return;
+        }
+        timer = setTimeout(async () => {
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            const url = `${input.dataset.autocompleteUrl}?q=${encodeURIComponent(query)}`;
+            try {
+                const response = await fetch(url, {signal: controller.signal});
+                const data = await response.json();
+                list.replaceChildren(...data.results.map((location) => {
+                    const option = document.createElement("option");
+                    option.value = location.name;
+                    option.label = [location.name, location.state, location.country]
+                        .filter(Boolean).join(", ");
+                    return option;
+                }));
+            } catch (error) {
+                if (error.name !== "AbortError") {
+                    list.replaceChildren();
+                }
+            }
+        }, 200);
+    });
+});
@@ -0,0 +1,14 @@
+// Load the cards that were rendered without weather, each as soon as it is ready.
+document.querySelectorAll("[data-card-url]").forEach(async (placeholder) => {
+    try {
+        const response = await fetch(placeholder.dataset.cardUrl);
+        if (!response.ok) {
+            throw new Error(response.statusText);
+        }
+        const data = await response.json();
+        placeholder.outerHTML = data.html;
+    } catch (error) {
+        placeholder.querySelector(".card-status").textContent =
+            "Weather service temporary unavailable";
+    }
+});
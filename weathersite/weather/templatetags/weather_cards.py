@@ -0,0 +1,74 @@
+import hashlib
+import time
+from typing import Any
+
+from django import template
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+from django.utils.translation import get_language
+
+from weather.cache import LocalTTLCache, TieredCache
+from weather.records import WeatherRecord
+from weathersite.settings import (
+    WEATHER_LOCAL_CACHE_SIZE,
+    WEATHER_LOCAL_CACHE_TTL,
+    WEATHER_STALE_TTL,
+)
+
+register = template.Library()
+
+CARD_TEMPLATE = "weather/includes/location_card.html"
+# Bump when the card template changes, so that cached cards are not reused.
+CARD_VERSION = 1
+
+# Stand-ins for what differs between users showing the same weather; the
+# cached card is rendered with them and they are replaced per request.
+NAME_MARK = "__location_name__"
+DB_ID_MARK = 987654321987654321
+CSRF_MARK = "__csrf_token__"
+
+fragments = TieredCache(
+    LocalTTLCache(WEATHER_LOCAL_CACHE_SIZE, WEATHER_LOCAL_CACHE_TTL)
+)
+
+
+def card_cache_key(record: WeatherRecord) -> str:
+    """Key of the card of a weather entry, it changes with every refresh."""
+    digest = hashlib.sha1(record.to_bytes()).hexdigest()
+    return f"card_v{CARD_VERSION}_{get_language()}_{digest}"
+
+
+def render_weather_card(record: WeatherRecord) -> str:
+    """Card of a weather entry with the per-user parts left as marks."""
+    key = card_cache_key(record)
+    if (html := fragments.get(key)) is not None:
+        return html
+
+    location = {"name": NAME_MARK, "db_id": DB_ID_MARK, "weather": record}
+    html = render_to_string(
+        CARD_TEMPLATE, {"location": location, "csrf_token": CSRF_MARK}
+    )
+    # The card lives as long as the weather entry it shows.
+    ttl = int(WEATHER_STALE_TTL - (time.time() - record.fetched_at))
+    if ttl > 0:
+        fragments.set(key, html, ttl)
+    return html
+
+
+@register.simple_tag(takes_context=True)
+def location_card(context: template.Context, location: dict[str, Any]) -> SafeString:
+    """Render a card of the home page, reusing the card of its weather entry."""
+    csrf_token = context.get("csrf_token", "")
+    if "weather" not in location:
+        return render_to_string(
+            CARD_TEMPLATE, {"location": location, "csrf_token": csrf_token}
+        )
+
+    html = (
+        render_weather_card(location["weather"])
+        .replace(NAME_MARK, escape(location["name"]))
+        .replace(str(DB_ID_MARK), str(location["db_id"]))
+        .replace(CSRF_MARK, escape(str(csrf_token)))
+    )
+    return mark_safe(html)
@@ -0,0 +1,11 @@
+from django.urls import include, path
+
+from weather import views
+
+# The project URLs with the ASGI home and search pages, as WEATHER_ASYNC_VIEWS
+# routes them.
+urlpatterns = [
+    path("", views.AsyncWeatherHomeView.as_view(), name="index"),
+    path("weather/", views.AsyncShowLocationView.as_view(), name="search"),
+    path("", include("weathersite.urls")),
+]
@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from requests.exceptions import Timeout
+
+from weather.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from weather.exceptions import WeatherAPITimeoutError, WeatherAPIUnavailableError
+from weather.services import WeatherApiClient
+from weather.tests.test_records import make_record
+
+
+class CircuitBreakerTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.breaker = CircuitBreaker(threshold=2, cooldown=30)
+
+    def test_opens_after_threshold_failures(self) -> None:
+        self.breaker.record_failure(self.breaker.before_call())
+        self.assertEqual(self.breaker.state(), CLOSED)
+
+        self.breaker.record_failure(self.breaker.before_call())
+
+        self.assertEqual(self.breaker.state(), OPEN)
+        with self.assertRaises(WeatherAPIUnavailableError):
+            self.breaker.before_call()
+
+    def test_half_open_lets_one_probe_through(self) -> None:
+        cache.set(self.breaker.tripped_key, 1, 300)
+        self.assertEqual(self.breaker.state(), HALF_OPEN)
+
+        self.assertTrue(self.breaker.before_call())
+        with self.assertRaises(WeatherAPIUnavailableError):
+            self.breaker.before_call()
+
+        self.breaker.record_success(True)
+        self.assertEqual(self.breaker.state(), CLOSED)
+        self.assertFalse(self.breaker.before_call())
+
+    def test_failed_probe_opens_circuit_again(self) -> None:
+        cache.set(self.breaker.tripped_key, 1, 300)
+
+        self.breaker.record_failure(self.breaker.before_call())
+
+        self.assertEqual(self.breaker.state(), OPEN)
+
+    async def test_async_probe(self) -> None:
+        await cache.aset(self.breaker.tripped_key, 1, 300)
+
+        probe = await self.breaker.abefore_call()
+        await self.breaker.arecord_success(probe)
+
+        self.assertTrue(probe)
+        self.assertEqual(self.breaker.state(), CLOSED)
+
+
+class WeatherApiClientBreakerTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.client: WeatherApiClient = WeatherApiClient(
+            api_key="test_key", breaker_threshold=2
+        )  # type: ignore[assignment]
+
+    @patch("weather.services.requests.Session.get")
+    def test_fails_fast_while_api_is_down(self, mock_get: MagicMock) -> None:
+        mock_get.side_effect = Timeout("The request timed out")
+
+        for _ in range(2):
+            with self.assertRaises(WeatherAPITimeoutError):
+                self.client.get_current_weather(55.754, 37.6204)
+        for _ in range(3):
+            with self.assertRaises(WeatherAPIUnavailableError):
+                self.client.get_current_weather(55.754, 37.6204)
+
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch("weather.services.requests.Session.get")
+    def test_stale_weather_is_served_while_open(self, mock_get: MagicMock) -> None:
+        stale = make_record(fetched_at=0.0)
+        client = WeatherApiClient(
+            api_key="test_key", use_cache=True, breaker_threshold=2
+        )
+        cache.set("weather_v1_55.754_37.6204_metric_ru", stale.to_bytes(), 60)
+        cache.set(client.circuit_breaker.open_key, 1, 30)  # type: ignore[union-attr]
+
+        self.assertEqual(client.get_current_weather(55.754, 37.6204), stale)
+        mock_get.assert_not_called()
@@ -0,0 +1,176 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from weather.cache import LocalTTLCache, SingleFlight, TieredCache
+
+
+class LocalTTLCacheTest(TestCase):
+    def test_entry_expires_after_ttl(self) -> None:
+        local = LocalTTLCache(max_size=10, max_ttl=60)
+        with patch("weather.cache.time.monotonic", return_value=100.0):
+            local.set("key", "value", 30)
+        with patch("weather.cache.time.monotonic", return_value=129.0):
+            self.assertEqual(local.get("key"), "value")
+        with patch("weather.cache.time.monotonic", return_value=130.0):
+            self.assertIsNone(local.get("key"))
+
+    def test_ttl_is_capped_by_max_ttl(self) -> None:
+        local = LocalTTLCache(max_size=10, max_ttl=60)
+        with patch("weather.cache.time.monotonic", return_value=100.0):
+            local.set("key", "value", 15 * 60)
+        with patch("weather.cache.time.monotonic", return_value=161.0):
+            self.assertIsNone(local.get("key"))
+
+    def test_least_recently_used_entry_is_evicted(self) -> None:
+        local = LocalTTLCache(max_size=2)
+        local.set("a", 1)
+        local.set("b", 2)
+        local.get("a")
+        local.set("c", 3)
+
+        self.assertEqual(local.get("a"), 1)
+        self.assertIsNone(local.get("b"))
+        self.assertEqual(local.get("c"), 3)
+
+
+class TieredCacheTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.tiered = TieredCache(LocalTTLCache(max_size=10, max_ttl=60))
+
+    def test_shared_hit_is_promoted_to_local(self) -> None:
+        cache.set("key", "value", 60)
+
+        self.assertEqual(self.tiered.get("key"), "value")
+        cache.delete("key")
+        self.assertEqual(self.tiered.get("key"), "value")
+        self.assertEqual(
+            self.tiered.stats(),
+            {"l1_hits": 1, "l1_misses": 1, "l2_hits": 1, "l2_misses": 0},
+        )
+
+    def test_set_writes_both_tiers(self) -> None:
+        self.tiered.set("key", "value", 15 * 60)
+
+        self.assertEqual(cache.get("key"), "value")
+        self.assertEqual(self.tiered.local.get("key"), "value")
+
+    def test_miss_is_counted_on_both_tiers(self) -> None:
+        self.assertIsNone(self.tiered.get("missing"))
+        self.assertEqual(
+            self.tiered.stats(),
+            {"l1_hits": 0, "l1_misses": 1, "l2_hits": 0, "l2_misses": 1},
+        )
+
+    def test_get_many_reads_local_then_shared(self) -> None:
+        self.tiered.local.set("local", "l1", 60)
+        cache.set("shared", "l2", 60)
+
+        with patch.object(cache, "get_many", wraps=cache.get_many) as get_many:
+            found = self.tiered.get_many(["local", "shared", "missing"])
+
+        self.assertEqual(found, {"local": "l1", "shared": "l2"})
+        get_many.assert_called_once_with(["shared", "missing"])
+        self.assertEqual(self.tiered.local.get("shared"), "l2")
+
+    def test_set_many_writes_both_tiers(self) -> None:
+        self.tiered.set_many({"a": 1, "b": 2}, 60)
+
+        self.assertEqual(cache.get_many(["a", "b"]), {"a": 1, "b": 2})
+        self.assertEqual(self.tiered.local.get("b"), 2)
+
+
+class SingleFlightTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.single_flight = SingleFlight(poll_interval=0.01)
+
+    def test_concurrent_callers_share_one_load(self) -> None:
+        calls = []
+        release = threading.Event()
+
+        def load() -> str:
+            calls.append(1)
+            release.wait(1)
+            return "value"
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(self.single_flight.do, "key", load) for _ in range(4)
+            ]
+            # Give the other callers time to join the in-flight load.
+            time.sleep(0.1)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, ["value"] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_error_is_shared_with_waiting_callers(self) -> None:
+        calls = []
+        release = threading.Event()
+
+        def load() -> str:
+            calls.append(1)
+            release.wait(1)
+            raise ValueError("upstream failed")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(self.single_flight.do, "key", load) for _ in range(2)
+            ]
+            # Give the other callers time to join the in-flight load.
+            time.sleep(0.1)
+            release.set()
+            for future in futures:
+                with self.assertRaises(ValueError):
+                    future.result()
+
+        self.assertEqual(len(calls), 1)
+
+    def test_waits_for_value_loaded_by_another_worker(self) -> None:
+        cache.add("lock_key", 1, 10)
+        threading.Timer(0.05, cache.set, args=("key", "shared value", 60)).start()
+
+        result = self.single_flight.do(
+            "key", lambda: "own value", lambda: cache.get("key")
+        )
+
+        self.assertEqual(result, "shared value")
+
+    def test_waiting_callers_outlast_the_leader(self) -> None:
+        single_flight = SingleFlight(wait_timeout=0.1, poll_interval=0.01)
+        cache.add("lock_key", 1, 10)
+        calls = []
+
+        def load() -> str:
+            calls.append(1)
+            time.sleep(0.05)
+            return "own value"
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # The leader polls the other worker's lock, then loads the key.
+            leader = executor.submit(
+                single_flight.do, "key", load, lambda: cache.get("key")
+            )
+            time.sleep(0.02)
+            waiter = executor.submit(single_flight.do, "key", load)
+
+            self.assertEqual(waiter.result(), "own value")
+            self.assertEqual(leader.result(), "own value")
+        self.assertEqual(len(calls), 1)
+
+    def test_loads_itself_when_other_worker_gives_up(self) -> None:
+        cache.add("lock_key", 1, 10)
+        threading.Timer(0.05, cache.delete, args=("lock_key",)).start()
+
+        result = self.single_flight.do(
+            "key", lambda: "own value", lambda: cache.get("key")
+        )
+
+        self.assertEqual(result, "own value")
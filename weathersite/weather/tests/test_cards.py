@@ -0,0 +1,66 @@
+import time
+from unittest.mock import MagicMock, patch
+
+from django.template import Context, Template
+from django.test import TestCase
+
+from weather.templatetags import weather_cards
+from weather.tests.test_records import make_record
+
+TEMPLATE = Template("{% load weather_cards %}{% location_card location %}")
+
+
+def render(location: dict, csrf_token: str = "token") -> str:
+    return TEMPLATE.render(Context({"location": location, "csrf_token": csrf_token}))
+
+
+@patch(
+    "weather.templatetags.weather_cards.render_to_string",
+    wraps=weather_cards.render_to_string,
+)
+class LocationCardTest(TestCase):
+    def setUp(self) -> None:
+        weather_cards.fragments.clear()
+        weather_cards.fragments.shared.clear()
+        self.record = make_record(temp=21.0)
+
+    def test_card_is_rendered_once_per_weather_entry(
+        self, mock_render: MagicMock
+    ) -> None:
+        first = render({"name": "Москва", "db_id": 1, "weather": self.record})
+        second = render(
+            {"name": "<b>Moscow</b>", "db_id": 22, "weather": self.record}, "other"
+        )
+
+        mock_render.assert_called_once()
+        self.assertIn("Москва, RU", first)
+        self.assertIn("/location/delete/1/", first)
+        self.assertIn('value="token"', first)
+        self.assertIn("&lt;b&gt;Moscow&lt;/b&gt;, RU", second)
+        self.assertIn('id="delete-form-22"', second)
+        self.assertIn('value="other"', second)
+        self.assertIn("21℃", second)
+
+    def test_refreshed_weather_gets_a_new_card(self, mock_render: MagicMock) -> None:
+        render({"name": "Москва", "db_id": 1, "weather": self.record})
+        refreshed = make_record(temp=25.0, fetched_at=time.time() + 1)
+
+        html = render({"name": "Москва", "db_id": 1, "weather": refreshed})
+
+        self.assertEqual(mock_render.call_count, 2)
+        self.assertIn("25℃", html)
+
+    def test_expired_weather_is_not_cached(self, mock_render: MagicMock) -> None:
+        expired = make_record(fetched_at=0.0)
+
+        render({"name": "Москва", "db_id": 1, "weather": expired})
+        render({"name": "Москва", "db_id": 1, "weather": expired})
+
+        self.assertEqual(mock_render.call_count, 2)
+
+    def test_error_card_is_not_cached(self, mock_render: MagicMock) -> None:
+        html = render({"name": "Москва", "db_id": 1, "error": "Service timeout"})
+
+        self.assertIn("Service timeout", html)
+        self.assertIn("/location/delete/1/", html)
+        self.assertEqual(len(weather_cards.fragments.local), 0)
@@ -0,0 +1,108 @@
+import datetime
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import skipIf, skipUnless
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+
+from weather.gazetteer import Gazetteer
+from weather.history import add_months, archive_partitions, partition_name
+from weather.models import Location
+from weather.tests.test_gazetteer import LOCATIONS
+from weather.tests.test_records import make_record
+from weather.utils import get_weather_client
+
+
+class PrewarmWeatherCommandTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        get_weather_client().cache.clear()
+        user = get_user_model().objects.create_user(  # type: ignore
+            username="testuser", password="pass123"
+        )
+        for name, lat, lon in [
+            ("Москва", 55.7558, 37.6173),
+            ("Moscow", 55.7551, 37.6169),
+            ("Воронеж", 51.66, 39.2),
+            ("Казань", 55.79, 49.12),
+        ]:
+            Location.objects.create(user=user, name=name, latitude=lat, longitude=lon)
+
+    @patch("weather.management.commands.prewarm_weather.time.sleep")
+    @patch("weather.services.WeatherApiClient.refresh_current_weather")
+    def test_refreshes_each_expiring_cell_once(
+        self, mock_refresh: MagicMock, mock_sleep: MagicMock
+    ) -> None:
+        client = get_weather_client()
+        fresh_key = client._weather_cache_key(55.79, 49.12, "metric", "ru")
+        cache.set(fresh_key, make_record().to_bytes(), 60)
+        out = StringIO()
+
+        call_command("prewarm_weather", "--rpm", "60", stdout=out)
+
+        refreshed = sorted(call.args for call in mock_refresh.call_args_list)
+        self.assertEqual(refreshed, [(51.66, 39.2), (55.76, 37.62)])
+        mock_sleep.assert_called_with(1.0)
+        self.assertIn("Refreshed weather for 2 locations", out.getvalue())
+
+    def test_rejects_zero_rpm(self) -> None:
+        with self.assertRaisesMessage(CommandError, "must be at least 1"):
+            call_command("prewarm_weather", "--rpm", "0")
+
+
+class WeatherQuotaCommandTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_prints_usage_of_current_window(self) -> None:
+        limiter = get_weather_client().rate_limiter
+        assert limiter is not None
+        limiter.acquire()
+        out = StringIO()
+
+        call_command("weather_quota", stdout=out)
+
+        self.assertIn("used: 1\n", out.getvalue())
+        self.assertIn("shed_background: 0\n", out.getvalue())
+
+
+class BuildGazetteerCommandTest(TestCase):
+    def test_builds_from_json_lines(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = os.path.join(tmp_dir, "cities.jsonl")
+            output = os.path.join(tmp_dir, "gazetteer.tsv")
+            with open(source, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(loc) + "\n" for loc in LOCATIONS)
+            out = StringIO()
+
+            call_command("build_gazetteer", output, source, stdout=out)
+
+            self.assertIn("Wrote 5 names of 3 locations", out.getvalue())
+            self.assertEqual(len(Gazetteer(output).find("Yoshkar-Ola")), 1)
+
+
+class WeatherPartitionsCommandTest(TestCase):
+    @skipIf(connection.vendor == "postgresql", "The archive is partitioned")
+    def test_needs_postgresql(self) -> None:
+        out = StringIO()
+
+        call_command("weather_partitions", stdout=out)
+
+        self.assertIn("only partitioned on PostgreSQL", out.getvalue())
+
+    @skipUnless(connection.vendor == "postgresql", "Only PostgreSQL is partitioned")
+    def test_creates_partitions_ahead(self) -> None:
+        out = StringIO()
+
+        call_command("weather_partitions", "--ahead", "5", stdout=out)
+
+        month = add_months(datetime.date.today(), 4)
+        self.assertIn(f"Created {partition_name(month)}", out.getvalue())
+        self.assertIn(partition_name(month), archive_partitions())
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unicodedata
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from weather.gazetteer import Gazetteer
+from weather.services import WeatherApiClient
+
+LOCATIONS = [
+    {
+        "name": "Moscow",
+        "local_names": {"ru": "Москва", "en": "Moscow"},
+        "lat": 55.7504461,
+        "lon": 37.6174943,
+        "country": "RU",
+    },
+    {
+        "name": "Moscow",
+        "lat": 46.7323875,
+        "lon": -117.0001651,
+        "country": "US",
+        "state": "Idaho",
+    },
+    {
+        "name": "Yoshkar-Ola",
+        "local_names": {"ru": "Йошкар-Ола"},
+        "lat": 56.6388,
+        "lon": 47.8908,
+        "country": "RU",
+    },
+]
+
+
+class GazetteerTest(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "gazetteer.tsv")
+        Gazetteer.write(self.path, LOCATIONS)
+        self.gazetteer = Gazetteer(self.path)
+
+    def tearDown(self) -> None:
+        self.gazetteer.close()
+        self.tmp_dir.cleanup()
+
+    def test_find_by_any_name(self) -> None:
+        self.assertEqual(len(self.gazetteer), 5)
+        self.assertEqual(
+            [loc["country"] for loc in self.gazetteer.find(" MOSCOW ")], ["RU", "US"]
+        )
+        self.assertEqual(self.gazetteer.find("москва"), [LOCATIONS[0]])
+        self.assertEqual(
+            self.gazetteer.find(unicodedata.normalize("NFD", "Йошкар-Ола")),
+            [LOCATIONS[2]],
+        )
+        self.assertEqual(self.gazetteer.find("Mosc"), [])
+
+    def test_complete_prefix(self) -> None:
+        self.assertEqual(len(self.gazetteer.complete("mos")), 2)
+        self.assertEqual(self.gazetteer.complete("й"), [LOCATIONS[2]])
+        self.assertEqual(self.gazetteer.complete("z"), [])
+
+    def test_empty_file(self) -> None:
+        Gazetteer.write(self.path, [])
+        gazetteer = Gazetteer(self.path)
+
+        self.assertEqual(gazetteer.find("Moscow"), [])
+
+
+class GazetteerClientTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp_dir.name, "gazetteer.tsv")
+        Gazetteer.write(path, LOCATIONS)
+        self.client: WeatherApiClient = WeatherApiClient(
+            api_key="test_key", use_cache=True, gazetteer_path=path
+        )  # type: ignore[assignment]
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    @patch("weather.services.requests.Session.get")
+    def test_search_is_answered_offline(self, mock_get: MagicMock) -> None:
+        result = self.client.search_locations_by_name("москва")
+
+        self.assertEqual(result[0]["name"], "Москва")
+        mock_get.assert_not_called()
+
+    @patch("weather.services.requests.Session.get")
+    def test_unknown_city_goes_to_api(self, mock_get: MagicMock) -> None:
+        mock_get.return_value.json.return_value = [
+            {"name": "Казань", "lat": 55.79, "lon": 49.12, "country": "RU"}
+        ]
+
+        result = self.client.search_locations_by_name("Казань")
+
+        self.assertEqual(result[0]["name"], "Казань")
+        mock_get.assert_called_once()
+
+    def test_autocomplete_uses_gazetteer(self) -> None:
+        self.assertEqual(self.client.autocomplete("Йош")[0]["country"], "RU")
@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from weather.geoindex import GeoPrefixIndex
+
+MOSCOW = {
+    "name": "Москва",
+    "local_names": {"ru": "Москва", "en": "Moscow", "de": "Moskau"},
+    "lat": 55.7504461,
+    "lon": 37.6174943,
+    "country": "RU",
+}
+MOSCOW_IDAHO = {
+    "name": "Moscow",
+    "lat": 46.7323875,
+    "lon": -117.0001651,
+    "country": "US",
+    "state": "Idaho",
+}
+MOZHAYSK = {"name": "Можайск", "lat": 55.5069, "lon": 36.0242, "country": "RU"}
+
+
+class GeoPrefixIndexTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.index = GeoPrefixIndex()
+        self.index.add([MOSCOW, MOSCOW_IDAHO, MOZHAYSK])
+
+    def test_search_by_prefix_of_any_indexed_name(self) -> None:
+        moscow = {**MOSCOW, "local_names": {"ru": "Москва", "en": "Moscow"}}
+
+        self.assertEqual(self.index.search("Мо"), [MOZHAYSK, moscow])
+        self.assertEqual(self.index.search("  MOSC "), [MOSCOW_IDAHO, moscow])
+        self.assertEqual(self.index.search("mosk"), [])
+        self.assertEqual(self.index.search("Moscow", limit=1), [MOSCOW_IDAHO])
+
+    def test_known_location_is_not_added_twice(self) -> None:
+        self.assertFalse(self.index.add([{**MOSCOW, "lat": 55.75044}]))
+        self.assertEqual(len(self.index), 3)
+
+    def test_is_shared_through_cache(self) -> None:
+        self.index.save()
+        other = GeoPrefixIndex()
+
+        other.reload()
+
+        self.assertEqual(other.search("Можа"), [MOZHAYSK])
+
+    def test_workers_do_not_overwrite_each_other(self) -> None:
+        self.index.save()
+        other = GeoPrefixIndex()
+        other.add([{"name": "Мурманск", "lat": 68.97, "lon": 33.07}])
+        other.save()
+        self.index.add([{"name": "Майкоп", "lat": 44.61, "lon": 40.1}])
+        self.index.save()
+
+        fresh = GeoPrefixIndex()
+        fresh.reload()
+
+        self.assertEqual(len(fresh), 5)
+        self.assertEqual(len(cache.get("geo_index_seg_3")), 1)
+
+    def test_reload_reads_recent_segments(self) -> None:
+        self.index.save()
+        other = GeoPrefixIndex(reload_interval=0)
+        other.reload()
+        self.index.add([{"name": "Майкоп", "lat": 44.61, "lon": 40.1}])
+        self.index.save()
+
+        with patch.object(cache, "get_many", wraps=cache.get_many) as get_many:
+            other.reload()
+
+        self.assertEqual(other.search("май")[0]["name"], "Майкоп")
+        self.assertEqual(
+            get_many.call_args.args[0], ["geo_index_seg_1", "geo_index_seg_2"]
+        )
+
+    def test_names_added_during_merge_are_kept(self) -> None:
+        reloaded = [
+            {"name": f"City{i}", "lat": float(i), "lon": 0.0, "country": "RU"}
+            for i in range(100)
+        ]
+
+        def add_while_sorting(names: list) -> list:
+            self.index.add([{"name": "Zzz", "lat": -1.0, "lon": 0.0}])
+            return sorted(names)
+
+        with patch("weather.geoindex.sorted", add_while_sorting, create=True):
+            self.index._merge([reloaded])
+
+        self.assertEqual(self.index.search("zzz")[0]["name"], "Zzz")
+        self.assertEqual(len(self.index.search("city", limit=100)), 100)
+
+    def test_is_bounded(self) -> None:
+        index = GeoPrefixIndex(max_locations=1)
+
+        index.add([MOSCOW, MOZHAYSK])
+
+        self.assertEqual(index.search("мо")[0]["lat"], MOSCOW["lat"])
+        self.assertEqual(len(index), 1)
@@ -0,0 +1,185 @@
+import datetime
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.db import DatabaseError, connection
+from django.test import TestCase
+
+from weather.history import (
+    DEFAULT_PARTITION,
+    HistoryRecorder,
+    add_months,
+    archive_partitions,
+    create_partitions,
+    drop_partitions,
+    observation_series,
+    partition_name,
+    series_bucket,
+)
+from weather.models import Observation
+from weather.tests.test_records import make_record
+
+# 2025-05-16 00:00 UTC
+MIDNIGHT = 1747353600
+HOUR = 60 * 60
+
+
+class HistoryRecorderTest(TestCase):
+    def setUp(self) -> None:
+        self.recorder = HistoryRecorder(flush_interval=None)
+
+    def test_observations_are_written_on_flush(self) -> None:
+        self.recorder.record(55.76, 37.62, MIDNIGHT, make_record(temp=12.5))
+        self.recorder.record(55.76, 37.62, MIDNIGHT + HOUR, make_record(temp=13.5))
+
+        self.assertFalse(Observation.objects.exists())
+        self.assertEqual(self.recorder.flush(), 2)
+        self.assertEqual(
+            list(Observation.objects.order_by("observed_at").values_list("temp")),
+            [(12.5,), (13.5,)],
+        )
+        self.assertEqual(self.recorder.flush(), 0)
+
+    def test_same_measurement_is_stored_once(self) -> None:
+        self.recorder.record(55.76, 37.62, MIDNIGHT, make_record())
+        self.recorder.flush()
+        self.recorder.record(55.76, 37.62, MIDNIGHT, make_record())
+        self.recorder.flush()
+
+        self.assertEqual(Observation.objects.count(), 1)
+
+    def test_queue_is_bounded(self) -> None:
+        recorder = HistoryRecorder(flush_interval=None, max_pending=2)
+        for i in range(3):
+            recorder.record(55.76, 37.62, MIDNIGHT + i * HOUR, make_record())
+
+        self.assertEqual(recorder.flush(), 2)
+
+    def test_database_errors_are_logged(self) -> None:
+        self.recorder.record(55.76, 37.62, MIDNIGHT, make_record())
+
+        with (
+            patch.object(Observation.objects, "bulk_create") as mock_create,
+            self.assertLogs("weather", "WARNING"),
+        ):
+            mock_create.side_effect = DatabaseError("no partition")
+            self.assertEqual(self.recorder.flush(), 0)
+
+
+class ObservationSeriesTest(TestCase):
+    def setUp(self) -> None:
+        recorder = HistoryRecorder(flush_interval=None)
+        # Two days of hourly observations, 10..33 degrees each day.
+        for hour in range(48):
+            recorder.record(
+                55.76,
+                37.62,
+                MIDNIGHT + hour * HOUR,
+                make_record(temp=10 + hour % 24, humidity=50, wind_speed=hour),
+            )
+        recorder.record(51.66, 39.2, MIDNIGHT, make_record(temp=-5))
+        recorder.flush()
+        self.start = datetime.datetime.fromtimestamp(MIDNIGHT, datetime.UTC)
+
+    def test_series_is_downsampled_to_buckets(self) -> None:
+        end = self.start + datetime.timedelta(days=10)
+
+        bucket, series = observation_series(55.76, 37.62, self.start, end)
+
+        self.assertEqual(bucket, "day")
+        self.assertEqual(len(series), 2)
+        self.assertEqual(series[0]["time"], self.start)
+        self.assertEqual((series[0]["temp_min"], series[0]["temp_max"]), (10, 33))
+        self.assertEqual(series[0]["temp_mean"], 21.5)
+        self.assertEqual(series[0]["humidity"], 50)
+        self.assertEqual(series[1]["wind_speed_max"], 47)
+        self.assertEqual(series[1]["count"], 24)
+
+    def test_series_of_a_period_and_bucket(self) -> None:
+        end = self.start + datetime.timedelta(hours=6)
+
+        bucket, series = observation_series(
+            55.76, 37.62, self.start, end, bucket="hour"
+        )
+
+        self.assertEqual(bucket, "hour")
+        self.assertEqual([row["temp_max"] for row in series], [10, 11, 12, 13, 14, 15])
+
+    def test_series_bucket(self) -> None:
+        self.assertEqual(series_bucket(datetime.timedelta(days=1)), "hour")
+        self.assertEqual(series_bucket(datetime.timedelta(days=30)), "day")
+        self.assertEqual(series_bucket(datetime.timedelta(days=365)), "week")
+        self.assertEqual(series_bucket(datetime.timedelta(days=5 * 365)), "month")
+
+
+class PartitionNamesTest(TestCase):
+    def test_add_months(self) -> None:
+        self.assertEqual(
+            add_months(datetime.date(2025, 11, 20), 3), datetime.date(2026, 2, 1)
+        )
+        self.assertEqual(
+            add_months(datetime.date(2025, 1, 31), -1), datetime.date(2024, 12, 1)
+        )
+
+    def test_partition_names_sort_by_month(self) -> None:
+        names = [partition_name(datetime.date(2025, month, 1)) for month in (2, 10)]
+
+        self.assertEqual(names[0], "weather_observation_2025_02")
+        self.assertEqual(sorted(names), names)
+
+
+@skipUnless(connection.vendor == "postgresql", "Only PostgreSQL is partitioned")
+class PartitionsTest(TestCase):
+    # Far from the months the migration creates partitions for.
+    month = datetime.date(2001, 3, 1)
+
+    def count_rows(self, table: str) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {connection.ops.quote_name(table)}")
+            return cursor.fetchone()[0]
+
+    def test_month_without_partition_goes_to_default(self) -> None:
+        Observation.objects.create(
+            latitude=55.76,
+            longitude=37.62,
+            observed_at=datetime.datetime(2001, 3, 15, tzinfo=datetime.UTC),
+            temp=1.5,
+            feels_like=-2.0,
+            humidity=80,
+            wind_speed=3.0,
+        )
+
+        self.assertEqual(self.count_rows(DEFAULT_PARTITION), 1)
+
+    def test_rows_move_out_of_default_partition(self) -> None:
+        for day, month in ((15, 3), (20, 4)):
+            Observation.objects.create(
+                latitude=55.76,
+                longitude=37.62,
+                observed_at=datetime.datetime(2001, month, day, tzinfo=datetime.UTC),
+                temp=1.5,
+                feels_like=-2.0,
+                humidity=80,
+                wind_speed=3.0,
+            )
+
+        created = create_partitions(self.month, 1)
+
+        self.assertEqual(created, [partition_name(self.month)])
+        self.assertIn(partition_name(self.month), archive_partitions())
+        self.assertNotIn(DEFAULT_PARTITION, archive_partitions())
+        self.assertEqual(self.count_rows(partition_name(self.month)), 1)
+        self.assertEqual(self.count_rows(DEFAULT_PARTITION), 1)
+        self.assertEqual(Observation.objects.count(), 2)
+        self.assertEqual(create_partitions(self.month, 1), [])
+
+    def test_drops_partitions_before_month(self) -> None:
+        create_partitions(self.month, 2)
+
+        dropped = drop_partitions(add_months(self.month, 1))
+
+        self.assertEqual(dropped, [partition_name(self.month)])
+        partitions = archive_partitions()
+        self.assertNotIn(partition_name(self.month), partitions)
+        self.assertIn(partition_name(add_months(self.month, 1)), partitions)
+        self.assertEqual(self.count_rows(DEFAULT_PARTITION), 0)
@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from django.apps.registry import Apps
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MergeDuplicateLocationsTest(TransactionTestCase):
+    """0006 rounds stored coordinates and merges the locations that then match."""
+
+    migrate_from = [("weather", "0005_rename_user_id_location_user")]
+    migrate_to = [("weather", "0006_location_float_coordinates")]
+
+    def migrate(self, targets: list[tuple[str, str]]) -> Apps:
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self) -> None:
+        self.old_apps = self.migrate(self.migrate_from)
+
+    def tearDown(self) -> None:
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_near_duplicates_are_merged_per_user(self) -> None:
+        User = self.old_apps.get_model("auth", "User")
+        Location = self.old_apps.get_model("weather", "Location")
+        user = User.objects.create(username="testuser")
+        other = User.objects.create(username="other")
+        for owner, name, lat, lon in [
+            (user, "Москва", "55.7558000", "37.6173000"),
+            (user, "Moscow", "55.7557990", "37.6173010"),
+            (user, "Москва, центр", "55.7558040", "37.6172960"),
+            (other, "Moscow", "55.7558000", "37.6173000"),
+            (user, "Воронеж", "51.6600000", "39.2000000"),
+        ]:
+            Location.objects.create(
+                user=owner, name=name, latitude=Decimal(lat), longitude=Decimal(lon)
+            )
+
+        apps = self.migrate(self.migrate_to)
+
+        locations = apps.get_model("weather", "Location").objects.order_by("id")
+        self.assertEqual(
+            list(
+                locations.values_list("user__username", "name", "latitude", "longitude")
+            ),
+            [
+                ("testuser", "Москва", 55.7558, 37.6173),
+                ("other", "Moscow", 55.7558, 37.6173),
+                ("testuser", "Воронеж", 51.66, 39.2),
+            ],
+        )
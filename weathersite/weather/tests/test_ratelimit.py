@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from weather.exceptions import WeatherAPIRateLimitError
+from weather.ratelimit import (
+    BACKGROUND,
+    INTERACTIVE,
+    RateLimiter,
+    _priority,
+    background_priority,
+)
+
+
+@patch("weather.ratelimit.time.time", return_value=6000.0)
+class RateLimiterTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.limiter = RateLimiter(limit=3, reserve=1, max_wait=0)
+
+    def test_background_calls_leave_the_reserve(self, mock_time: MagicMock) -> None:
+        self.limiter.acquire(BACKGROUND)
+        self.limiter.acquire(BACKGROUND)
+
+        with self.assertRaises(WeatherAPIRateLimitError):
+            self.limiter.acquire(BACKGROUND)
+        self.limiter.acquire(INTERACTIVE)
+        with self.assertRaises(WeatherAPIRateLimitError):
+            self.limiter.acquire(INTERACTIVE)
+
+        usage = self.limiter.usage()
+        self.assertEqual(usage["used"], 3)
+        self.assertEqual(usage["remaining"], 0)
+        self.assertEqual(usage["shed_background"], 1)
+        self.assertEqual(usage["shed_interactive"], 1)
+
+    def test_limit_holds_across_window_boundary(self, mock_time: MagicMock) -> None:
+        mock_time.return_value = 6059.0
+        for _ in range(3):
+            self.limiter.acquire()
+
+        mock_time.return_value = 6060.0
+        with self.assertRaises(WeatherAPIRateLimitError):
+            self.limiter.acquire()
+
+    def test_previous_window_counts_by_overlap(self, mock_time: MagicMock) -> None:
+        for _ in range(3):
+            self.limiter.acquire()
+
+        # A third of the previous window lies within the last minute.
+        mock_time.return_value = 6100.0
+        self.limiter.acquire()
+        self.limiter.acquire()
+
+        self.assertEqual(self.limiter.usage()["used"], 3)
+        with self.assertRaises(WeatherAPIRateLimitError):
+            self.limiter.acquire()
+
+    @patch("weather.ratelimit.time.sleep")
+    def test_interactive_call_waits_for_room(
+        self, mock_sleep: MagicMock, mock_time: MagicMock
+    ) -> None:
+        mock_time.return_value = 5999.0
+        limiter = RateLimiter(limit=2, max_wait=31.0)
+        limiter.acquire()
+        limiter.acquire()
+
+        mock_time.return_value = 6000.0
+        mock_sleep.side_effect = lambda seconds: setattr(
+            mock_time, "return_value", 6000.0 + seconds
+        )
+        limiter.acquire()
+
+        mock_sleep.assert_called_once_with(30.0)
+
+    def test_background_priority_context(self, mock_time: MagicMock) -> None:
+        with background_priority():
+            self.assertEqual(_priority.get(), BACKGROUND)
+        self.assertEqual(_priority.get(), INTERACTIVE)
+
+    async def test_async_acquire_sheds_background(self, mock_time: MagicMock) -> None:
+        await self.limiter.aacquire(BACKGROUND)
+        await self.limiter.aacquire(BACKGROUND)
+
+        with self.assertRaises(WeatherAPIRateLimitError):
+            await self.limiter.aacquire(BACKGROUND)
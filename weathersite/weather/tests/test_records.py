@@ -0,0 +1,187 @@
+import datetime
+import pickle
+import time
+from dataclasses import replace
+from typing import Any
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from weather.cache import LocalTTLCache, TieredCache
+from weather.records import Forecast, RecordCodec, WeatherRecord
+
+
+def weather_response(temp: float = 23.17, description: str = "облачно") -> dict:
+    """A data/2.5/weather response as OpenWeather sends it."""
+    return {
+        "coord": {"lon": 37.6204, "lat": 55.754},
+        "weather": [
+            {"id": 803, "main": "Clouds", "description": description, "icon": "04d"}
+        ],
+        "base": "stations",
+        "main": {
+            "temp": temp,
+            "feels_like": 22.4,
+            "temp_min": temp,
+            "temp_max": temp,
+            "pressure": 1016,
+            "humidity": 33,
+            "sea_level": 1016,
+            "grnd_level": 997,
+        },
+        "visibility": 10000,
+        "wind": {"speed": 5.67, "deg": 192, "gust": 7.39},
+        "clouds": {"all": 66},
+        "dt": 1747394977,
+        "sys": {"country": "RU", "sunrise": 1747358173, "sunset": 1747416945},
+        "timezone": 10800,
+        "id": 524901,
+        "name": "Москва",
+        "cod": 200,
+    }
+
+
+def forecast_response(start: int = 1747396800, steps: int = 40) -> dict:
+    """A data/2.5/forecast response with a step every 3 hours from ``start``."""
+    return {
+        "cod": "200",
+        "message": 0,
+        "cnt": steps,
+        "list": [
+            {
+                "dt": start + i * 3 * 60 * 60,
+                "main": {
+                    "temp": 10 + i % 8,
+                    "feels_like": 8 + i % 8,
+                    "temp_min": 10 + i % 8,
+                    "temp_max": 10 + i % 8,
+                    "pressure": 1016,
+                    "humidity": 60,
+                },
+                "weather": [
+                    {"id": 500, "main": "Rain", "description": "дождь", "icon": "10d"}
+                ],
+                "clouds": {"all": 75},
+                "wind": {"speed": 2.5 + i % 8 / 2, "deg": 180},
+                "visibility": 10000,
+                "pop": (i % 8) / 10,
+                "dt_txt": "",
+            }
+            for i in range(steps)
+        ],
+        "city": {"id": 524901, "name": "Москва", "country": "RU", "timezone": 10800},
+    }
+
+
+def make_record(**fields: Any) -> WeatherRecord:
+    record = WeatherRecord.from_api(weather_response(), fetched_at=time.time())
+    return replace(record, **fields)
+
+
+class WeatherRecordTest(TestCase):
+    def test_from_api_keeps_rendered_fields(self) -> None:
+        record = WeatherRecord.from_api(weather_response(), fetched_at=100.0)
+
+        self.assertEqual(record.temp, 23.17)
+        self.assertEqual(record.feels_like, 22.4)
+        self.assertEqual(record.humidity, 33)
+        self.assertEqual(record.wind_speed, 5.67)
+        self.assertEqual(record.description, "облачно")
+        self.assertEqual(record.country, "RU")
+        self.assertEqual(record.timezone, "UTC+3")
+        self.assertEqual(
+            record.icon_url, "https://openweathermap.org/img/wn/04d@2x.png"
+        )
+
+    def test_bytes_round_trip(self) -> None:
+        record = make_record(temp=-12.35, tz_offset=-18000, country="")
+
+        self.assertEqual(WeatherRecord.from_bytes(record.to_bytes()), record)
+
+    def test_packed_record_is_much_smaller_than_pickled_response(self) -> None:
+        response = weather_response()
+        record = WeatherRecord.from_api(response, fetched_at=time.time())
+
+        self.assertLess(len(record.to_bytes()) * 5, len(pickle.dumps(response)))
+
+
+class ForecastTest(TestCase):
+    def test_from_api_stores_columns(self) -> None:
+        forecast = Forecast.from_api(forecast_response(steps=3), fetched_at=100.0)
+
+        self.assertEqual(list(forecast.time), [1747396800, 1747407600, 1747418400])
+        self.assertEqual(list(forecast.temp), [1000, 1100, 1200])
+        self.assertEqual(list(forecast.wind_speed), [250, 300, 350])
+        self.assertEqual(list(forecast.pop), [0, 10, 20])
+        self.assertEqual(forecast.timezone, "UTC+3")
+
+    def test_bytes_round_trip(self) -> None:
+        forecast = Forecast.from_api(forecast_response(), fetched_at=100.0)
+
+        self.assertEqual(Forecast.from_bytes(forecast.to_bytes()), forecast)
+
+    def test_packed_forecast_is_much_smaller_than_pickled_response(self) -> None:
+        response = forecast_response()
+        forecast = Forecast.from_api(response, fetched_at=100.0)
+
+        self.assertLess(len(forecast.to_bytes()) * 5, len(pickle.dumps(response)))
+
+    def test_daily_aggregates_local_days(self) -> None:
+        # 12:00 UTC of May 16, 2025 is 15:00 in UTC+3: three steps that day.
+        forecast = Forecast.from_api(forecast_response(), fetched_at=100.0)
+
+        days = forecast.daily()
+
+        self.assertEqual(len(days), 6)
+        self.assertEqual(days[0].date, datetime.date(2025, 5, 16))
+        self.assertEqual((days[0].temp_min, days[0].temp_max), (10.0, 12.0))
+        self.assertEqual(days[0].temp_mean, 11.0)
+        self.assertEqual(days[1].date, datetime.date(2025, 5, 17))
+        self.assertEqual((days[1].temp_min, days[1].temp_max), (10.0, 17.0))
+        self.assertEqual(days[1].temp_mean, 13.5)
+        self.assertEqual(days[1].feels_like_mean, 11.5)
+        self.assertEqual(days[1].wind_speed_max, 6.0)
+        self.assertEqual(days[1].pop_max, 0.7)
+
+    def test_as_dict_is_in_api_units(self) -> None:
+        forecast = Forecast.from_api(forecast_response(steps=2), fetched_at=100.0)
+
+        data = forecast.as_dict()
+
+        self.assertEqual(data["temp"], [10.0, 11.0])
+        self.assertEqual(data["pop"], [0.0, 0.1])
+        self.assertEqual(data["daily"][0]["temp_max"], 11.0)
+
+
+class RecordCodecTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.cache = TieredCache(LocalTTLCache(), cache, codec=RecordCodec())
+
+    def test_records_are_packed_in_shared_cache_only(self) -> None:
+        record = make_record()
+
+        self.cache.set("weather", record, 60)
+
+        self.assertIsInstance(cache.get("weather"), bytes)
+        self.assertIs(self.cache.get("weather"), record)
+        self.cache.clear()
+        self.assertEqual(self.cache.get("weather"), record)
+        self.assertEqual(self.cache.get_many(["weather"]), {"weather": record})
+
+    def test_forecasts_are_packed(self) -> None:
+        forecast = Forecast.from_api(forecast_response(), fetched_at=100.0)
+
+        self.cache.set("forecast", forecast, 60)
+        self.cache.clear()
+
+        self.assertIsInstance(cache.get("forecast"), bytes)
+        self.assertEqual(self.cache.get("forecast"), forecast)
+
+    def test_other_values_are_stored_as_is(self) -> None:
+        self.cache.set("locations", [{"name": "Москва"}], 60)
+        self.cache.set("raw", b"bytes", 60)
+
+        self.cache.clear()
+        self.assertEqual(self.cache.get("locations"), [{"name": "Москва"}])
+        self.assertEqual(self.cache.get("raw"), b"bytes")
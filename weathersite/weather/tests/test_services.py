@@ -1,16 +1,36 @@
-from unittest.mock import patch, Mock, MagicMock
+import threading
+import time
+import unicodedata
+from typing import Any
+from unittest.mock import patch, AsyncMock, Mock, MagicMock
+
+import httpx
 
 from django.core.cache import cache
 from django.test import TestCase
 from requests.exceptions import Timeout, HTTPError, ConnectionError
 
+from weather.cache import TieredCache
 from weather.exceptions import (
+    WeatherAPIDeadlineError,
     WeatherAPINoLocationsError,
     WeatherAPITimeoutError,
     WeatherAPIConnectionError,
     WeatherAPIInvalidRequestError,
+    WeatherAPIRateLimitError,
+)
+from weather.services import (
+    AsyncWeatherApiClient,
+    WeatherApiClient,
+    _reset_clients_after_fork,
+    quantize_coordinates,
+)
+from weather.records import Forecast, WeatherRecord
+from weather.tests.test_records import (
+    forecast_response,
+    make_record,
+    weather_response,
 )
-from weather.services import WeatherApiClient
 
 
 class WeatherApiClientTest(TestCase):
@@ -20,7 +40,7 @@ class WeatherApiClientTest(TestCase):
         )  # type: ignore[assignment]
         cache.clear()
 
-    @patch("weather.services.requests.get")
+    @patch("weather.services.requests.Session.get")
     def test_search_locations_by_name_success(self, mock_get: MagicMock) -> None:
         """Проверяем корректный ответ от API для поиска локаций."""
         mock_response = Mock()
@@ -42,7 +62,48 @@ class WeatherApiClientTest(TestCase):
         self.assertEqual(result[0]["name"], "Москва")
         self.assertEqual(result[0]["country"], "RU")
 
-    @patch("weather.services.requests.get")
+    @patch("weather.services.requests.Session.get")
+    def test_equivalent_queries_share_one_call(self, mock_get: MagicMock) -> None:
+        mock_get.return_value.json.return_value = [
+            {"name": "Йошкар-Ола", "lat": 56.63, "lon": 47.89, "country": "RU"}
+        ]
+
+        for query in ("Йошкар-Ола", " йошкар-ола ", "ЙОШКАР-ОЛА"):
+            self.client.search_locations_by_name(unicodedata.normalize("NFD", query))
+            self.client.search_locations_by_name(query)
+
+        mock_get.assert_called_once()
+        self.assertEqual(mock_get.call_args.kwargs["params"]["q"], "йошкар-ола")
+
+    @patch("weather.services.requests.Session.get")
+    def test_queries_with_same_result_share_entry(self, mock_get: MagicMock) -> None:
+        mock_get.return_value.json.return_value = [
+            {"name": "Moscow", "lat": 55.7504461, "lon": 37.6174943, "country": "RU"}
+        ]
+
+        self.client.search_locations_by_name("Moscow")
+        self.client.search_locations_by_name("Москва")
+
+        result_key = cache.get("geo_q_moscow_6_rus")
+        self.assertTrue(result_key.startswith("geo_r_rus_"))
+        self.assertEqual(cache.get("geo_q_москва_6_rus"), result_key)
+        self.assertEqual(cache.get(result_key)[0]["country"], "RU")
+
+    @patch("weather.services.requests.Session.get")
+    def test_autocomplete_uses_previous_results(self, mock_get: MagicMock) -> None:
+        mock_get.return_value.json.return_value = [
+            {"name": "Moscow", "lat": 55.75, "lon": 37.61, "country": "RU"}
+        ]
+        self.client.search_locations_by_name("Moscow")
+        assert self.client._refresh_executor is not None
+        self.client._refresh_executor.shutdown(wait=True)
+
+        other_worker = WeatherApiClient(api_key="test_key", use_cache=True)
+
+        self.assertEqual(other_worker.autocomplete("mos")[0]["country"], "RU")
+        mock_get.assert_called_once()
+
+    @patch("weather.services.requests.Session.get")
     def test_search_locations_by_name_no_results(self, mock_get: MagicMock) -> None:
         """Проверяем поведение при пустом списке локаций или с несуществующим городом."""
         mock_response = Mock()
@@ -57,7 +118,7 @@ class WeatherApiClientTest(TestCase):
         with self.assertRaises(WeatherAPINoLocationsError):
             self.client.search_locations_by_name("")
 
-    @patch("weather.services.requests.get")
+    @patch("weather.services.requests.Session.get")
     def test_api_timeout_error(self, mock_get: MagicMock) -> None:
         """Имитируем Timeout от requests"""
         mock_get.side_effect = Timeout("The request timed out")
@@ -68,7 +129,7 @@ class WeatherApiClientTest(TestCase):
         with self.assertRaises(WeatherAPITimeoutError):
             self.client.get_current_weather(55.754, 37.6204)
 
-    @patch("weather.services.requests.get")
+    @patch("weather.services.requests.Session.get")
     def test_api_connection_error(self, mock_get: MagicMock) -> None:
         """Имитируем ConnectionError"""
         mock_get.side_effect = ConnectionError("Network problem")
@@ -77,7 +138,7 @@ class WeatherApiClientTest(TestCase):
             self.client.search_locations_by_name("Москва")
             self.client.get_current_weather(55.754, 37.6204)
 
-    @patch("weather.services.requests.get")
+    @patch("weather.services.requests.Session.get")
     def test_api_http_error(self, mock_get: MagicMock) -> None:
         """Имитируем HTTPError"""
         mock_response = Mock()
@@ -89,101 +150,629 @@ class WeatherApiClientTest(TestCase):
             self.client.search_locations_by_name("Москва")
             self.client.get_current_weather(55.754, 37.6204)
 
-    @patch("weather.services.requests.get")
+    @patch("weather.services.requests.Session.get")
+    def test_api_quota_error(self, mock_get: MagicMock) -> None:
+        mock_response = Mock()
+        http_error = HTTPError(response=Mock(status_code=429, text="Too Many"))
+        mock_response.raise_for_status.side_effect = http_error
+        mock_get.return_value = mock_response
+
+        with self.assertRaises(WeatherAPIRateLimitError):
+            self.client.search_locations_by_name("Москва")
+
+    @patch("weather.services.requests.Session.get")
+    def test_rate_limit_stops_calls_before_the_api(self, mock_get: MagicMock) -> None:
+        client = WeatherApiClient(api_key="test_key", rate_limit=1)
+        client.rate_limiter.max_wait = 0  # type: ignore[union-attr]
+        mock_get.return_value.json.return_value = [
+            {"name": "Москва", "lat": 55.75, "lon": 37.62, "country": "RU"}
+        ]
+
+        client.search_locations_by_name("Москва")
+        with self.assertRaises(WeatherAPIRateLimitError):
+            client.search_locations_by_name("Воронеж")
+        mock_get.assert_called_once()
+
+    @patch("weather.services.requests.Session.get")
     def test_get_current_weather_success(self, mock_get: MagicMock) -> None:
         """Проверяем корректный ответ от API для получения погоды."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "coord": {"lon": 37.6204, "lat": 55.754},
-            "weather": [
-                {
-                    "id": 803,
-                    "main": "Clouds",
-                    "description": "облачно с прояснениями",
-                    "icon": "04d",
-                }
-            ],
-            "main": {
-                "temp": 23.17,
-                "feels_like": 22.4,
-                "temp_min": 23.17,
-                "temp_max": 23.17,
-                "pressure": 1016,
-                "humidity": 33,
-                "sea_level": 1016,
-                "grnd_level": 997,
-            },
-            "visibility": 10000,
-            "wind": {"speed": 5.67, "deg": 192, "gust": 7.39},
-            "clouds": {"all": 66},
-            "dt": 1747394977,
-            "sys": {"country": "RU", "sunrise": 1747358173, "sunset": 1747416945},
-            "timezone": 10800,
-            "id": 524901,
-            "name": "Москва",
-            "cod": 200,
-        }
+        mock_response.json.return_value = weather_response()
         mock_response.raise_for_status = Mock()
         mock_get.return_value = mock_response
 
         result = self.client.get_current_weather(55.754, 37.6204)
 
-        self.assertEqual(result["name"], "Москва")
-        self.assertIn("icon_url", result)
-        self.assertEqual(result["timezone"], "UTC+3")
+        self.assertEqual(result.temp, 23.17)
+        self.assertEqual(result.description, "облачно")
+        self.assertEqual(result.timezone, "UTC+3")
 
-    @patch("weather.services.requests.get")
+    @patch("weather.services.requests.Session.get")
     def test_get_current_weather_sets_cache(self, mock_get: MagicMock) -> None:
         """Проверяем, что данные сохраняются в кэш при первом вызове."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "coord": {"lon": 37.6204, "lat": 55.754},
-            "weather": [
-                {"id": 803, "main": "Clouds", "description": "облачно", "icon": "04d"}
-            ],
-            "main": {
-                "temp": 20.0,
-                "feels_like": 19.0,
-                "temp_min": 20.0,
-                "temp_max": 20.0,
-                "pressure": 1000,
-                "humidity": 60,
-                "sea_level": 1000,
-                "grnd_level": 990,
-            },
-            "visibility": 10000,
-            "wind": {"speed": 3.0, "deg": 180},
-            "clouds": {"all": 40},
-            "dt": 1234567890,
-            "sys": {"country": "RU", "sunrise": 1234567000, "sunset": 1234600000},
-            "timezone": 10800,
-            "id": 123456,
-            "name": "Москва",
-            "cod": 200,
-        }
+        mock_response.json.return_value = weather_response()
         mock_response.raise_for_status = Mock()
         mock_get.return_value = mock_response
 
         result = self.client.get_current_weather(55.754, 37.6204)
-        cache_key = "weather_55.754_37.6204_metric_ru"
+        cache_key = self.client._weather_cache_key(55.754, 37.6204, "metric", "ru")
 
         # Проверим, что данные кэшировались
         cached = cache.get(cache_key)
         self.assertIsNotNone(cached)
-        self.assertEqual(result, cached)
+        self.assertEqual(result, WeatherRecord.from_bytes(cached))
 
-    @patch("weather.services.requests.get")
+    @patch("weather.services.requests.Session.get")
     def test_get_current_weather_uses_cache(self, mock_get: MagicMock) -> None:
         """Проверяем, что при наличии данных в кэше API не вызывается повторно."""
-        cache_key = "weather_55.754_37.6204_metric_ru"
-        fake_cached_data = {"cached": "weather"}
+        cache_key = self.client._weather_cache_key(55.754, 37.6204, "metric", "ru")
+        fake_cached_data = make_record()
 
         # Заранее положили в кэш данные
-        cache.set(cache_key, fake_cached_data, 15 * 60)
+        cache.set(cache_key, fake_cached_data.to_bytes(), 15 * 60)
 
         result = self.client.get_current_weather(55.754, 37.6204)
 
         self.assertEqual(result, fake_cached_data)
         mock_get.assert_not_called()
+
+
+class QuantizedWeatherCacheTest(TestCase):
+    def setUp(self) -> None:
+        self.client: WeatherApiClient = WeatherApiClient(
+            api_key="test_key", use_cache=True, coord_precision=2
+        )  # type: ignore[assignment]
+        cache.clear()
+
+    def test_quantize_coordinates(self) -> None:
+        self.assertEqual(quantize_coordinates(55.7558, 37.6173, 2), (55.76, 37.62))
+        self.assertEqual(quantize_coordinates(-0.001, 0.004, 2), (0.0, 0.0))
+
+    @patch("weather.services.requests.Session.get")
+    def test_nearby_points_share_one_upstream_call(self, mock_get: MagicMock) -> None:
+        mock_response = Mock()
+        mock_response.json.return_value = weather_response()
+        mock_get.return_value = mock_response
+
+        first = self.client.get_current_weather(55.7558, 37.6173)
+        second = self.client.get_current_weather(55.7551, 37.6169)
+
+        self.assertEqual(first, second)
+        mock_get.assert_called_once()
+        self.assertEqual(mock_get.call_args.kwargs["params"]["lat"], 55.76)
+        self.assertIsNotNone(cache.get("weather_v1_55.76_37.62_metric_ru"))
+
+
+class StaleWeatherTest(TestCase):
+    cache_key = "weather_v1_55.754_37.6204_metric_ru"
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.stale_data = make_record(fetched_at=time.time() - 20 * 60)
+        cache.set(self.cache_key, self.stale_data.to_bytes(), 60 * 60)
+
+    def make_response(self) -> Mock:
+        mock_response = Mock()
+        mock_response.json.return_value = weather_response()
+        return mock_response
+
+    @patch("weather.services.requests.Session.get")
+    def test_stale_data_is_served_on_timeout(self, mock_get: MagicMock) -> None:
+        mock_get.side_effect = Timeout("The request timed out")
+        client = WeatherApiClient(api_key="test_key", use_cache=True)
+
+        result = client.get_current_weather(55.754, 37.6204)
+
+        self.assertEqual(result, self.stale_data)
+        mock_get.assert_called_once()
+
+    @patch("weather.services.requests.Session.get")
+    def test_stale_data_is_served_when_rate_limited(self, mock_get: MagicMock) -> None:
+        client = WeatherApiClient(api_key="test_key", use_cache=True, rate_limit=1)
+        client.rate_limiter.max_wait = 0  # type: ignore[union-attr]
+        client.rate_limiter.acquire()  # type: ignore[union-attr]
+
+        result = client.get_current_weather(55.754, 37.6204)
+
+        self.assertEqual(result, self.stale_data)
+        mock_get.assert_not_called()
+
+    @patch("weather.services.requests.Session.get")
+    def test_stale_data_is_refreshed_synchronously(self, mock_get: MagicMock) -> None:
+        mock_get.return_value = self.make_response()
+        client = WeatherApiClient(api_key="test_key", use_cache=True)
+
+        result = client.get_current_weather(55.754, 37.6204)
+
+        self.assertGreater(result.fetched_at, self.stale_data.fetched_at)
+
+    @patch("weather.services.requests.Session.get")
+    def test_stale_data_is_refreshed_in_background(self, mock_get: MagicMock) -> None:
+        mock_get.return_value = self.make_response()
+        client = WeatherApiClient(
+            api_key="test_key", use_cache=True, background_refresh=True
+        )
+
+        result = client.get_current_weather(55.754, 37.6204)
+        assert client._refresh_executor is not None
+        client._refresh_executor.shutdown(wait=True)
+
+        self.assertEqual(result, self.stale_data)
+        mock_get.assert_called_once()
+        refreshed = WeatherRecord.from_bytes(cache.get(self.cache_key))
+        self.assertGreater(refreshed.fetched_at, self.stale_data.fetched_at)
+
+    @patch("weather.services.requests.Session.get")
+    def test_entry_refreshed_by_another_worker_is_not_fetched(
+        self, mock_get: MagicMock
+    ) -> None:
+        client = WeatherApiClient(
+            api_key="test_key", use_cache=True, background_refresh=True
+        )
+        client.get_cached_weather(55.754, 37.6204)
+        fresh_data = make_record()
+        cache.set(self.cache_key, fresh_data.to_bytes(), 60 * 60)
+
+        result = client.get_current_weather(55.754, 37.6204)
+        assert client._refresh_executor is not None
+        client._refresh_executor.shutdown(wait=True)
+
+        self.assertEqual(result, self.stale_data)
+        mock_get.assert_not_called()
+        self.assertEqual(client.get_current_weather(55.754, 37.6204), fresh_data)
+
+    @patch("weather.services.requests.Session.get")
+    def test_fresh_data_is_not_refreshed(self, mock_get: MagicMock) -> None:
+        fresh_data = make_record()
+        cache.set(self.cache_key, fresh_data.to_bytes(), 60 * 60)
+        client = WeatherApiClient(
+            api_key="test_key", use_cache=True, background_refresh=True
+        )
+
+        self.assertEqual(client.get_current_weather(55.754, 37.6204), fresh_data)
+        mock_get.assert_not_called()
+
+
+class HistoryRecordingTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.recorder = Mock()
+        self.client: WeatherApiClient = WeatherApiClient(
+            api_key="test_key", use_cache=True, recorder=self.recorder
+        )  # type: ignore[assignment]
+
+    @patch("weather.services.requests.Session.get")
+    def test_fetched_weather_is_recorded(self, mock_get: MagicMock) -> None:
+        mock_get.return_value.json.return_value = weather_response()
+
+        record = self.client.get_current_weather(55.754, 37.6204)
+        self.client.get_current_weather(55.754, 37.6204)
+
+        self.recorder.record.assert_called_once_with(
+            55.754, 37.6204, 1747394977, record
+        )
+
+    @patch("weather.services.requests.Session.get")
+    def test_only_metric_weather_is_recorded(self, mock_get: MagicMock) -> None:
+        mock_get.return_value.json.return_value = weather_response()
+
+        self.client.get_current_weather(55.754, 37.6204, units="imperial")
+
+        self.recorder.record.assert_not_called()
+
+
+class ForecastTest(TestCase):
+    cache_key = "forecast_v1_55.76_37.62_metric"
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client: WeatherApiClient = WeatherApiClient(
+            api_key="test_key", use_cache=True, coord_precision=2
+        )  # type: ignore[assignment]
+
+    def make_response(self) -> Mock:
+        mock_response = Mock()
+        mock_response.json.return_value = forecast_response()
+        return mock_response
+
+    @patch("weather.services.requests.Session.get")
+    def test_forecast_is_packed_in_cache(self, mock_get: MagicMock) -> None:
+        mock_get.return_value = self.make_response()
+
+        first = self.client.get_forecast(55.7558, 37.6173)
+        second = self.client.get_forecast(55.7551, 37.6169)
+
+        self.assertEqual(len(first.time), 40)
+        self.assertIs(first, second)
+        mock_get.assert_called_once()
+        self.assertTrue(mock_get.call_args.args[0].endswith("data/2.5/forecast"))
+        self.assertEqual(Forecast.from_bytes(cache.get(self.cache_key)), first)
+
+    @patch("weather.services.requests.Session.get")
+    def test_stale_forecast_is_refreshed(self, mock_get: MagicMock) -> None:
+        mock_get.return_value = self.make_response()
+        stale = Forecast.from_api(forecast_response(), time.time() - 2 * 60 * 60)
+        cache.set(self.cache_key, stale.to_bytes(), 60 * 60)
+
+        result = self.client.get_forecast(55.76, 37.62)
+
+        self.assertGreater(result.fetched_at, stale.fetched_at)
+
+    @patch("weather.services.requests.Session.get")
+    def test_stale_forecast_is_served_on_timeout(self, mock_get: MagicMock) -> None:
+        mock_get.side_effect = Timeout("The request timed out")
+        stale = Forecast.from_api(forecast_response(), time.time() - 2 * 60 * 60)
+        cache.set(self.cache_key, stale.to_bytes(), 60 * 60)
+
+        self.assertEqual(self.client.get_forecast(55.76, 37.62), stale)
+        cache.clear()
+        self.client.cache.clear()
+        with self.assertRaises(WeatherAPITimeoutError):
+            self.client.get_forecast(55.76, 37.62)
+
+
+class WeatherBatchTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.client: WeatherApiClient = WeatherApiClient(
+            api_key="test_key", use_cache=True, coord_precision=2
+        )  # type: ignore[assignment]
+
+    def make_response(self, params: dict) -> Mock:
+        mock_response = Mock()
+        mock_response.json.return_value = weather_response(temp=params["lat"])
+        return mock_response
+
+    @patch("weather.services.requests.Session.get")
+    def test_fetches_only_missing_points(self, mock_get: MagicMock) -> None:
+        mock_get.side_effect = lambda url, params, timeout: self.make_response(params)
+        cached = make_record(description="cached")
+        cache.set("weather_v1_55.76_37.62_metric_ru", cached.to_bytes(), 60)
+        coords = [(55.7558, 37.6173), (51.66, 39.2), (51.661, 39.201)]
+
+        results = self.client.get_current_weather_many(coords)
+
+        self.assertEqual(list(results), coords)
+        self.assertEqual(results[(55.7558, 37.6173)], cached)
+        self.assertEqual(results[(51.66, 39.2)].temp, 51.66)  # type: ignore[union-attr]
+        self.assertIs(results[(51.66, 39.2)], results[(51.661, 39.201)])
+        mock_get.assert_called_once()
+        self.assertIsNotNone(cache.get("weather_v1_51.66_39.2_metric_ru"))
+
+    @patch("weather.services.requests.Session.get")
+    def test_workers_wait_for_batch_fetch(self, mock_get: MagicMock) -> None:
+        """A worker waiting for a point fetched by another one's batch reuses it."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_get(url: str, params: dict, timeout: int) -> Mock:
+            started.set()
+            release.wait(5)
+            return self.make_response(params)
+
+        def slow_set_many(*args: Any, **kwargs: Any) -> Any:
+            time.sleep(0.3)
+            return set_many(*args, **kwargs)
+
+        mock_get.side_effect = slow_get
+        # Leave waiting workers time to poll between a load and its storing.
+        set_many = TieredCache.set_many
+        self.enterContext(patch.object(TieredCache, "set_many", slow_set_many))
+        other: WeatherApiClient = WeatherApiClient(
+            api_key="test_key", use_cache=True, coord_precision=2
+        )  # type: ignore[assignment]
+        results: dict[str, Any] = {}
+
+        def batch() -> None:
+            results["batch"] = self.client.get_current_weather_many([(51.66, 39.2)])
+
+        def single() -> None:
+            results["single"] = other.get_current_weather(51.66, 39.2)
+
+        leader = threading.Thread(target=batch)
+        leader.start()
+        started.wait(5)
+        waiter = threading.Thread(target=single)
+        waiter.start()
+        time.sleep(0.2)
+        release.set()
+        leader.join()
+        waiter.join()
+
+        mock_get.assert_called_once()
+        self.assertEqual(results["single"], results["batch"][(51.66, 39.2)])
+
+    @patch("weather.services.requests.Session.get")
+    def test_failed_point_maps_to_error(self, mock_get: MagicMock) -> None:
+        def fake_get(url: str, params: dict, timeout: int) -> Mock:
+            if params["lat"] == 51.66:
+                raise Timeout("The request timed out")
+            return self.make_response(params)
+
+        mock_get.side_effect = fake_get
+
+        results = self.client.get_current_weather_many([(51.66, 39.2), (55.0, 37.0)])
+
+        self.assertIsInstance(results[(51.66, 39.2)], WeatherAPITimeoutError)
+        self.assertEqual(results[(55.0, 37.0)].temp, 55.0)  # type: ignore[union-attr]
+
+    @patch("weather.services.requests.Session.get")
+    def test_stale_point_is_served_on_timeout(self, mock_get: MagicMock) -> None:
+        mock_get.side_effect = Timeout("The request timed out")
+        stale = make_record(fetched_at=time.time() - 20 * 60)
+        cache.set("weather_v1_51.66_39.2_metric_ru", stale.to_bytes(), 60 * 60)
+
+        results = self.client.get_current_weather_many([(51.66, 39.2)])
+
+        self.assertEqual(results[(51.66, 39.2)], stale)
+
+    def test_cached_weather_many_never_calls_api(self) -> None:
+        fresh = make_record()
+        stale = make_record(fetched_at=time.time() - 20 * 60)
+        cache.set("weather_v1_55.76_37.62_metric_ru", fresh.to_bytes(), 60)
+        cache.set("weather_v1_51.66_39.2_metric_ru", stale.to_bytes(), 60)
+        coords = [(55.7558, 37.6173), (51.66, 39.2), (60.0, 30.0)]
+
+        with patch("weather.services.requests.Session.get") as mock_get:
+            cached = self.client.get_cached_weather_many(coords)
+            fresh_only = self.client.get_cached_weather_many(coords, fresh_only=True)
+
+        mock_get.assert_not_called()
+        self.assertEqual(list(cached.values()), [fresh, stale, None])
+        self.assertEqual(list(fresh_only.values()), [fresh, None, None])
+
+
+class WeatherApiClientSessionTest(TestCase):
+    def test_single_flight_outlasts_retried_call(self) -> None:
+        client = WeatherApiClient(api_key="test_key", max_retries=2, rate_limit=60)
+        limiter_wait = client.rate_limiter.max_wait  # type: ignore[union-attr]
+        longest = 3 * (limiter_wait + client.connect_timeout + client.read_timeout)
+        longest += 2 * client.RETRY_BACKOFF_MAX
+
+        self.assertAlmostEqual(client.single_flight.wait_timeout, longest)
+        self.assertGreater(client.single_flight.lock_timeout, longest)
+
+    def test_session_is_reused_between_calls(self) -> None:
+        client = WeatherApiClient(api_key="test_key")
+        self.assertIs(client.session, client.session)
+
+    def test_session_pool_size(self) -> None:
+        client = WeatherApiClient(api_key="test_key", pool_size=4, max_retries=2)
+        adapter = client.session.get_adapter(WeatherApiClient.BASE_URL)
+
+        self.assertEqual(adapter._pool_maxsize, 4)  # type: ignore[attr-defined]
+        self.assertEqual(adapter.max_retries.total, 0)  # type: ignore[attr-defined]
+
+    def test_session_is_recreated_after_fork(self) -> None:
+        client = WeatherApiClient(api_key="test_key")
+        parent_session = client.session
+
+        _reset_clients_after_fork()
+
+        self.assertIsNot(client.session, parent_session)
+
+
+@patch("weather.services.time.sleep")
+@patch("weather.services.requests.Session.get")
+class WeatherApiClientRetryTest(TestCase):
+    def setUp(self) -> None:
+        self.client: WeatherApiClient = WeatherApiClient(
+            api_key="test_key", max_retries=2
+        )  # type: ignore[assignment]
+
+    def make_response(self, status_code: int, headers: dict | None = None) -> Mock:
+        response = Mock(status_code=status_code, headers=headers or {})
+        response.json.return_value = [
+            {"name": "Москва", "lat": 55.75, "lon": 37.62, "country": "RU"}
+        ]
+        if status_code >= 400:
+            response.raise_for_status.side_effect = HTTPError(response=response)
+        return response
+
+    def test_retries_server_errors_with_backoff(
+        self, mock_get: MagicMock, mock_sleep: MagicMock
+    ) -> None:
+        mock_get.side_effect = [
+            self.make_response(503),
+            ConnectionError("Connection reset"),
+            self.make_response(200),
+        ]
+
+        result = self.client.search_locations_by_name("Москва")
+
+        self.assertEqual(result[0]["name"], "Москва")
+        self.assertEqual(mock_get.call_count, 3)
+        first, second = (call.args[0] for call in mock_sleep.call_args_list)
+        self.assertLessEqual(first, WeatherApiClient.RETRY_BACKOFF)
+        self.assertLessEqual(second, WeatherApiClient.RETRY_BACKOFF * 2)
+        self.assertEqual(
+            mock_get.call_args.kwargs["timeout"],
+            (WeatherApiClient.CONNECT_TIMEOUT, WeatherApiClient.READ_TIMEOUT),
+        )
+
+    def test_honors_retry_after(
+        self, mock_get: MagicMock, mock_sleep: MagicMock
+    ) -> None:
+        mock_get.side_effect = [
+            self.make_response(429, {"Retry-After": "2"}),
+            self.make_response(200),
+        ]
+
+        self.client.search_locations_by_name("Москва")
+
+        mock_sleep.assert_called_once_with(2.0)
+
+    def test_does_not_wait_for_long_retry_after(
+        self, mock_get: MagicMock, mock_sleep: MagicMock
+    ) -> None:
+        mock_get.return_value = self.make_response(429, {"Retry-After": "3600"})
+
+        with self.assertRaises(WeatherAPIRateLimitError):
+            self.client.search_locations_by_name("Москва")
+
+        mock_get.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_gives_up_after_max_retries(
+        self, mock_get: MagicMock, mock_sleep: MagicMock
+    ) -> None:
+        mock_get.return_value = self.make_response(502)
+
+        with self.assertRaises(WeatherAPIInvalidRequestError):
+            self.client.search_locations_by_name("Москва")
+        self.assertEqual(mock_get.call_count, 3)
+
+    def test_does_not_retry_past_the_deadline(
+        self, mock_get: MagicMock, mock_sleep: MagicMock
+    ) -> None:
+        mock_get.return_value = self.make_response(503, {"Retry-After": "30"})
+
+        with self.assertRaises(WeatherAPIInvalidRequestError):
+            self.client.get_current_weather(55.754, 37.6204, timeout=2)
+
+        mock_get.assert_called_once()
+        mock_sleep.assert_not_called()
+        connect, read = mock_get.call_args.kwargs["timeout"]
+        self.assertLessEqual(read, 2)
+
+    def test_expired_deadline_is_a_timeout(
+        self, mock_get: MagicMock, mock_sleep: MagicMock
+    ) -> None:
+        with self.assertRaises(WeatherAPITimeoutError):
+            self.client.get_current_weather(55.754, 37.6204, timeout=0)
+        mock_get.assert_not_called()
+
+    def test_expired_deadline_does_not_open_the_breaker(
+        self, mock_get: MagicMock, mock_sleep: MagicMock
+    ) -> None:
+        client = WeatherApiClient(api_key="test_key", breaker_threshold=1)
+        mock_get.return_value = self.make_response(200)
+        mock_get.return_value.json.return_value = weather_response()
+
+        with self.assertRaises(WeatherAPIDeadlineError):
+            client.get_current_weather(55.754, 37.6204, timeout=0)
+        client.get_current_weather(55.754, 37.6204)
+
+        mock_get.assert_called_once()
+
+
+class AsyncWeatherApiClientTest(TestCase):
+    def setUp(self) -> None:
+        self.client: AsyncWeatherApiClient = AsyncWeatherApiClient(
+            api_key="test_key", use_cache=True
+        )  # type: ignore[assignment]
+        cache.clear()
+
+    @patch("weather.services.httpx.AsyncClient.get", new_callable=AsyncMock)
+    async def test_get_current_weather_success(self, mock_get: AsyncMock) -> None:
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = weather_response()
+        mock_get.return_value = mock_response
+
+        result = await self.client.get_current_weather(55.754, 37.6204)
+        cached = await self.client.get_current_weather(55.754, 37.6204)
+
+        self.assertEqual(result.timezone, "UTC+3")
+        self.assertEqual(result, cached)
+        mock_get.assert_awaited_once()
+
+    @patch("weather.services.httpx.AsyncClient.get", new_callable=AsyncMock)
+    async def test_get_current_weather_many(self, mock_get: AsyncMock) -> None:
+        mock_response = Mock()
+        mock_response.json.return_value = weather_response()
+        mock_get.side_effect = [mock_response, httpx.ConnectTimeout("timed out")]
+        cached = make_record(description="cached")
+        cache.set("weather_v1_55.0_37.0_metric_ru", cached.to_bytes(), 60)
+
+        results = await self.client.get_current_weather_many(
+            [(55.0, 37.0), (51.66, 39.2), (60.0, 30.0)]
+        )
+
+        self.assertEqual(results[(55.0, 37.0)], cached)
+        self.assertIsInstance(results[(51.66, 39.2)], WeatherRecord)
+        self.assertIsInstance(results[(60.0, 30.0)], WeatherAPITimeoutError)
+        self.assertEqual(mock_get.await_count, 2)
+
+    @patch("weather.services.httpx.AsyncClient.get", new_callable=AsyncMock)
+    async def test_get_forecast(self, mock_get: AsyncMock) -> None:
+        mock_response = Mock()
+        mock_response.json.return_value = forecast_response()
+        mock_get.return_value = mock_response
+
+        result = await self.client.get_forecast(55.754, 37.6204)
+        cached = await self.client.get_forecast(55.754, 37.6204)
+
+        self.assertEqual(len(result.daily()), 6)
+        self.assertIs(result, cached)
+        mock_get.assert_awaited_once()
+
+    @patch("weather.services.asyncio.sleep", new_callable=AsyncMock)
+    @patch("weather.services.httpx.AsyncClient.get", new_callable=AsyncMock)
+    async def test_retries_with_retry_after(
+        self, mock_get: AsyncMock, mock_sleep: AsyncMock
+    ) -> None:
+        client = AsyncWeatherApiClient(api_key="test_key", max_retries=1)
+        mock_response = Mock(status_code=200)
+        mock_response.json.return_value = [
+            {"name": "Москва", "lat": 55.75, "lon": 37.62, "country": "RU"}
+        ]
+        mock_get.side_effect = [
+            Mock(status_code=503, headers={"Retry-After": "1"}),
+            mock_response,
+        ]
+
+        result = await client.search_locations_by_name("Москва")
+
+        self.assertEqual(result[0]["name"], "Москва")
+        mock_sleep.assert_awaited_once_with(1.0)
+
+    @patch("weather.services.httpx.AsyncClient.get", new_callable=AsyncMock)
+    async def test_search_locations_by_name_success(self, mock_get: AsyncMock) -> None:
+        mock_response = Mock()
+        mock_response.json.return_value = [
+            {
+                "name": "Moscow",
+                "local_names": {"ru": "Москва"},
+                "lat": 55.75,
+                "lon": 37.62,
+                "country": "RU",
+            },
+            {
+                "name": "Moscow",
+                "local_names": {"ru": "Москва"},
+                "lat": 55.75,
+                "lon": 37.62,
+                "country": "RU",
+            },
+        ]
+        mock_get.return_value = mock_response
+
+        result = await self.client.search_locations_by_name("Moscow")
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]["name"], "Москва")
+
+    @patch("weather.services.httpx.AsyncClient.get", new_callable=AsyncMock)
+    async def test_api_errors(self, mock_get: AsyncMock) -> None:
+        mock_get.side_effect = httpx.ConnectTimeout("The request timed out")
+        with self.assertRaises(WeatherAPITimeoutError):
+            await self.client.get_current_weather(55.754, 37.6204)
+
+        mock_get.side_effect = httpx.ConnectError("Network problem")
+        with self.assertRaises(WeatherAPIConnectionError):
+            await self.client.search_locations_by_name("Москва")
+
+    @patch("weather.services.httpx.AsyncClient.get", new_callable=AsyncMock)
+    async def test_search_locations_by_name_no_results(
+        self, mock_get: AsyncMock
+    ) -> None:
+        mock_response = Mock()
+        mock_response.json.return_value = []
+        mock_get.return_value = mock_response
+
+        with self.assertRaises(WeatherAPINoLocationsError):
+            await self.client.search_locations_by_name("NonexistentСity")
@@ -1,10 +1,17 @@
+import time
+from typing import Any
 from unittest.mock import patch, MagicMock
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
+from weather.exceptions import WeatherAPINoLocationsError, WeatherAPITimeoutError
+from weather.history import HistoryRecorder
 from weather.models import Location
+from weather.records import Forecast
+from weather.tests.test_records import forecast_response, make_record
+from weather.views import WeatherHomeView
 
 
 class WeatherViewsHomePageTestCase(TestCase):
@@ -57,11 +64,375 @@ class WeatherViewsHomePageTestCase(TestCase):
         self.assertEqual(len(response_page_1.context["locations_with_weather"]), 8)
         self.assertEqual(len(response_page_2.context["locations_with_weather"]), 4)
 
+    @patch("weather.utils.WeatherApiClient.get_current_weather_many")
+    def test_homepage_fetches_weather_only_for_current_page(
+        self, mock_weather: MagicMock
+    ) -> None:
+        mock_weather.side_effect = lambda coords, **kwargs: {
+            coord: make_record(temp=20.0) for coord in coords
+        }
+        for i in range(20):
+            Location.objects.create(
+                user=self.user, name=f"Город{i}", latitude=55.0 + i, longitude=37.0
+            )
+
+        response = self.client.get(self.url + "?page=3")
+
+        self.assertEqual(len(response.context["locations_with_weather"]), 4)
+        mock_weather.assert_called_once()
+        self.assertEqual(
+            mock_weather.call_args.args[0], [(55.0 + i, 37.0) for i in range(16, 20)]
+        )
+        self.assertEqual(
+            [loc["name"] for loc in response.context["locations_with_weather"]],
+            [f"Город{i}" for i in range(16, 20)],
+        )
+
+    @patch("weather.utils.WeatherApiClient.get_current_weather_many")
+    def test_homepage_reports_failed_location_and_keeps_order(
+        self, mock_weather: MagicMock
+    ) -> None:
+        def fake_weather(coords: list, **kwargs: Any) -> dict:
+            return {
+                (lat, lon): WeatherAPITimeoutError("Service timeout")
+                if lat == 56.0
+                else make_record(temp=lat)
+                for lat, lon in coords
+            }
+
+        mock_weather.side_effect = fake_weather
+        for i in range(3):
+            Location.objects.create(
+                user=self.user, name=f"Город{i}", latitude=55.0 + i, longitude=37.0
+            )
+
+        response = self.client.get(self.url)
+        cards = response.context["locations_with_weather"]
+
+        self.assertEqual(
+            [card["name"] for card in cards], ["Город0", "Город1", "Город2"]
+        )
+        self.assertNotIn("error", cards[0])
+        self.assertEqual(cards[1]["error"], "Service timeout. Please try again later.")
+        self.assertEqual(cards[2]["weather"].temp, 57.0)
+        self.assertContains(response, "Service timeout. Please try again later.")
+        self.assertContains(response, "57℃")
+
     def test_custom_404_handler(self) -> None:
         response = self.client.get("/some/nonexistent/page/")
         self.assertTemplateUsed(response, "weather/not_found.html")
 
 
+class ProgressiveHomePageTestCase(TestCase):
+    """Home page rendered from cached weather, the rest loaded per card."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(  # type: ignore
+            username="testuser", password="pass123"
+        )
+        self.client.login(username="testuser", password="pass123")
+        self.cached = Location.objects.create(
+            user=self.user, name="Москва", latitude=55.75, longitude=37.61
+        )
+        self.pending = Location.objects.create(
+            user=self.user, name="Воронеж", latitude=51.66, longitude=39.2
+        )
+
+    @patch("weather.utils.WeatherApiClient.get_current_weather_many")
+    @patch("weather.utils.WeatherApiClient.get_cached_weather_many")
+    @patch.object(WeatherHomeView, "progressive", True)
+    def test_cached_cards_are_rendered_and_others_left_pending(
+        self, mock_cached: MagicMock, mock_weather: MagicMock
+    ) -> None:
+        mock_cached.return_value = {
+            (55.75, 37.61): make_record(temp=21.0),
+            (51.66, 39.2): None,
+        }
+
+        response = self.client.get(reverse("index"))
+
+        mock_weather.assert_not_called()
+        self.assertEqual(mock_cached.call_args.kwargs, {"fresh_only": True})
+        self.assertContains(response, "21℃")
+        card_url = reverse("location_card", args=[self.pending.pk])
+        self.assertContains(response, f'data-card-url="{card_url}"')
+        self.assertContains(response, "weather/js/cards.js")
+
+    @patch("weather.utils.WeatherApiClient.get_current_weather_many")
+    def test_card_view_fetches_weather_of_one_location(
+        self, mock_weather: MagicMock
+    ) -> None:
+        mock_weather.return_value = {(51.66, 39.2): make_record(temp=17.0)}
+
+        response = self.client.get(reverse("location_card", args=[self.pending.pk]))
+
+        self.assertEqual(mock_weather.call_args.args[0], [(51.66, 39.2)])
+        self.assertIn("17℃", response.json()["html"])
+        self.assertIn("Воронеж, RU", response.json()["html"])
+
+    def test_card_view_of_other_users_location_is_not_found(self) -> None:
+        other_user = get_user_model().objects.create_user(  # type: ignore
+            username="otheruser", password="123"
+        )
+        foreign = Location.objects.create(
+            user=other_user, name="Казань", latitude=55.79, longitude=49.12
+        )
+
+        response = self.client.get(reverse("location_card", args=[foreign.pk]))
+
+        self.assertTemplateUsed(response, "weather/not_found.html")
+
+
+class LocationsApiTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(  # type: ignore
+            username="testuser", password="pass123"
+        )
+        self.client.login(username="testuser", password="pass123")
+        self.location = Location.objects.create(
+            user=self.user, name="Москва", latitude=55.75, longitude=37.61
+        )
+        self.url = reverse("api_locations")
+        self.record = make_record(temp=21.0, fetched_at=time.time() - 5 * 60)
+        patcher = patch("weather.utils.WeatherApiClient.get_current_weather_many")
+        self.mock_weather = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_weather.side_effect = lambda coords, **kwargs: {
+            coord: self.record for coord in coords
+        }
+
+    def test_returns_locations_with_weather(self) -> None:
+        response = self.client.get(self.url)
+
+        location = response.json()["locations"][0]
+        self.assertEqual(location["name"], "Москва")
+        self.assertEqual((location["lat"], location["lon"]), (55.75, 37.61))
+        self.assertEqual(location["weather"]["temp"], 21.0)
+        self.assertEqual(location["weather"]["timezone"], "UTC+3")
+        self.assertIsNone(location["error"])
+        self.assertTrue(response.has_header("ETag"))
+        self.assertFalse(response.has_header("Last-Modified"))
+        max_age = int(response["Cache-Control"].split("max-age=")[1])
+        self.assertAlmostEqual(max_age, 10 * 60, delta=2)
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_unchanged_weather_is_not_modified(self) -> None:
+        first = self.client.get(self.url)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], first["ETag"])
+
+    def test_changed_locations_change_etag(self) -> None:
+        first = self.client.get(self.url)
+        Location.objects.create(
+            user=self.user, name="Воронеж", latitude=51.66, longitude=39.2
+        )
+
+        added = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.location.name = "Москва, Россия"
+        self.location.save()
+        renamed = self.client.get(self.url, HTTP_IF_NONE_MATCH=added["ETag"])
+
+        self.assertEqual(added.status_code, 200)
+        self.assertEqual(len(added.json()["locations"]), 2)
+        self.assertEqual(renamed.status_code, 200)
+
+    def test_refreshed_weather_changes_etag(self) -> None:
+        first = self.client.get(self.url)
+        self.record = make_record(temp=25.0)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+
+    def test_error_is_not_cached(self) -> None:
+        self.mock_weather.side_effect = lambda coords, **kwargs: {
+            coord: WeatherAPITimeoutError("Service timeout") for coord in coords
+        }
+
+        response = self.client.get(self.url)
+
+        location = response.json()["locations"][0]
+        self.assertIsNone(location["weather"])
+        self.assertEqual(location["error"], "Service timeout. Please try again later.")
+        self.assertIn("max-age=0", response["Cache-Control"])
+
+
+class LocationHistoryTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(  # type: ignore
+            username="testuser", password="pass123"
+        )
+        self.client.login(username="testuser", password="pass123")
+        self.location = Location.objects.create(
+            user=self.user, name="Москва", latitude=55.7558, longitude=37.6173
+        )
+        self.url = reverse("location_history", args=[self.location.pk])
+        recorder = HistoryRecorder(flush_interval=None)
+        now = int(time.time())
+        for hours in (1, 2, 50):
+            recorder.record(
+                55.76, 37.62, now - hours * 60 * 60, make_record(temp=float(hours))
+            )
+        recorder.flush()
+
+    def test_returns_series_of_grid_point(self) -> None:
+        response = self.client.get(self.url, {"days": "2", "bucket": "day"})
+
+        data = response.json()
+        self.assertEqual(data["bucket"], "day")
+        self.assertEqual(sum(row["count"] for row in data["series"]), 2)
+        self.assertEqual(max(row["temp_max"] for row in data["series"]), 2.0)
+
+    def test_default_period(self) -> None:
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.json()["bucket"], "day")
+        self.assertEqual(sum(row["count"] for row in response.json()["series"]), 3)
+
+    def test_invalid_period_is_rejected(self) -> None:
+        response = self.client.get(self.url, {"bucket": "decade"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_other_users_location_is_not_found(self) -> None:
+        other = get_user_model().objects.create_user(  # type: ignore
+            username="other", password="pass123"
+        )
+        location = Location.objects.create(
+            user=other, name="Воронеж", latitude=51.66, longitude=39.2
+        )
+
+        response = self.client.get(reverse("location_history", args=[location.pk]))
+
+        self.assertTemplateUsed(response, "weather/not_found.html")
+
+
+class PublicApiTestCase(TestCase):
+    """Public endpoints cached by nginx."""
+
+    def setUp(self) -> None:
+        self.weather_url = reverse("public_weather")
+        self.search_url = reverse("public_search")
+        self.forecast_url = reverse("public_forecast")
+
+    def test_weather_point_is_redirected_to_cache_grid(self) -> None:
+        response = self.client.get(
+            self.weather_url, {"lat": "55.7558", "lon": "37.6173"}
+        )
+
+        self.assertRedirects(
+            response,
+            f"{self.weather_url}?lat=55.76&lon=37.62",
+            fetch_redirect_response=False,
+        )
+        self.assertIn("public", response["Cache-Control"])
+
+    @patch("weather.utils.WeatherApiClient.get_current_weather")
+    def test_weather_is_public_and_cacheable(self, mock_weather: MagicMock) -> None:
+        get_user_model().objects.create_user(  # type: ignore
+            username="testuser", password="pass123"
+        )
+        self.client.login(username="testuser", password="pass123")
+        mock_weather.return_value = make_record(
+            temp=21.0, fetched_at=time.time() - 5 * 60
+        )
+
+        response = self.client.get(f"{self.weather_url}?lat=55.76&lon=37.62")
+        not_modified = self.client.get(
+            f"{self.weather_url}?lat=55.76&lon=37.62",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+
+        self.assertEqual(response.json()["temp"], 21.0)
+        self.assertEqual(response.json()["lat"], 55.76)
+        self.assertIn("public", response["Cache-Control"])
+        max_age = int(response["Cache-Control"].split("max-age=")[1])
+        self.assertAlmostEqual(max_age, 10 * 60, delta=2)
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+        self.assertFalse(response.cookies)
+        self.assertEqual(not_modified.status_code, 304)
+
+    @patch("weather.utils.WeatherApiClient.get_current_weather")
+    def test_weather_error_is_not_cached(self, mock_weather: MagicMock) -> None:
+        mock_weather.side_effect = WeatherAPITimeoutError("Service timeout")
+
+        response = self.client.get(f"{self.weather_url}?lat=55.76&lon=37.62")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("no-store", response["Cache-Control"])
+
+    def test_invalid_point_is_rejected(self) -> None:
+        response = self.client.get(self.weather_url, {"lat": 100, "lon": 0})
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch("weather.utils.WeatherApiClient.get_forecast")
+    def test_forecast_is_public_with_daily_aggregates(
+        self, mock_forecast: MagicMock
+    ) -> None:
+        mock_forecast.return_value = Forecast.from_api(
+            forecast_response(), fetched_at=time.time() - 15 * 60
+        )
+
+        response = self.client.get(f"{self.forecast_url}?lat=55.76&lon=37.62")
+        not_modified = self.client.get(
+            f"{self.forecast_url}?lat=55.76&lon=37.62",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+
+        data = response.json()
+        self.assertEqual(len(data["time"]), 40)
+        self.assertEqual(data["daily"][1]["date"], "2025-05-17")
+        self.assertEqual(data["daily"][1]["temp_max"], 17.0)
+        max_age = int(response["Cache-Control"].split("max-age=")[1])
+        self.assertAlmostEqual(max_age, 45 * 60, delta=2)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_forecast_point_is_redirected_to_cache_grid(self) -> None:
+        response = self.client.get(
+            self.forecast_url, {"lat": "55.7558", "lon": "37.6173"}
+        )
+
+        self.assertRedirects(
+            response,
+            f"{self.forecast_url}?lat=55.76&lon=37.62",
+            fetch_redirect_response=False,
+        )
+
+    def test_search_query_is_redirected_to_normal_form(self) -> None:
+        response = self.client.get(self.search_url, {"q": "  Нижний   Новгород"})
+
+        self.assertRedirects(
+            response,
+            f"{self.search_url}?q=%D0%BD%D0%B8%D0%B6%D0%BD%D0%B8%D0%B9"
+            "+%D0%BD%D0%BE%D0%B2%D0%B3%D0%BE%D1%80%D0%BE%D0%B4",
+            fetch_redirect_response=False,
+        )
+
+    @patch("weather.utils.WeatherApiClient.search_locations_by_name")
+    def test_search_results_are_public(self, mock_search: MagicMock) -> None:
+        mock_search.return_value = [
+            {"name": "Москва", "lat": 55.75, "lon": 37.61, "country": "RU"}
+        ]
+
+        response = self.client.get(self.search_url, {"q": "москва"})
+
+        self.assertEqual(response.json()["results"][0]["name"], "Москва")
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+
+    @patch("weather.utils.WeatherApiClient.search_locations_by_name")
+    def test_search_without_results_is_empty(self, mock_search: MagicMock) -> None:
+        mock_search.side_effect = WeatherAPINoLocationsError("No locations found")
+
+        response = self.client.get(self.search_url, {"q": "нигде"})
+
+        self.assertEqual(response.json(), {"query": "нигде", "results": []})
+
+
 class ShowLocationViewTestCase(TestCase):
     """Tests of the location search page (ShowLocationView)."""
 
@@ -107,6 +478,52 @@ class ShowLocationViewTestCase(TestCase):
         self.assertTemplateUsed(response, "weather/locations.html")
 
 
+class AutocompleteViewTestCase(TestCase):
+    def setUp(self) -> None:
+        get_user_model().objects.create_user(  # type: ignore
+            username="testuser", password="pass123"
+        )
+        self.client.login(username="testuser", password="pass123")
+        self.url = reverse("autocomplete")
+
+    @patch("weather.utils.WeatherApiClient.autocomplete")
+    def test_returns_suggestions(self, mock_autocomplete: MagicMock) -> None:
+        mock_autocomplete.return_value = [
+            {
+                "name": "Москва",
+                "local_names": {"en": "Moscow"},
+                "lat": 55.75,
+                "lon": 37.61,
+                "country": "RU",
+            }
+        ]
+
+        response = self.client.get(self.url, {"q": "Мос"})
+
+        self.assertEqual(
+            response.json(),
+            {
+                "results": [
+                    {
+                        "name": "Москва",
+                        "state": None,
+                        "country": "RU",
+                        "lat": 55.75,
+                        "lon": 37.61,
+                    }
+                ]
+            },
+        )
+        mock_autocomplete.assert_called_once_with("Мос", 6)
+
+    @patch("weather.utils.WeatherApiClient.autocomplete")
+    def test_short_query_is_not_looked_up(self, mock_autocomplete: MagicMock) -> None:
+        response = self.client.get(self.url, {"q": "М"})
+
+        self.assertEqual(response.json(), {"results": []})
+        mock_autocomplete.assert_not_called()
+
+
 class AddLocationViewTestCase(TestCase):
     """Tests adding a location (AddLocationView)."""
 
@@ -129,6 +546,27 @@ class AddLocationViewTestCase(TestCase):
         self.assertEqual(float(location.latitude), 55.75)
         self.assertEqual(float(location.longitude), 37.61)
 
+    def test_same_place_is_added_once(self) -> None:
+        self.client.post(
+            self.url, {"name": "Москва", "latitude": 55.75, "longitude": 37.61}
+        )
+        self.client.post(
+            self.url,
+            {"name": "Moscow", "latitude": 55.750004, "longitude": 37.609996},
+        )
+
+        location = Location.objects.get(user=self.user)
+        self.assertEqual(location.name, "Москва")
+        self.assertEqual((location.latitude, location.longitude), (55.75, 37.61))
+
+    def test_invalid_coordinates_are_rejected(self) -> None:
+        response = self.client.post(
+            self.url, {"name": "Нигде", "latitude": "north", "longitude": 200}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Location.objects.exists())
+
     def test_add_location_unauthenticated_redirect(self) -> None:
         self.client.logout()
         data = {"name": "Тест", "latitude": 10.0, "longitude": 20.0}
@@ -169,3 +607,54 @@ class DeleteLocationViewTestCase(TestCase):
         response = self.client.post(url)
         self.assertEqual(response.status_code, 200)
         self.assertTrue(Location.objects.filter(pk=foreign_location.pk).exists())
+
+
+@override_settings(ROOT_URLCONF="weather.tests.async_urls")
+class AsyncViewsTestCase(TestCase):
+    """Tests of the ASGI versions of the home and search pages."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(  # type: ignore
+            username="testuser", password="pass123"
+        )
+
+    @patch("weather.services.AsyncWeatherApiClient.get_current_weather_many")
+    async def test_home_view_paginates_and_fetches_page(
+        self, mock_weather: MagicMock
+    ) -> None:
+        mock_weather.side_effect = lambda coords, **kwargs: {
+            coord: make_record(temp=20.0) for coord in coords
+        }
+        for i in range(10):
+            await Location.objects.acreate(
+                user=self.user, name=f"Город{i}", latitude=55.0 + i, longitude=37.0
+            )
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get("/", {"page": "2"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Город9")
+        self.assertNotContains(response, "Город7")
+        mock_weather.assert_awaited_once_with([(63.0, 37.0), (64.0, 37.0)], timeout=8.0)
+
+    async def test_home_view_redirects_anonymous(self) -> None:
+        response = await self.async_client.get("/")
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(reverse("users:login")))  # type: ignore
+
+    @patch("weather.views.AsyncShowLocationView.ahandle_search")
+    async def test_search_view_valid_city_query(
+        self, mock_handle_search: MagicMock
+    ) -> None:
+        mock_handle_search.return_value = (
+            [{"name": "Москва", "lat": 55.75, "lon": 37.61, "country": "RU"}],
+            None,
+        )
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get("/weather/", {"city": "Москва"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Москва, RU")
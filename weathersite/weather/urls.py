@@ -1,11 +1,44 @@
 from django.urls import path
 
+from weathersite.settings import WEATHER_ASYNC_VIEWS
 from . import views
 
+if WEATHER_ASYNC_VIEWS:
+    home_view = views.AsyncWeatherHomeView.as_view()
+    search_view = views.AsyncShowLocationView.as_view()
+else:
+    home_view = views.WeatherHomeView.as_view()
+    search_view = views.ShowLocationView.as_view()
+
 urlpatterns = [
-    path("", views.WeatherHomeView.as_view(), name="index"),
-    path("weather/", views.ShowLocationView.as_view(), name="search"),
+    path("", home_view, name="index"),
+    path("weather/", search_view, name="search"),
+    path(
+        "weather/autocomplete/",
+        views.AutocompleteView.as_view(),
+        name="autocomplete",
+    ),
+    path(
+        "api/public/weather/", views.PublicWeatherView.as_view(), name="public_weather"
+    ),
+    path(
+        "api/public/forecast/",
+        views.PublicForecastView.as_view(),
+        name="public_forecast",
+    ),
+    path("api/public/search/", views.PublicSearchView.as_view(), name="public_search"),
+    path("api/locations/", views.LocationsApiView.as_view(), name="api_locations"),
+    path(
+        "api/locations/<int:pk>/history/",
+        views.LocationHistoryView.as_view(),
+        name="location_history",
+    ),
     path("location/add/", views.AddLocationView.as_view(), name="add_location"),
+    path(
+        "location/<int:pk>/card/",
+        views.LocationCardView.as_view(),
+        name="location_card",
+    ),
     path(
         "location/delete/<int:pk>/",
         views.DeleteWeatherCardView.as_view(),
@@ -1,24 +1,129 @@
 import logging
-from typing import Any
+import threading
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any, overload
 
+from django.contrib.auth.mixins import AccessMixin
+from django.contrib.auth.views import redirect_to_login
 from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponseBase
 
 from weather.exceptions import (
     WeatherAPINoLocationsError,
     WeatherAPITimeoutError,
     WeatherAPIConnectionError,
     WeatherAPIError,
+    WeatherAPIRateLimitError,
+    WeatherAPIUnavailableError,
 )
+from weather.history import HistoryRecorder
 from weather.models import Location
-from weather.services import WeatherApiClient
-from weathersite.settings import OW_API_KEY
+from weather.records import WeatherRecord
+from weather.services import AsyncWeatherApiClient, WeatherApiClient
+from weathersite.settings import (
+    OW_API_KEY,
+    WEATHER_FETCH_WORKERS,
+    WEATHER_HTTP_POOL_SIZE,
+    WEATHER_HTTP_RETRIES,
+    WEATHER_CONNECT_TIMEOUT,
+    WEATHER_READ_TIMEOUT,
+    WEATHER_PAGE_TIMEOUT,
+    WEATHER_LOCAL_CACHE_SIZE,
+    WEATHER_LOCAL_CACHE_TTL,
+    WEATHER_COORD_PRECISION,
+    WEATHER_CACHE_TTL,
+    WEATHER_STALE_TTL,
+    WEATHER_FORECAST_TTL,
+    WEATHER_FORECAST_STALE_TTL,
+    WEATHER_RATE_LIMIT,
+    WEATHER_RATE_LIMIT_RESERVE,
+    WEATHER_BREAKER_THRESHOLD,
+    WEATHER_BREAKER_COOLDOWN,
+    WEATHER_GAZETTEER_PATH,
+    WEATHER_PROGRESSIVE_HOME,
+    WEATHER_HISTORY,
+    WEATHER_HISTORY_FLUSH_INTERVAL,
+)
 
 logger = logging.getLogger("weather")
 
+_weather_client: WeatherApiClient | None = None
+_async_weather_client: AsyncWeatherApiClient | None = None
+_weather_client_lock = threading.Lock()
+# Shared by both clients, so observations are written in one batch.
+_history_recorder = (
+    HistoryRecorder(WEATHER_HISTORY_FLUSH_INTERVAL) if WEATHER_HISTORY else None
+)
+
+
+def _client_options() -> dict[str, Any]:
+    return {
+        "api_key": OW_API_KEY,
+        "use_cache": True,
+        "pool_size": WEATHER_HTTP_POOL_SIZE,
+        "max_retries": WEATHER_HTTP_RETRIES,
+        "connect_timeout": WEATHER_CONNECT_TIMEOUT,
+        "read_timeout": WEATHER_READ_TIMEOUT,
+        "local_cache_size": WEATHER_LOCAL_CACHE_SIZE,
+        "local_cache_ttl": WEATHER_LOCAL_CACHE_TTL,
+        "coord_precision": WEATHER_COORD_PRECISION,
+        "weather_ttl": WEATHER_CACHE_TTL,
+        "weather_stale_ttl": WEATHER_STALE_TTL,
+        "forecast_ttl": WEATHER_FORECAST_TTL,
+        "forecast_stale_ttl": WEATHER_FORECAST_STALE_TTL,
+        "background_refresh": True,
+        "rate_limit": WEATHER_RATE_LIMIT,
+        "rate_limit_reserve": WEATHER_RATE_LIMIT_RESERVE,
+        "breaker_threshold": WEATHER_BREAKER_THRESHOLD,
+        "breaker_cooldown": WEATHER_BREAKER_COOLDOWN,
+        "gazetteer_path": WEATHER_GAZETTEER_PATH,
+        "recorder": _history_recorder,
+    }
+
+
+def get_weather_client() -> WeatherApiClient:
+    """Process-wide client, so its HTTP connections are reused across requests."""
+    global _weather_client
+    if _weather_client is None:
+        with _weather_client_lock:
+            if _weather_client is None:
+                _weather_client = WeatherApiClient(**_client_options())
+    return _weather_client
+
+
+def get_async_weather_client() -> AsyncWeatherApiClient:
+    """Process-wide async client, it keeps one connection pool per event loop."""
+    global _async_weather_client
+    if _async_weather_client is None:
+        with _weather_client_lock:
+            if _async_weather_client is None:
+                _async_weather_client = AsyncWeatherApiClient(**_client_options())
+    return _async_weather_client
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+    """LoginRequiredMixin for async views, it loads the user without blocking."""
+
+    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> Any:
+        # View.dispatch is declared sync, Django awaits what an async view returns.
+        return self._dispatch(request, *args, **kwargs)
+
+    async def _dispatch(
+        self, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponseBase:
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(
+                request.get_full_path(),
+                self.get_login_url(),
+                self.get_redirect_field_name(),
+            )
+        return await super().dispatch(request, *args, **kwargs)  # type: ignore[misc]
+
 
 class WeatherSearchMixin:
     def get_weather_client(self) -> WeatherApiClient:
-        return WeatherApiClient(api_key=OW_API_KEY, use_cache=True)
+        return get_weather_client()
 
     def handle_search(
         self, query: str
@@ -28,41 +133,177 @@ class WeatherSearchMixin:
             return client.search_locations_by_name(query), None
         except WeatherAPINoLocationsError:
             return None, "No locations found"
-        except WeatherAPITimeoutError:
-            return None, "Service timeout. Please try again later."
-        except WeatherAPIConnectionError:
-            return None, "Network problem. Check your internet connection."
-        except WeatherAPIError:
-            return None, "Weather service temporary unavailable"
+        except WeatherAPIError as e:
+            return None, get_error_message(e)
 
 
 class WeatherDataMixin:
+    max_workers = WEATHER_FETCH_WORKERS
+    weather_timeout = WEATHER_PAGE_TIMEOUT
+    # Only use cached weather, other cards are left pending for the browser.
+    progressive = WEATHER_PROGRESSIVE_HOME
+
     def get_weather_client(self) -> WeatherApiClient:
-        return WeatherApiClient(api_key=OW_API_KEY, use_cache=True)
+        return get_weather_client()
 
     def handle_weather_request(
-        self, locations: QuerySet[Location]
+        self, locations: Iterable[Location]
     ) -> tuple[list[dict[str, Any]], str | None]:
+        """Fetch weather for all locations with one batch call, keeping their order.
+
+        A failed location becomes a card with an ``error`` message instead of
+        dropping the whole page; the first message is returned as page error.
+        """
+        locations = list(locations)
+        if not locations:
+            return [], None
+
         client = self.get_weather_client()
-        results = []
-        error = None
+        coords = [location_coords(loc) for loc in locations]
+        if self.progressive:
+            return build_weather_cards(
+                locations, client.get_cached_weather_many(coords, fresh_only=True)
+            )
+        weather = client.get_current_weather_many(
+            coords, max_workers=self.max_workers, timeout=self.weather_timeout
+        )
+        results, error = build_weather_cards(locations, weather)
+        logger.debug(results)
+
+        return results, error
+
 
+class AsyncWeatherSearchMixin(WeatherSearchMixin):
+    def get_async_weather_client(self) -> AsyncWeatherApiClient:
+        return get_async_weather_client()
+
+    async def ahandle_search(
+        self, query: str
+    ) -> tuple[list[dict[str, Any]] | None, str | None]:
         try:
-            for loc in locations:
-                weather_data = client.get_current_weather(
-                    lat=float(loc.latitude), lon=float(loc.longitude)
-                )
-
-                results.append({**weather_data, "name": loc.name, "db_id": loc.pk})
-                logger.debug(results)
-        except WeatherAPITimeoutError:
-            error = "Service timeout. Please try again later."
-            logger.error("Weather API failed: %s", error)
-        except WeatherAPIConnectionError:
-            error = "Network problem. Check your internet connection."
-            logger.error("Weather API failed: %s", error)
-        except WeatherAPIError:
-            error = "Weather service temporary unavailable"
-            logger.error("Weather API failed: %s", error)
+            client = self.get_async_weather_client()
+            return await client.search_locations_by_name(query), None
+        except WeatherAPINoLocationsError:
+            return None, "No locations found"
+        except WeatherAPIError as e:
+            return None, get_error_message(e)
 
-        return results, error
+
+class AsyncWeatherDataMixin(WeatherDataMixin):
+    def get_async_weather_client(self) -> AsyncWeatherApiClient:
+        return get_async_weather_client()
+
+    async def ahandle_weather_request(
+        self, locations: Iterable[Location]
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """Fetch weather for all locations concurrently on the event loop."""
+        locations = list(locations)
+        if not locations:
+            return [], None
+
+        client = self.get_async_weather_client()
+        coords = [location_coords(loc) for loc in locations]
+        if self.progressive:
+            cached = await client.get_cached_weather_many(coords, fresh_only=True)
+            return build_weather_cards(locations, cached)
+        weather = await client.get_current_weather_many(
+            coords, timeout=self.weather_timeout
+        )
+        return build_weather_cards(locations, weather)
+
+
+def location_summary(location: dict[str, Any]) -> dict[str, Any]:
+    """Fields of a geocoding result that JSON responses expose."""
+    return {
+        "name": location["name"],
+        "state": location.get("state"),
+        "country": location["country"],
+        "lat": location["lat"],
+        "lon": location["lon"],
+    }
+
+
+def location_coords(location: Location) -> tuple[float, float]:
+    return location.latitude, location.longitude
+
+
+def build_weather_cards(
+    locations: list[Location],
+    weather: Mapping[tuple[float, float], WeatherRecord | WeatherAPIError | None],
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Page cards from batch results; failures become cards with an error.
+
+    A location without weather becomes a pending card that the browser loads
+    from LocationCardView.
+    """
+    results = []
+    error = None
+    for loc in locations:
+        weather_data = weather[location_coords(loc)]
+        if weather_data is None:
+            results.append({"name": loc.name, "db_id": loc.pk, "pending": True})
+            continue
+        if isinstance(weather_data, WeatherAPIError):
+            message = get_error_message(weather_data)
+            logger.error("Weather API failed for %s: %s", loc.name, message)
+            results.append({"name": loc.name, "db_id": loc.pk, "error": message})
+            error = error or message
+            continue
+
+        results.append({"name": loc.name, "db_id": loc.pk, "weather": weather_data})
+    return results, error
+
+
+def get_error_message(error: WeatherAPIError) -> str:
+    """User-facing message for a weather API failure."""
+    if isinstance(error, WeatherAPITimeoutError):
+        return "Service timeout. Please try again later."
+    if isinstance(error, WeatherAPIUnavailableError):
+        return "Weather service temporary unavailable"
+    if isinstance(error, WeatherAPIConnectionError):
+        return "Network problem. Check your internet connection."
+    if isinstance(error, WeatherAPIRateLimitError):
+        return "Too many requests. Please try again in a minute."
+    return "Weather service temporary unavailable"
+
+
+class LazyWeatherList:
+    """Locations whose weather is fetched only for the slice that is taken.
+
+    The paginator asks for ``count()`` and then slices a single page, so only
+    the locations shown on that page reach the weather API. It needs no more
+    of the list than ``count``, ``__len__`` and ``__getitem__``.
+    """
+
+    def __init__(
+        self,
+        locations: QuerySet[Location],
+        fetch: Callable[[Iterable[Location]], tuple[list[dict[str, Any]], str | None]],
+    ) -> None:
+        self.locations = locations
+        self.fetch = fetch
+        self.error: str | None = None
+
+    def count(self) -> int:
+        return self.locations.count()
+
+    def __len__(self) -> int:
+        return self.count()
+
+    @overload
+    def __getitem__(self, index: int) -> dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[dict[str, Any]]: ...
+
+    def __getitem__(self, index: int | slice) -> dict[str, Any] | list[dict[str, Any]]:
+        if isinstance(index, slice):
+            weather_data, error = self.fetch(self.locations[index])
+            if error:
+                self.error = error
+            return weather_data
+
+        items = self[index : index + 1]
+        if not items:
+            raise IndexError("Location index out of range")
+        return items[0]
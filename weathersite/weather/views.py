@@ -1,20 +1,56 @@
+import datetime
+import hashlib
 import logging
+import time
 from typing import Any
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.paginator import InvalidPage, Page, Paginator
 from django.db.models import QuerySet
-from django.http import HttpRequest, HttpResponse
-from django.shortcuts import render, redirect
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+)
+from django.shortcuts import get_object_or_404, render, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag, urlencode
 from django.views.generic import TemplateView, View, ListView, DeleteView
 
+from .exceptions import (
+    WeatherAPIError,
+    WeatherAPINoLocationsError,
+    WeatherAPIRateLimitError,
+)
+from .forms import AddLocationForm, HistoryForm, PointForm
+from .geoindex import normalize_query
+from .history import observation_series
 from .models import Location
-from .utils import WeatherSearchMixin, WeatherDataMixin
+from .ratelimit import background_priority
+from .records import Forecast, WeatherRecord
+from .utils import (
+    WeatherSearchMixin,
+    WeatherDataMixin,
+    LazyWeatherList,
+    AsyncLoginRequiredMixin,
+    AsyncWeatherDataMixin,
+    AsyncWeatherSearchMixin,
+    get_error_message,
+    location_summary,
+)
 
 # Create your views here.
 
 logger = logging.getLogger("weather")
 
+# Lifetime of redirects to canonical public URLs
+PUBLIC_REDIRECT_MAX_AGE = 24 * 60 * 60
+
 
 class WeatherHomeView(LoginRequiredMixin, WeatherDataMixin, ListView):
     model = Location
@@ -22,20 +58,15 @@ class WeatherHomeView(LoginRequiredMixin, WeatherDataMixin, ListView):
     context_object_name = "locations_with_weather"
     paginate_by = 8
 
-    def get_queryset(self) -> QuerySet[Location]:
-        locations = Location.objects.filter(user=self.request.user)
-        return self._add_weather_data(locations)  # type: ignore
-
-    def _add_weather_data(self, locations: QuerySet[Location]) -> list[dict[str, Any]]:
-        weather_data, error = self.handle_weather_request(locations)
-        if error:
-            self.error = error
-        return weather_data
+    def get_queryset(self) -> LazyWeatherList:  # type: ignore[override]
+        locations = Location.objects.filter(user=self.request.user).order_by("id")
+        self.weather_list = LazyWeatherList(locations, self.handle_weather_request)
+        return self.weather_list
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        if hasattr(self, "error"):
-            context["error"] = self.error
+        if self.weather_list.error:
+            context["error"] = self.weather_list.error
         elif not context["locations_with_weather"]:
             context["info"] = "You don't have any saved locations yet."
         return context
@@ -63,6 +94,331 @@ class ShowLocationView(LoginRequiredMixin, WeatherSearchMixin, TemplateView):
         return context
 
 
+class AutocompleteView(LoginRequiredMixin, WeatherSearchMixin, View):
+    """Suggestions for the search box from locations found before."""
+
+    min_length = 2
+    limit = 6
+
+    def get(self, request: HttpRequest) -> JsonResponse:
+        query = request.GET.get("q", "").strip()
+        results = []
+        if len(query) >= self.min_length:
+            client = self.get_weather_client()
+            results = [
+                location_summary(location)
+                for location in client.autocomplete(query, self.limit)
+            ]
+        return JsonResponse({"results": results})
+
+
+def public_response(response: HttpResponse, max_age: int) -> HttpResponse:
+    """Let browsers and the nginx cache keep a response for ``max_age`` seconds.
+
+    Public views never touch the session or the CSRF token, so the response
+    does not vary by cookie.
+    """
+    if max_age > 0:
+        patch_cache_control(response, public=True, max_age=max_age)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def public_error_response(error: WeatherAPIError) -> HttpResponse:
+    status = 429 if isinstance(error, WeatherAPIRateLimitError) else 503
+    response = JsonResponse({"error": get_error_message(error)}, status=status)
+    if status == 429:
+        response["Retry-After"] = "60"
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def canonical_redirect(request: HttpRequest, **params: Any) -> HttpResponse | None:
+    """Redirect to the canonical form of a public URL, so that it is cached once.
+
+    None when the request is already for the canonical URL.
+    """
+    query = urlencode(params)
+    if request.GET.urlencode() == query:
+        return None
+    response = redirect(f"{request.path}?{query}")
+    return public_response(response, PUBLIC_REDIRECT_MAX_AGE)
+
+
+def public_record_response(
+    request: HttpRequest, record: WeatherRecord | Forecast, data: dict[str, Any]
+) -> HttpResponse:
+    """JSON of a cached record with validators, or 304 if the client has it."""
+    etag = quote_etag(hashlib.sha1(record.to_bytes()).hexdigest())
+    last_modified = int(record.fetched_at)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(data)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+class PublicWeatherView(WeatherDataMixin, View):
+    """Current weather at a point for anyone, see nginx/django.conf.
+
+    Points are redirected to the weather cache grid, so all points of a cell
+    share one URL and one cached response. OpenWeather is called at
+    background priority: public traffic cannot use the rate limit reserve
+    of signed in users.
+    """
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        form = PointForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({"error": "Invalid coordinates"}, status=400)
+        client = self.get_weather_client()
+        lat, lon = client.quantize(form.cleaned_data["lat"], form.cleaned_data["lon"])
+        if redirect_response := canonical_redirect(request, lat=lat, lon=lon):
+            return redirect_response
+
+        try:
+            with background_priority():
+                record = client.get_current_weather(
+                    lat, lon, timeout=self.weather_timeout
+                )
+        except WeatherAPIError as e:
+            return public_error_response(e)
+
+        response = public_record_response(
+            request, record, {"lat": lat, "lon": lon, **record.as_dict()}
+        )
+        max_age = int(client.weather_ttl - (time.time() - record.fetched_at))
+        return public_response(response, max_age)
+
+
+class PublicForecastView(WeatherDataMixin, View):
+    """5 day forecast at a point for anyone, cached like PublicWeatherView.
+
+    The 3 hour steps are returned as columns, with min, max and mean of
+    each local day under ``daily``.
+    """
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        form = PointForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({"error": "Invalid coordinates"}, status=400)
+        client = self.get_weather_client()
+        lat, lon = client.quantize(form.cleaned_data["lat"], form.cleaned_data["lon"])
+        if redirect_response := canonical_redirect(request, lat=lat, lon=lon):
+            return redirect_response
+
+        try:
+            with background_priority():
+                forecast = client.get_forecast(lat, lon, timeout=self.weather_timeout)
+        except WeatherAPIError as e:
+            return public_error_response(e)
+
+        response = public_record_response(
+            request, forecast, {"lat": lat, "lon": lon, **forecast.as_dict()}
+        )
+        max_age = int(client.forecast_ttl - (time.time() - forecast.fetched_at))
+        return public_response(response, max_age)
+
+
+class PublicSearchView(WeatherSearchMixin, View):
+    """Geocoding results for anyone, cacheable like PublicWeatherView."""
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        query = normalize_query(request.GET.get("q", ""))
+        if not query:
+            return JsonResponse({"error": "Please enter a city name"}, status=400)
+        if redirect_response := canonical_redirect(request, q=query):
+            return redirect_response
+
+        client = self.get_weather_client()
+        try:
+            with background_priority():
+                locations = client.search_locations_by_name(query)
+        except WeatherAPINoLocationsError:
+            locations = []
+        except WeatherAPIError as e:
+            return public_error_response(e)
+
+        response = JsonResponse(
+            {"query": query, "results": [location_summary(loc) for loc in locations]}
+        )
+        return public_response(response, client.DEFAULT_CACHE_TTL)
+
+
+class LocationsApiView(LoginRequiredMixin, WeatherDataMixin, View):
+    """Saved locations of the user with their weather as JSON.
+
+    The ETag follows the saved locations and the fetch times of their
+    weather, so a client that has the current data gets 304 Not Modified.
+    There is no Last-Modified: adding, renaming or deleting a location does
+    not move the newest fetch time. The response may be reused by the
+    browser until the first entry goes stale.
+    """
+
+    progressive = False
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        locations = list(Location.objects.filter(user=request.user).order_by("id"))
+        cards, _ = self.handle_weather_request(locations)
+        etag = self.etag(locations, cards)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = JsonResponse(
+                {
+                    "locations": [
+                        self.location_data(location, card)
+                        for location, card in zip(locations, cards)
+                    ]
+                }
+            )
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, max_age=self.max_age(cards))
+        return response
+
+    def etag(self, locations: list[Location], cards: list[dict[str, Any]]) -> str:
+        """Digest of the locations and the version of the weather of each."""
+        digest = hashlib.sha1()
+        for location, card in zip(locations, cards):
+            version = card["weather"].fetched_at if "weather" in card else "error"
+            digest.update(
+                f"{location.pk}:{location.name}:{location.latitude}:"
+                f"{location.longitude}:{version};".encode()
+            )
+        return quote_etag(digest.hexdigest())
+
+    def max_age(self, cards: list[dict[str, Any]]) -> int:
+        """Seconds until the first weather entry goes stale, 0 after an error."""
+        if any("weather" not in card for card in cards):
+            return 0
+        now = time.time()
+        oldest = max((now - card["weather"].fetched_at for card in cards), default=0)
+        return max(int(self.get_weather_client().weather_ttl - oldest), 0)
+
+    def location_data(self, location: Location, card: dict[str, Any]) -> dict:
+        weather = card.get("weather")
+        return {
+            "id": location.pk,
+            "name": location.name,
+            "lat": location.latitude,
+            "lon": location.longitude,
+            "weather": weather.as_dict() if weather is not None else None,
+            "error": card.get("error"),
+        }
+
+
+class LocationHistoryView(LoginRequiredMixin, WeatherDataMixin, View):
+    """Archived weather of a location for charts, see weather.history.
+
+    ``days`` (30 by default) ending now, downsampled to ``bucket`` or to
+    a resolution picked for the length of the series.
+    """
+
+    default_days = 30
+
+    def get(self, request: HttpRequest, pk: int) -> HttpResponse:
+        location = get_object_or_404(Location, pk=pk, user=request.user)
+        form = HistoryForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({"error": "Invalid period"}, status=400)
+
+        days = form.cleaned_data["days"] or self.default_days
+        end = datetime.datetime.now(datetime.UTC)
+        lat, lon = self.get_weather_client().quantize(
+            location.latitude, location.longitude
+        )
+        bucket, series = observation_series(
+            lat,
+            lon,
+            end - datetime.timedelta(days=days),
+            end,
+            form.cleaned_data["bucket"] or None,
+        )
+        return JsonResponse(
+            {"location": location.name, "bucket": bucket, "series": series}
+        )
+
+
+class AsyncWeatherHomeView(AsyncLoginRequiredMixin, AsyncWeatherDataMixin, View):
+    """WeatherHomeView for ASGI, it waits for OpenWeather without blocking."""
+
+    template_name = "weather/index.html"
+    paginate_by = 8
+
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        user = await request.auser()
+        locations = Location.objects.filter(user=user).order_by("id")
+        page, page_locations = await sync_to_async(self.paginate)(
+            locations, request.GET.get("page")
+        )
+
+        weather_data, error = await self.ahandle_weather_request(page_locations)
+        page.object_list = weather_data
+
+        context: dict[str, Any] = {
+            "paginator": page.paginator,
+            "page_obj": page,
+            "is_paginated": page.has_other_pages(),
+            "locations_with_weather": weather_data,
+        }
+        if error:
+            context["error"] = error
+        elif not weather_data:
+            context["info"] = "You don't have any saved locations yet."
+        return await sync_to_async(render)(request, self.template_name, context)
+
+    def paginate(
+        self, locations: QuerySet[Location], page_number: Any
+    ) -> tuple[Page, list[Location]]:
+        """The requested page and its locations, both read from the database."""
+        paginator = Paginator(locations, self.paginate_by)
+        if page_number == "last":
+            page_number = paginator.num_pages
+        try:
+            page = paginator.page(page_number or 1)
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return page, list(page.object_list)
+
+
+class AsyncShowLocationView(AsyncLoginRequiredMixin, AsyncWeatherSearchMixin, View):
+    """ShowLocationView for ASGI."""
+
+    template_name = "weather/locations.html"
+
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        context: dict[str, Any] = {"title": "Search."}
+        query = request.GET.get("city", "").strip()
+        logger.debug("Query: %s", query)
+
+        if not query:
+            logger.warning("No city specified")
+            context["info"] = "Please enter a city name"
+        else:
+            locations, error = await self.ahandle_search(query)
+            if error:
+                context["error"] = error
+            else:
+                context.update({"locations": locations, "query": query})
+        return await sync_to_async(render)(request, self.template_name, context)
+
+
+class LocationCardView(LoginRequiredMixin, WeatherDataMixin, View):
+    """Card of one location as JSON, for pending cards of the home page."""
+
+    progressive = False
+
+    def get(self, request: HttpRequest, pk: int) -> HttpResponse:
+        location = get_object_or_404(Location, pk=pk, user=request.user)
+        cards, _ = self.handle_weather_request([location])
+        html = render_to_string(
+            "weather/includes/home_card.html", {"location": cards[0]}, request
+        )
+        return JsonResponse({"html": html})
+
+
 class DeleteWeatherCardView(DeleteView):
     model = Location
     success_url = reverse_lazy("index")
@@ -74,14 +430,22 @@ class DeleteWeatherCardView(DeleteView):
 
 class AddLocationView(LoginRequiredMixin, View):
     def post(self, request: HttpRequest) -> HttpResponse:
+        form = AddLocationForm(request.POST)
+        if not form.is_valid():
+            logger.warning("Invalid location from %s: %s", request.user, form.errors)
+            return HttpResponseBadRequest("Invalid location")
+
+        lat, lon = Location.round_coordinates(
+            form.cleaned_data["latitude"], form.cleaned_data["longitude"]
+        )
         Location.objects.get_or_create(
             user=request.user,
-            name=request.POST.get("name"),
-            latitude=request.POST.get("latitude"),
-            longitude=request.POST.get("longitude"),
+            latitude=lat,
+            longitude=lon,
+            defaults={"name": form.cleaned_data["name"]},
         )
         logger.info(
-            "User %s added location: %s", request.user, request.POST.get("name")
+            "User %s added location: %s", request.user, form.cleaned_data["name"]
         )
 
         return redirect("index")
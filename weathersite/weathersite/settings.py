@@ -25,6 +25,50 @@ environ.Env.read_env(Path(BASE_DIR).parent / ".env")
 
 OW_API_KEY = env("OW_API_KEY")
 
+# Upper bound of parallel OpenWeather requests issued for one page
+WEATHER_FETCH_WORKERS = env.int("WEATHER_FETCH_WORKERS", default=8)
+# Keep-alive connections to OpenWeather per worker process and retries per call
+WEATHER_HTTP_POOL_SIZE = env.int("WEATHER_HTTP_POOL_SIZE", default=10)
+WEATHER_HTTP_RETRIES = env.int("WEATHER_HTTP_RETRIES", default=2)
+# Seconds to connect to OpenWeather and to wait for its response, and the time
+# budget of all weather requests of one page, retries included
+WEATHER_CONNECT_TIMEOUT = env.float("WEATHER_CONNECT_TIMEOUT", default=3.05)
+WEATHER_READ_TIMEOUT = env.float("WEATHER_READ_TIMEOUT", default=5)
+WEATHER_PAGE_TIMEOUT = env.float("WEATHER_PAGE_TIMEOUT", default=8)
+# In-process cache in front of CACHES: entries and their maximum lifetime
+WEATHER_LOCAL_CACHE_SIZE = env.int("WEATHER_LOCAL_CACHE_SIZE", default=1024)
+WEATHER_LOCAL_CACHE_TTL = env.int("WEATHER_LOCAL_CACHE_TTL", default=60)
+# Decimal places weather coordinates are rounded to before caching (2 ~ 1.1 km)
+WEATHER_COORD_PRECISION = env.int("WEATHER_COORD_PRECISION", default=2)
+# Weather is fresh for WEATHER_CACHE_TTL seconds, after that it is served
+# while being refreshed in the background, or when OpenWeather is down,
+# until WEATHER_STALE_TTL
+WEATHER_CACHE_TTL = env.int("WEATHER_CACHE_TTL", default=15 * 60)
+WEATHER_STALE_TTL = env.int("WEATHER_STALE_TTL", default=60 * 60)
+# Forecasts are fresh for WEATHER_FORECAST_TTL seconds and served stale when
+# OpenWeather is down until WEATHER_FORECAST_STALE_TTL
+WEATHER_FORECAST_TTL = env.int("WEATHER_FORECAST_TTL", default=60 * 60)
+WEATHER_FORECAST_STALE_TTL = env.int("WEATHER_FORECAST_STALE_TTL", default=6 * 60 * 60)
+# OpenWeather calls per minute shared by all workers (0 disables the limit),
+# the last WEATHER_RATE_LIMIT_RESERVE of them are kept for page views
+WEATHER_RATE_LIMIT = env.int("WEATHER_RATE_LIMIT", default=60)
+WEATHER_RATE_LIMIT_RESERVE = env.int("WEATHER_RATE_LIMIT_RESERVE", default=10)
+# Stop calling OpenWeather for WEATHER_BREAKER_COOLDOWN seconds after this many
+# timeouts or connection errors within a minute (0 disables the breaker)
+WEATHER_BREAKER_THRESHOLD = env.int("WEATHER_BREAKER_THRESHOLD", default=5)
+WEATHER_BREAKER_COOLDOWN = env.int("WEATHER_BREAKER_COOLDOWN", default=30)
+# Offline gazetteer searched before OpenWeather geocoding, see build_gazetteer
+WEATHER_GAZETTEER_PATH = env.str("WEATHER_GAZETTEER_PATH", default="") or None
+# Render the home page from cached weather only; cards that need OpenWeather
+# are loaded by the browser one by one
+WEATHER_PROGRESSIVE_HOME = env.bool("WEATHER_PROGRESSIVE_HOME", default=False)
+# Archive the weather fetched from OpenWeather for history charts, written in
+# batches every WEATHER_HISTORY_FLUSH_INTERVAL seconds
+WEATHER_HISTORY = env.bool("WEATHER_HISTORY", default=False)
+WEATHER_HISTORY_FLUSH_INTERVAL = env.int("WEATHER_HISTORY_FLUSH_INTERVAL", default=60)
+# Serve the home and search pages with async views (run under ASGI)
+WEATHER_ASYNC_VIEWS = env.bool("WEATHER_ASYNC_VIEWS", default=False)
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -98,6 +142,17 @@ DATABASES = {
     # }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Shared by all gunicorn workers when CACHE_URL points to Redis
+# (redis://redis:6379/1), the database (dbcache://weather_cache) or a
+# directory (filecache:///var/tmp/weather_cache). Falls back to a
+# per-process memory cache, which is also what the tests use.
+
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 